@@ -3,6 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from unfold.admin import ModelAdmin, TabularInline
 from core.rbac_mixins import RBACModelAdminMixin, RestrictExportMixin
+from core.search import SearchBackendAdminMixin
 from .models import Account, UserProfile
 
 
@@ -19,7 +20,7 @@ class AccountInteractionInline(TabularInline):
 
 
 @admin.register(Account)
-class AccountAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
+class AccountAdmin(RBACModelAdminMixin, RestrictExportMixin, SearchBackendAdminMixin, ModelAdmin):
     list_display = ("name", "industry", "created_at", "interaction_count")
     search_fields = ("name", "industry")
     list_filter = ("industry",)
@@ -0,0 +1,24 @@
+"""
+Comando para reconstruir la tabla de visibilidad de empresas (RBAC)
+Uso: python manage.py rebuild_account_visibility
+Útil tras cargas masivas (bulk_create/update no disparan señales) o para recuperación.
+"""
+
+from core.metrics import TimedCommand
+from django.db import transaction
+from accounts.models import AccountVisibility
+
+
+class Command(TimedCommand):
+    help = 'Reconstruye AccountVisibility a partir de las asignaciones de los deals'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconstruyendo visibilidad de empresas...'))
+        
+        with transaction.atomic():
+            created, deleted = AccountVisibility.rebuild()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} filas creadas, {deleted} filas eliminadas '
+            f'({AccountVisibility.objects.count()} en total)'
+        ))
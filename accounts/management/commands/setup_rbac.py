@@ -5,12 +5,12 @@ Sistema de Roles y Permisos (RBAC) para CRM
 Gestión de comando para crear grupos y asignar permisos
 """
 
-from django.core.management.base import BaseCommand
+from core.metrics import TimedCommand
 from django.contrib.auth.models import Group, Permission
 from django.contrib.contenttypes.models import ContentType
 
 
-class Command(BaseCommand):
+class Command(TimedCommand):
     help = 'Crea los grupos RBAC y asigna permisos para el CRM'
 
     def handle(self, *args, **options):
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_account_visibility(apps, schema_editor):
+    """Carga inicial de la visibilidad a partir de los deals existentes"""
+    Deal = apps.get_model('deals', 'Deal')
+    AccountVisibility = apps.get_model('accounts', 'AccountVisibility')
+    pairs = (
+        Deal.objects.filter(assigned_to__isnull=False)
+        .values_list('assigned_to_id', 'account_id').distinct()
+    )
+    AccountVisibility.objects.bulk_create(
+        [AccountVisibility(user_id=user_id, account_id=account_id) for user_id, account_id in pairs],
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile'),
+        ('deals', '0004_quote_quoteitem_quote_deals_quote_status_f33c56_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='accounts.account')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_visibility', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Visibilidad de empresa',
+                'verbose_name_plural': 'Visibilidad de empresas',
+                'indexes': [models.Index(fields=['account', 'user'], name='accounts_ac_account_9a914d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'account'), name='unique_account_visibility')],
+            },
+        ),
+        migrations.RunPython(populate_account_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_accountvisibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='number_of_employees',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Número de empleados'),
+        ),
+    ]
@@ -1,15 +1,25 @@
 from django.db import models
 from django.contrib.auth.models import User
 from core.models import TimeStampedModel 
+from core.rbac import RBACQuerySet, account_visible_for
+
+class AccountQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Empresas con algún deal del usuario o de su equipo"""
+        return account_visible_for('pk', scope)
+
 
 class Account(models.Model):
     name = models.CharField("Nombre de la empresa", max_length=255)
     website = models.URLField(blank=True)
     industry = models.CharField(max_length=100, blank=True)
+    number_of_employees = models.PositiveIntegerField("Número de empleados", null=True, blank=True)
     description = models.TextField(blank=True)
     # Metadata básica
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = AccountQuerySet.as_manager()
+    
     def __str__(self):
         return self.name
 
@@ -48,4 +58,90 @@ class UserProfile(models.Model):
     
     class Meta:
         verbose_name = 'Perfil de Usuario'
-        verbose_name_plural = 'Perfiles de Usuario'
\ No newline at end of file
+        verbose_name_plural = 'Perfiles de Usuario'
+
+class AccountVisibility(models.Model):
+    """
+    Tabla materializada (usuario, empresa): el usuario tiene al menos un deal
+    asignado en la empresa. Se mantiene desde las señales de Deal
+    (accounts/signals.py) y se reconstruye con rebuild_account_visibility.
+    
+    Solo guarda filas directas del vendedor: la visibilidad de un manager
+    sale de los IDs de su equipo (core/rbac.py), así que los cambios de
+    UserProfile.created_by no requieren tocar esta tabla.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='account_visibility')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='visibility')
+    
+    class Meta:
+        verbose_name = 'Visibilidad de empresa'
+        verbose_name_plural = 'Visibilidad de empresas'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'account'], name='unique_account_visibility'),
+        ]
+        indexes = [
+            models.Index(fields=['account', 'user']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} → {self.account_id}"
+    
+    @classmethod
+    def refresh(cls, pairs):
+        """
+        Recalcula las filas de los pares (user_id, account_id) indicados
+        según existan o no deals que los respalden.
+        """
+        from deals.models import Deal
+        
+        pairs = {(user_id, account_id) for user_id, account_id in pairs if user_id and account_id}
+        if not pairs:
+            return
+        
+        condition = models.Q()
+        for user_id, account_id in pairs:
+            condition |= models.Q(assigned_to_id=user_id, account_id=account_id)
+        backed = set(
+            Deal.objects.filter(condition).values_list('assigned_to_id', 'account_id').distinct()
+        )
+        
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, account_id=account_id) for user_id, account_id in backed],
+            ignore_conflicts=True
+        )
+        stale = pairs - backed
+        if stale:
+            condition = models.Q()
+            for user_id, account_id in stale:
+                condition |= models.Q(user_id=user_id, account_id=account_id)
+            cls.objects.filter(condition).delete()
+    
+    @classmethod
+    def rebuild(cls):
+        """
+        Reconstruye la tabla completa a partir de los deals.
+        Aplica solo la diferencia para no vaciarla mientras se usa.
+        Retorna (filas_creadas, filas_borradas).
+        """
+        from deals.models import Deal
+        
+        expected = set(
+            Deal.objects.filter(assigned_to__isnull=False)
+            .values_list('assigned_to_id', 'account_id').distinct()
+        )
+        current = dict(
+            ((user_id, account_id), pk)
+            for pk, user_id, account_id in cls.objects.values_list('pk', 'user_id', 'account_id')
+        )
+        
+        missing = expected - current.keys()
+        stale_ids = [pk for pair, pk in current.items() if pair not in expected]
+        
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, account_id=account_id) for user_id, account_id in missing],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        for start in range(0, len(stale_ids), 1000):
+            cls.objects.filter(pk__in=stale_ids[start:start + 1000]).delete()
+        return len(missing), len(stale_ids)
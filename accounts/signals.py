@@ -0,0 +1,51 @@
+"""
+Signals de accounts:
+- Mantienen la tabla AccountVisibility al día cuando cambia la
+  asignación o la empresa de un deal
+- Invalidan el resumen en caché de la empresa (accounts/summary.py)
+  cuando cambian sus contactos o deals
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from contacts.models import Contact
+from deals.models import Deal
+from .models import AccountVisibility
+from .summary import invalidate_account_summary
+
+
+@receiver(post_save, sender=Deal)
+def deal_visibility_saved(sender, instance, created, **kwargs):
+    """Alta de la visibilidad nueva y revisión de la anterior si cambió el vendedor o la empresa"""
+    pairs = {(instance.assigned_to_id, instance.account_id)}
+    if not created:
+        if not (instance.tracker.has_changed('assigned_to') or instance.tracker.has_changed('account')):
+            return
+        pairs.add((instance.tracker.previous('assigned_to'), instance.tracker.previous('account')))
+    AccountVisibility.refresh(pairs)
+
+
+@receiver(post_delete, sender=Deal)
+def deal_visibility_deleted(sender, instance, **kwargs):
+    """Quita la visibilidad si era el último deal del vendedor en la empresa"""
+    AccountVisibility.refresh({(instance.assigned_to_id, instance.account_id)})
+
+
+@receiver(post_save, sender=Deal)
+def deal_summary_saved(sender, instance, created, **kwargs):
+    """Etapa, valor o empresa del deal: cambia el resumen de su empresa (y de la anterior)"""
+    if created:
+        invalidate_account_summary(instance.account_id)
+        return
+    if instance.tracker.has_changed('account'):
+        invalidate_account_summary(instance.account_id, instance.tracker.previous('account'))
+    elif any(instance.tracker.has_changed(field) for field in ('stage', 'value', 'assigned_to')):
+        invalidate_account_summary(instance.account_id)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Deal)
+def account_summary_changed(sender, instance, **kwargs):
+    invalidate_account_summary(instance.account_id)
@@ -0,0 +1,154 @@
+"""
+Resumen de empresas
+===================
+
+Estadísticas por empresa (contactos, deals, ganados y sus valores) como
+subconsultas correlacionadas: cada una recorre solo las filas de su
+empresa y no se multiplican entre sí como varios Count()/Sum() sobre
+JOINs. Todas salen en una sola consulta, tanto para una empresa (detalle)
+como anotadas sobre un listado.
+
+El resumen del detalle se cachea por empresa y alcance RBAC (los deals
+contados son los visibles para el usuario). Cada empresa tiene una
+versión en caché que las señales de Contact y Deal incrementan
+(accounts/signals.py): invalidar no requiere conocer las claves de
+cada usuario. Los UPDATE masivos no emiten señales: quien los hace
+invalida las empresas de los deals tocados con invalidate_deals_accounts()
+(movimiento de etapa del kanban, revalue_deals y el repreciado).
+
+Solo se cachea con una caché compartida entre workers (ver
+core/caching.py): con LocMemCache la versión incrementada en un worker no
+llegaría a los demás y se calcula en cada petición.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from contacts.models import Contact
+from core.caching import shared_cache_enabled
+from core.rbac import get_rbac_scope
+from deals.models import Deal
+from .models import Account
+
+
+ACCOUNT_SUMMARY_CACHE_TIMEOUT = getattr(settings, 'ACCOUNT_SUMMARY_CACHE_TIMEOUT', 60 * 5)
+
+SUMMARY_FIELDS = ['contacts_count', 'deals_count', 'won_deals', 'deals_value', 'won_value']
+
+
+def _per_account(queryset, **aggregate):
+    """Subconsulta con el agregado de las filas de la empresa exterior"""
+    return (
+        queryset
+        .filter(account_id=OuterRef('pk'))
+        .order_by()
+        .values('account_id')
+        .annotate(**aggregate)
+        .values(*aggregate)
+    )
+
+
+def summary_annotations(deals=None):
+    """
+    Anotaciones del resumen para un queryset de Account.
+    deals: queryset de deals a contar (p. ej. los visibles para el usuario)
+    """
+    deals = Deal.objects.all() if deals is None else deals
+    money = DecimalField(max_digits=15, decimal_places=2)
+    zero = Value(Decimal('0.00'), output_field=money)
+    return {
+        'contacts_count': Coalesce(
+            Subquery(_per_account(Contact.objects.all(), count=Count('pk')), output_field=IntegerField()), 0
+        ),
+        'deals_count': Coalesce(
+            Subquery(_per_account(deals, count=Count('pk')), output_field=IntegerField()), 0
+        ),
+        'won_deals': Coalesce(
+            Subquery(
+                _per_account(deals, count=Count('pk', filter=Q(stage='closed_won'))),
+                output_field=IntegerField()
+            ),
+            0
+        ),
+        'deals_value': Coalesce(
+            Subquery(_per_account(deals, total=Sum('value')), output_field=money), zero
+        ),
+        'won_value': Coalesce(
+            Subquery(
+                _per_account(deals, total=Sum('value', filter=Q(stage='closed_won'))),
+                output_field=money
+            ),
+            zero
+        ),
+    }
+
+
+def summary_cache_enabled():
+    """El resumen se cachea solo en una caché compartida"""
+    return shared_cache_enabled(ACCOUNT_SUMMARY_CACHE_TIMEOUT)
+
+
+def _version_key(account_id):
+    return f'accounts:summary:version:{account_id}'
+
+
+def _get_version(account_id):
+    version = cache.get(_version_key(account_id))
+    if version is None:
+        version = 1
+        cache.add(_version_key(account_id), version, None)
+    return version
+
+
+def invalidate_account_summary(*account_ids):
+    """Invalida el resumen en caché de las empresas (para todos los usuarios)"""
+    if not summary_cache_enabled():
+        return
+    for account_id in {pk for pk in account_ids if pk is not None}:
+        try:
+            cache.incr(_version_key(account_id))
+        except ValueError:
+            cache.set(_version_key(account_id), 2, None)
+
+
+def invalidate_deals_accounts(deal_ids):
+    """Invalida el resumen de las empresas de los deals (UPDATE sin señales)"""
+    if not summary_cache_enabled() or not deal_ids:
+        return
+    account_ids = Deal.objects.filter(pk__in=deal_ids).values_list('account_id', flat=True).distinct()
+    invalidate_account_summary(*account_ids)
+
+
+def compute_account_summary(account_id, user):
+    """Resumen de la empresa con los deals visibles para el usuario, en una consulta"""
+    annotations = summary_annotations(Deal.objects.visible_to(user))
+    summary = (
+        Account.objects
+        .filter(pk=account_id)
+        .annotate(**annotations)
+        .values(*SUMMARY_FIELDS)
+        .first()
+    )
+    return summary or {field: 0 for field in SUMMARY_FIELDS}
+
+
+def get_account_summary(account_id, user):
+    """
+    Retorna {'contacts_count', 'deals_count', 'won_deals', 'deals_value',
+    'won_value'}; cacheado por empresa y alcance (quien ve todo comparte entrada).
+    """
+    if not summary_cache_enabled():
+        return compute_account_summary(account_id, user)
+
+    scope = get_rbac_scope(user)
+    scope_key = 'all' if scope.sees_all else f'user:{scope.user_id}'
+    key = f'accounts:summary:{account_id}:{_get_version(account_id)}:{scope_key}'
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_account_summary(account_id, user)
+        cache.set(key, summary, ACCOUNT_SUMMARY_CACHE_TIMEOUT)
+    return summary
@@ -1,3 +1,123 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from contacts.models import Contact
+from deals.models import Deal, DealProduct, Product
+from deals.pipeline import after_stage_move, move_deal_stage
+from deals.repricing import reprice_products
+from .models import Account
+from .summary import get_account_summary
+from .views import ACCOUNT_RELATED_PAGE_SIZE
+
+
+def shared_cache():
+    return override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }})
+
+
+class AccountSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+        cls.acme = Account.objects.create(name='Acme')
+        Contact.objects.bulk_create([
+            Contact(account=cls.acme, first_name=f'Contacto {i}', last_name='X', email=f'c{i}@acme.test')
+            for i in range(3)
+        ])
+        Deal.objects.create(name='Ganado', account=cls.acme, value=Decimal('100.00'),
+                            stage='closed_won', assigned_to=cls.ana)
+        Deal.objects.create(name='Abierto', account=cls.acme, value=Decimal('50.00'), assigned_to=cls.ana)
+        Deal.objects.create(name='De Luis', account=cls.acme, value=Decimal('25.00'), assigned_to=cls.luis)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_summary_is_not_multiplied_by_joins(self):
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin), {
+            'contacts_count': 3,
+            'deals_count': 3,
+            'won_deals': 1,
+            'deals_value': Decimal('175.00'),
+            'won_value': Decimal('100.00'),
+        })
+
+    def test_summary_counts_only_visible_deals(self):
+        summary = get_account_summary(self.acme.pk, self.luis)
+        self.assertEqual((summary['deals_count'], summary['deals_value']), (1, Decimal('25.00')))
+
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['won_deals'], 1)
+        Deal.objects.filter(name='Abierto').update(stage='closed_won')
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['won_deals'], 2)
+
+    @shared_cache()
+    def test_summary_is_invalidated_when_a_deal_changes(self):
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['won_deals'], 1)
+        with self.assertNumQueries(0):
+            get_account_summary(self.acme.pk, self.admin)
+        deal = Deal.objects.get(name='Abierto')
+        deal.stage = 'closed_won'
+        deal.save()
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['won_deals'], 2)
+
+    @shared_cache()
+    def test_set_based_deal_writes_invalidate_the_summary(self):
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['won_deals'], 1)
+
+        deal = Deal.objects.get(name='Abierto')
+        move_deal_stage(self.admin, deal.pk, 'prospecting', 'closed_won', deal.version)
+        after_stage_move(deal.pk, 'prospecting', self.admin.pk)
+        summary = get_account_summary(self.acme.pk, self.admin)
+        self.assertEqual((summary['won_deals'], summary['won_value']), (2, Decimal('150.00')))
+
+        product = Product.objects.create(name='Licencia', sku='LIC-1', category='software',
+                                         unit_price=Decimal('10.00'))
+        DealProduct.objects.bulk_create([DealProduct(deal=Deal.objects.get(name='De Luis'), product=product,
+                                                     quantity=1, unit_price=Decimal('10.00'))])
+        with self.captureOnCommitCallbacks(execute=True):
+            reprice_products({'LIC-1': '40.00'})
+        self.assertEqual(get_account_summary(self.acme.pk, self.admin)['deals_value'], Decimal('190.00'))
+
+    def test_list_and_detail_agree_for_each_user(self):
+        for user in (self.admin, self.ana, self.luis):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                listed = self.client.get('/accounts/').context['accounts'].get(pk=self.acme.pk)
+                detail = self.client.get(f'/accounts/{self.acme.pk}/').context
+                summary = get_account_summary(self.acme.pk, user)
+                self.assertEqual(listed.contacts_count, summary['contacts_count'])
+                self.assertEqual(listed.deals_count, summary['deals_count'])
+                self.assertEqual(listed.deals_value, summary['deals_value'])
+                self.assertEqual(detail['account'], self.acme)
+
+
+class AccountDetailTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.acme = Account.objects.create(name='Acme')
+        Deal.objects.bulk_create([
+            Deal(name=f'Deal {index}', account=cls.acme, value=Decimal('10'), assigned_to=cls.admin)
+            for index in range(ACCOUNT_RELATED_PAGE_SIZE + 5)
+        ])
+        # Deals anteriores al campo created_at
+        Deal.objects.update(created_at=None)
+
+    def test_deals_are_paginated_by_cursor(self):
+        self.client.force_login(self.admin)
+        first = self.client.get(f'/accounts/{self.acme.pk}/').context
+        self.assertTrue(first['deals_page'].has_next)
+        second = self.client.get(f'/accounts/{self.acme.pk}/', {'deals_cursor': first['deals_page'].next_cursor}).context
+        names = [deal.name for deal in first['deals'] + second['deals']]
+        self.assertEqual(names, [f'Deal {index}' for index in reversed(range(ACCOUNT_RELATED_PAGE_SIZE + 5))])
+        self.assertFalse(second['deals_page'].has_next)
@@ -2,8 +2,10 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
-from django.db.models import Q, Count, Sum
+from core.pagination import keyset_paginate
+from core.search import search_queryset
 from .models import Account
+from .summary import get_account_summary, summary_annotations
 from .forms import UserRegistrationForm
 from contacts.models import Contact
 from deals.models import Deal
@@ -33,25 +35,27 @@ def register_view(request):
     
     return render(request, 'registration/register.html', {'form': form})
 
+ACCOUNT_SEARCH_FIELDS = ['name', 'industry', 'website']
+ACCOUNT_RELATED_PAGE_SIZE = 20
+
 @login_required
 def accounts_list(request):
     """Lista de todas las empresas con búsqueda"""
     query = request.GET.get('q', '')
     
-    accounts = Account.objects.annotate(
-        contacts_count=Count('contacts'),
-        deals_count=Count('deals'),
-        deals_value=Sum('deals__value')
-    )
+    accounts = Account.objects.visible_to(request.user)
     
     if query:
-        accounts = accounts.filter(
-            Q(name__icontains=query) |
-            Q(industry__icontains=query) |
-            Q(website__icontains=query)
-        )
+        accounts = search_queryset(accounts, query, ACCOUNT_SEARCH_FIELDS)
     
-    accounts = accounts.order_by('-created_at')
+    # Contadores y valor por subconsultas: no se multiplican entre sí.
+    # Mismos deals que el resumen del detalle: los visibles para el usuario
+    annotations = summary_annotations(Deal.objects.visible_to(request.user))
+    accounts = accounts.annotate(
+        contacts_count=annotations['contacts_count'],
+        deals_count=annotations['deals_count'],
+        deals_value=annotations['deals_value'],
+    ).order_by('-created_at')
     
     context = {
         'accounts': accounts,
@@ -61,25 +65,43 @@ def accounts_list(request):
 
 @login_required
 def account_detail(request, account_id):
-    """Detalle de una empresa con sus contactos y deals"""
-    account = get_object_or_404(Account, id=account_id)
+    """
+    Detalle de una empresa con sus contactos y deals.
+    Estadísticas del resumen cacheado (accounts/summary.py) y listas paginadas por cursor.
+    """
+    account = get_object_or_404(Account.objects.visible_to(request.user), id=account_id)
     
-    contacts = Contact.objects.filter(account=account).order_by('first_name')
-    deals = Deal.objects.filter(account=account).select_related('contact', 'assigned_to').order_by('-created_at')
+    contacts_cursor = request.GET.get('contacts_cursor')
+    deals_cursor = request.GET.get('deals_cursor')
+    contacts_page = keyset_paginate(
+        Contact.objects.filter(account=account),
+        ['first_name', 'last_name', 'id'],
+        ACCOUNT_RELATED_PAGE_SIZE,
+        contacts_cursor
+    )
+    # Más recientes primero por id: created_at admite NULL y no sirve de cursor
+    deals_page = keyset_paginate(
+        Deal.objects.visible_to(request.user).filter(account=account).select_related('contact', 'assigned_to'),
+        ['-id'],
+        ACCOUNT_RELATED_PAGE_SIZE,
+        deals_cursor
+    )
     
-    # Estadísticas del account
-    total_deals = deals.count()
-    won_deals = deals.filter(stage='closed_won').count()
-    total_value = deals.aggregate(Sum('value'))['value__sum'] or 0
-    won_value = deals.filter(stage='closed_won').aggregate(Sum('value'))['value__sum'] or 0
+    summary = get_account_summary(account.pk, request.user)
     
     context = {
         'account': account,
-        'contacts': contacts,
-        'deals': deals,
-        'total_deals': total_deals,
-        'won_deals': won_deals,
-        'total_value': total_value,
-        'won_value': won_value,
+        'contacts': contacts_page.items,
+        'contacts_page': contacts_page,
+        'contacts_cursor': contacts_cursor or '',
+        'deals': deals_page.items,
+        'deals_page': deals_page,
+        'deals_cursor': deals_cursor or '',
+        'active_tab': 'deals' if deals_cursor else 'contacts',
+        'contacts_count': summary['contacts_count'],
+        'total_deals': summary['deals_count'],
+        'won_deals': summary['won_deals'],
+        'total_value': summary['deals_value'],
+        'won_value': summary['won_value'],
     }
     return render(request, 'accounts/account_detail.html', context)
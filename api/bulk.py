@@ -0,0 +1,219 @@
+"""
+Escritura en bloque para la API REST
+====================================
+
+Endpoints para crear, actualizar o hacer upsert de miles de objetos en una
+sola petición:
+
+- Validación en lote (las FKs se resuelven con una consulta por campo)
+- Escritura con bulk_create / bulk_update dentro de una transacción
+- Efectos secundarios (timeline, scoring) ejecutados una sola vez por lote
+
+Nota: bulk_create/bulk_update no disparan post_save, por eso cada viewset
+implementa perform_bulk_side_effects() con la versión en bloque.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+BULK_MAX_OBJECTS = getattr(settings, 'API_BULK_MAX_OBJECTS', 5000)
+BULK_BATCH_SIZE = getattr(settings, 'API_BULK_BATCH_SIZE', 500)
+
+
+def _to_pk(model, value):
+    """Convierte un valor recibido al tipo de la PK del modelo (None si no es válido)"""
+    if value in (None, ''):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que usa los objetos precargados por
+    BulkListSerializer en lugar de hacer un .get() por fila
+    """
+
+    bulk_cache = None
+
+    def to_internal_value(self, data):
+        if self.bulk_cache is not None and self.pk_field is None:
+            pk = _to_pk(self.get_queryset().model, data)
+            if pk in self.bulk_cache:
+                return self.bulk_cache[pk]
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer para escritura en bloque:
+    - Precarga las FKs de todas las filas antes de validar
+    - create() usa bulk_create y update() usa bulk_update
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._prefetch_related_objects(data)
+            if self.instance is not None:
+                self._child_instances = iter(self.instance)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            for field in self._bulk_related_fields():
+                field.bulk_cache = None
+
+    def run_child_validation(self, data):
+        # En actualizaciones, cada fila se valida contra su propia instancia
+        if self.instance is not None:
+            self.child.instance = next(self._child_instances)
+        return super().run_child_validation(data)
+
+    def _bulk_related_fields(self):
+        return [
+            field for field in self.child.fields.values()
+            if isinstance(field, BulkPrimaryKeyRelatedField) and not field.read_only
+        ]
+
+    def _prefetch_related_objects(self, data):
+        """Una consulta in_bulk por cada FK en lugar de una por fila"""
+        for field in self._bulk_related_fields():
+            model = field.get_queryset().model
+            pks = {
+                _to_pk(model, item.get(field.field_name))
+                for item in data if isinstance(item, dict)
+            }
+            pks.discard(None)
+            field.bulk_cache = field.get_queryset().in_bulk(pks) if pks else {}
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        objs = [model(**attrs) for attrs in validated_data]
+        return model.objects.bulk_create(objs, batch_size=BULK_BATCH_SIZE)
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+
+        if not fields:
+            return instances
+
+        # bulk_update no aplica auto_now: lo hacemos a mano (updated_at, etc.)
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False):
+                for instance in instances:
+                    field.pre_save(instance, add=False)
+                fields.add(field.name)
+
+        model.objects.bulk_update(instances, fields, batch_size=BULK_BATCH_SIZE)
+        return instances
+
+
+class BulkWriteMixin:
+    """
+    Mixin para ModelViewSet que añade endpoints de escritura en bloque:
+
+    - POST  <recurso>/bulk-create/  Lista de objetos nuevos
+    - PATCH <recurso>/bulk-update/  Lista de objetos con 'id' (actualización parcial)
+    - POST  <recurso>/bulk-upsert/  Con 'id' se actualiza, sin 'id' se crea
+
+    El serializer debe usar BulkListSerializer como list_serializer_class.
+    Todo el lote se escribe en una transacción y los efectos secundarios se
+    ejecutan una vez mediante perform_bulk_side_effects().
+    """
+
+    bulk_max_objects = BULK_MAX_OBJECTS
+
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request):
+        """Crea una lista de objetos en bloque"""
+        rows = self._get_bulk_rows(request)
+        with transaction.atomic():
+            created = self._bulk_create_rows(rows)
+            self.perform_bulk_side_effects(created=created, updated=[])
+        return Response(self._bulk_summary(created, []), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """Actualiza parcialmente una lista de objetos identificados por 'id'"""
+        rows = self._get_bulk_rows(request)
+        if any(row.get('id') in (None, '') for row in rows):
+            raise ValidationError({'detail': "Cada objeto debe incluir 'id' para actualizarse."})
+        with transaction.atomic():
+            updated = self._bulk_update_rows(rows)
+            self.perform_bulk_side_effects(created=[], updated=updated)
+        return Response(self._bulk_summary([], updated))
+
+    @action(detail=False, methods=['post'], url_path='bulk-upsert')
+    def bulk_upsert(self, request):
+        """Crea los objetos sin 'id' y actualiza los que lo incluyen"""
+        rows = self._get_bulk_rows(request)
+        to_update = [row for row in rows if row.get('id') not in (None, '')]
+        to_create = [row for row in rows if row.get('id') in (None, '')]
+        with transaction.atomic():
+            updated = self._bulk_update_rows(to_update) if to_update else []
+            created = self._bulk_create_rows(to_create) if to_create else []
+            self.perform_bulk_side_effects(created=created, updated=updated)
+        return Response(self._bulk_summary(created, updated))
+
+    def perform_bulk_side_effects(self, created, updated):
+        """
+        Hook para los efectos secundarios del lote (timeline, scoring...).
+        Se ejecuta dentro de la misma transacción que la escritura.
+        """
+        pass
+
+    def _get_bulk_rows(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValidationError({'detail': 'Se esperaba una lista de objetos.'})
+        if not rows:
+            raise ValidationError({'detail': 'La lista no puede estar vacía.'})
+        if len(rows) > self.bulk_max_objects:
+            raise ValidationError({
+                'detail': f'Máximo {self.bulk_max_objects} objetos por petición (recibidos {len(rows)}).'
+            })
+        return rows
+
+    def _bulk_create_rows(self, rows):
+        serializer = self.get_serializer(data=rows, many=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def _bulk_update_rows(self, rows):
+        model = self.get_queryset().model
+        ids = [_to_pk(model, row.get('id')) for row in rows]
+        if None in ids:
+            raise ValidationError({'detail': "Hay objetos con un 'id' no válido."})
+        if len(set(ids)) != len(ids):
+            raise ValidationError({'detail': "Hay objetos con el 'id' repetido."})
+
+        existing = self.get_queryset().in_bulk(ids)
+        missing = [pk for pk in ids if pk not in existing]
+        if missing:
+            raise ValidationError({'detail': 'Objetos no encontrados.', 'missing_ids': missing})
+
+        instances = [existing[pk] for pk in ids]
+        serializer = self.get_serializer(instance=instances, data=rows, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def _bulk_summary(self, created, updated):
+        return {
+            'status': 'success',
+            'created': len(created),
+            'updated': len(updated),
+            'created_ids': [obj.pk for obj in created],
+            'updated_ids': [obj.pk for obj in updated],
+        }
@@ -0,0 +1,17 @@
+from rest_framework import filters
+
+from core.search import search_queryset
+
+
+class SearchBackendFilter(filters.SearchFilter):
+    """
+    SearchFilter que usa el backend de búsqueda de core/search.py
+    (trigramas en PostgreSQL) con los search_fields del viewset.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        query = request.query_params.get(self.search_param, '')
+        if not search_fields or not query.strip():
+            return queryset
+        return search_queryset(queryset, query, search_fields)
@@ -8,6 +8,7 @@ from documents.models import Document
 from email_templates.models import EmailTemplate, EmailLog
 from notifications.models import Notification
 from django.contrib.auth.models import User
+from .bulk import BulkListSerializer, BulkPrimaryKeyRelatedField
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,6 +31,17 @@ class ContactSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class DueContactSerializer(ContactSerializer):
+    """Contacto de la cola de trabajo, con su mejor deal abierto"""
+    top_deal_id = serializers.ReadOnlyField()
+    deal_name = serializers.ReadOnlyField()
+    deal_score = serializers.ReadOnlyField()
+    is_overdue = serializers.SerializerMethodField()
+    
+    def get_is_overdue(self, obj):
+        return obj.next_contact_at < self.context['today_start']
+
+
 class DealSerializer(serializers.ModelSerializer):
     account_name = serializers.CharField(source='account.name', read_only=True)
     contact_name = serializers.SerializerMethodField()
@@ -54,6 +66,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 class InteractionSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     account_name = serializers.CharField(source='account.name', read_only=True)
     contact_name = serializers.SerializerMethodField()
     assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
@@ -61,6 +74,7 @@ class InteractionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Interaction
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
     
     def get_contact_name(self, obj):
         if obj.contact:
@@ -77,6 +91,7 @@ class TaskCommentSerializer(serializers.ModelSerializer):
 
 
 class TaskSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     assigned_to_name = serializers.CharField(source='assigned_to.get_full_name', read_only=True)
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     account_name = serializers.CharField(source='account.name', read_only=True)
@@ -88,6 +103,7 @@ class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
     
     def get_contact_name(self, obj):
         if obj.contact:
@@ -137,9 +153,29 @@ class EmailLogSerializer(serializers.ModelSerializer):
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    serializer_related_field = BulkPrimaryKeyRelatedField
     recipient_name = serializers.CharField(source='recipient.get_full_name', read_only=True)
     is_expired = serializers.ReadOnlyField()
     
     class Meta:
         model = Notification
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
+
+
+class NotificationBroadcastSerializer(serializers.Serializer):
+    """Datos de un envío masivo de notificaciones (fan-out)"""
+    title = serializers.CharField(max_length=255)
+    message = serializers.CharField()
+    notification_type = serializers.ChoiceField(choices=Notification.TYPE_CHOICES, default='system')
+    priority = serializers.ChoiceField(choices=Notification.PRIORITY_CHOICES, default='normal')
+    action_url = serializers.CharField(max_length=500, required=False, allow_blank=True, default='')
+    digest_key = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    users = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    groups = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    teams = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    
+    def validate(self, attrs):
+        if not (attrs['users'] or attrs['groups'] or attrs['teams']):
+            raise serializers.ValidationError('Indica al menos un destinatario (users, groups o teams).')
+        return attrs
@@ -3,13 +3,16 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from .serializers import (
     UserSerializer, AccountSerializer, ContactSerializer,
     DealSerializer, ProductSerializer, InteractionSerializer,
     TaskSerializer, TaskCommentSerializer, DocumentSerializer,
-    EmailTemplateSerializer, EmailLogSerializer, NotificationSerializer
+    EmailTemplateSerializer, EmailLogSerializer, NotificationSerializer,
+    NotificationBroadcastSerializer, DueContactSerializer
 )
 from accounts.models import Account
 from contacts.models import Contact
@@ -19,7 +22,26 @@ from tasks.models import Task, TaskComment
 from documents.models import Document
 from email_templates.models import EmailTemplate, EmailLog
 from notifications.models import Notification
+from notifications.counters import get_unread_count, invalidate_unread_counts
+from notifications.fanout import notify
+from timeline.models import TimelineEvent
+from timeline.signals import build_interaction_event, build_task_event, build_notification_event
+from deals.signals import rescore_deals
+from deals.repricing import reprice_products
+from core.rbac import get_rbac_scope
+from core.dates import start_of_today
+from contacts.work_queue import WORK_QUEUE_BUCKETS, WORK_QUEUE_LIMIT, get_work_queue_page
+from interactions.next_contact import update_next_contact_dates
 from django.contrib.auth.models import User
+from .bulk import BulkWriteMixin
+from .filters import SearchBackendFilter
+
+
+class VisibleToMixin:
+    """Limita el queryset del viewset a lo que el usuario puede ver (RBAC, ver core/rbac.py)"""
+    
+    def get_queryset(self):
+        return super().get_queryset().visible_to(self.request.user)
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
@@ -31,36 +53,57 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['username', 'email', 'first_name', 'last_name']
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(VisibleToMixin, viewsets.ModelViewSet):
     """API endpoint para empresas"""
     queryset = Account.objects.all()
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchBackendFilter, filters.OrderingFilter]
     filterset_fields = ['industry']
     search_fields = ['name', 'industry', 'website']
     ordering_fields = ['name', 'created_at']
     ordering = ['-created_at']
 
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(VisibleToMixin, viewsets.ModelViewSet):
     """API endpoint para contactos"""
     queryset = Contact.objects.select_related('account')
     serializer_class = ContactSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchBackendFilter, filters.OrderingFilter]
     filterset_fields = ['account']
     search_fields = ['first_name', 'last_name', 'email', 'job_title']
     ordering_fields = ['first_name', 'last_name', 'created_at']
     ordering = ['first_name']
+    
+    @action(detail=False, methods=['get'])
+    def due(self, request):
+        """
+        Cola de trabajo: contactos a contactar hoy o vencidos, por lead score
+        del deal. Parámetros: bucket (due/overdue/today), cursor y limit.
+        """
+        bucket = request.query_params.get('bucket', 'due')
+        if bucket not in WORK_QUEUE_BUCKETS:
+            return Response(
+                {'error': f"bucket debe ser uno de: {', '.join(WORK_QUEUE_BUCKETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', WORK_QUEUE_LIMIT)), 100)
+        except ValueError:
+            limit = WORK_QUEUE_LIMIT
+        
+        page = get_work_queue_page(request.user, bucket, request.query_params.get('cursor'), max(limit, 1))
+        serializer = DueContactSerializer(page.items, many=True, context={'today_start': start_of_today()})
+        return Response({'next_cursor': page.next_cursor, 'results': serializer.data})
 
 
-class DealViewSet(viewsets.ModelViewSet):
+class DealViewSet(VisibleToMixin, viewsets.ModelViewSet):
     """API endpoint para tratos"""
     queryset = Deal.objects.select_related('account', 'contact', 'assigned_to')
     serializer_class = DealSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchBackendFilter, filters.OrderingFilter]
     filterset_fields = ['stage', 'account', 'assigned_to']
     search_fields = ['name', 'account__name']
     ordering_fields = ['name', 'value', 'close_date', 'created_at']
@@ -72,7 +115,7 @@ class DealViewSet(viewsets.ModelViewSet):
         stages = Deal.STAGES
         result = {}
         for stage_code, stage_name in stages:
-            deals = self.queryset.filter(stage=stage_code)
+            deals = self.get_queryset().filter(stage=stage_code)
             result[stage_code] = {
                 'name': stage_name,
                 'count': deals.count(),
@@ -84,7 +127,7 @@ class DealViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def forecast(self, request):
         """Retorna el forecast de ventas"""
-        deals = self.queryset.exclude(stage__in=['closed_won', 'closed_lost'])
+        deals = self.get_queryset().exclude(stage__in=['closed_won', 'closed_lost'])
         forecast = {
             'total_deals': deals.count(),
             'total_value': sum([deal.value for deal in deals]),
@@ -115,14 +158,40 @@ class ProductViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'sku', 'category', 'description']
     ordering_fields = ['name', 'price', 'created_at']
     ordering = ['name']
+    
+    @action(detail=False, methods=['post'])
+    def reprice(self, request):
+        """
+        Aplica una lista de precios {"prices": {sku: precio}} al catálogo y a
+        los deals abiertos (solo administradores). Con "dry_run": true solo
+        retorna el diff.
+        """
+        if not get_rbac_scope(request.user).is_administrator:
+            return Response(
+                {'error': 'Solo los administradores pueden repreciar productos'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        prices = request.data.get('prices')
+        if not isinstance(prices, dict) or not prices:
+            return Response(
+                {'error': "Se espera 'prices' como objeto {sku: precio}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        try:
+            result = reprice_products(prices, dry_run=dry_run)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'dry_run': dry_run, **result})
 
 
-class InteractionViewSet(viewsets.ModelViewSet):
+class InteractionViewSet(VisibleToMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """API endpoint para interacciones"""
     queryset = Interaction.objects.select_related('account', 'contact', 'deal', 'assigned_to')
     serializer_class = InteractionSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchBackendFilter, filters.OrderingFilter]
     filterset_fields = ['interaction_type', 'direction', 'status', 'account', 'contact', 'assigned_to']
     search_fields = ['subject', 'summary', 'description']
     ordering_fields = ['scheduled_at', 'created_at']
@@ -134,16 +203,38 @@ class InteractionViewSet(viewsets.ModelViewSet):
         from datetime import timedelta
         now = timezone.now()
         next_week = now + timedelta(days=7)
-        interactions = self.queryset.filter(
+        interactions = self.get_queryset().filter(
             scheduled_at__gte=now,
             scheduled_at__lte=next_week,
             status='scheduled'
         )
         serializer = self.get_serializer(interactions, many=True)
         return Response(serializer.data)
+    
+    def perform_bulk_side_effects(self, created, updated):
+        """
+        Timeline de las interacciones nuevas, re-scoring y próximo contacto por
+        contacto/deal afectado, tanto el actual como el anterior si cambió
+        """
+        TimelineEvent.objects.bulk_create(
+            [build_interaction_event(interaction) for interaction in created],
+            batch_size=500
+        )
+        contact_ids = {interaction.contact_id for interaction in created + updated}
+        deal_ids = {interaction.deal_id for interaction in created + updated}
+        for interaction in updated:
+            # bulk_update no reinicia el tracker: previous() es el valor anterior al lote
+            contact_ids.add(interaction.tracker.previous('contact'))
+            deal_ids.add(interaction.tracker.previous('deal'))
+        contact_ids.discard(None)
+        deal_ids.discard(None)
+        
+        rescore_deals(deal_ids)
+        update_next_contact_dates(Contact, Contact.objects.filter(pk__in=contact_ids))
+        update_next_contact_dates(Deal, Deal.objects.filter(pk__in=deal_ids))
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(VisibleToMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """API endpoint para tareas"""
     queryset = Task.objects.select_related('assigned_to', 'created_by', 'account', 'contact', 'deal')
     serializer_class = TaskSerializer
@@ -165,7 +256,7 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Retorna tareas vencidas"""
-        tasks = self.queryset.filter(
+        tasks = self.get_queryset().filter(
             status__in=['pending', 'in_progress'],
             due_date__lt=timezone.now()
         )
@@ -175,12 +266,18 @@ class TaskViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
         """Retorna tareas del usuario actual"""
-        tasks = self.queryset.filter(assigned_to=request.user)
+        tasks = self.get_queryset().filter(assigned_to=request.user)
         serializer = self.get_serializer(tasks, many=True)
         return Response(serializer.data)
+    
+    def perform_bulk_side_effects(self, created, updated):
+        """Eventos de timeline de todo el lote en un solo bulk_create"""
+        events = [build_task_event(task, created=True) for task in created]
+        events += [build_task_event(task, created=False) for task in updated]
+        TimelineEvent.objects.bulk_create(events, batch_size=500)
 
 
-class DocumentViewSet(viewsets.ModelViewSet):
+class DocumentViewSet(VisibleToMixin, viewsets.ModelViewSet):
     """API endpoint para documentos"""
     queryset = Document.objects.select_related('uploaded_by', 'account', 'contact', 'deal')
     serializer_class = DocumentSerializer
@@ -202,7 +299,7 @@ class EmailTemplateViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'subject', 'body_html']
 
 
-class EmailLogViewSet(viewsets.ReadOnlyModelViewSet):
+class EmailLogViewSet(VisibleToMixin, viewsets.ReadOnlyModelViewSet):
     """API endpoint para logs de emails (solo lectura)"""
     queryset = EmailLog.objects.select_related('template', 'sent_by', 'account', 'contact', 'deal')
     serializer_class = EmailLogSerializer
@@ -214,7 +311,7 @@ class EmailLogViewSet(viewsets.ReadOnlyModelViewSet):
     ordering = ['-created_at']
 
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(VisibleToMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """API endpoint para notificaciones"""
     queryset = Notification.objects.select_related('recipient', 'task', 'deal', 'account', 'contact')
     serializer_class = NotificationSerializer
@@ -224,13 +321,38 @@ class NotificationViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        """Solo las del usuario (RBAC) y sin las expiradas, filtrado en SQL"""
+        return super().get_queryset().active()
+    
+    def perform_bulk_side_effects(self, created, updated):
+        """Eventos de timeline de las notificaciones nuevas en un solo bulk_create"""
+        TimelineEvent.objects.bulk_create(
+            [
+                build_notification_event(notification) for notification in created
+                if notification.notification_type != 'info'
+            ],
+            batch_size=500
+        )
+        # bulk_create/bulk_update no disparan señales: invalidar contadores a mano
+        recipient_ids = {notification.recipient_id for notification in [*created, *updated]}
+        transaction.on_commit(lambda: invalidate_unread_counts(recipient_ids))
+    
     @action(detail=False, methods=['get'])
     def unread(self, request):
-        """Retorna notificaciones no leídas del usuario actual"""
-        notifications = self.queryset.filter(recipient=request.user, is_read=False)
+        """
+        Retorna notificaciones no leídas del usuario actual. Siempre desde la
+        BD: el contador en caché solo sirve para el badge (unread-count)
+        """
+        notifications = self.get_queryset().unread_for(request.user)
         serializer = self.get_serializer(notifications, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        """Número de notificaciones no leídas del usuario actual (desde caché)"""
+        return Response({'count': get_unread_count(request.user)})
+    
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Marca una notificación como leída"""
@@ -241,8 +363,41 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        """Marca todas las notificaciones del usuario como leídas"""
-        notifications = self.queryset.filter(recipient=request.user, is_read=False)
-        for notification in notifications:
-            notification.mark_as_read()
-        return Response({'status': 'success', 'count': notifications.count()})
+        """
+        Marca como leídas todas las notificaciones del usuario con un solo UPDATE.
+        Acepta 'before' (ISO 8601) para marcar solo lo recibido hasta esa fecha.
+        """
+        before = request.data.get('before') or request.query_params.get('before')
+        if before:
+            parsed = parse_datetime(str(before))
+            if parsed is None:
+                return Response(
+                    {'error': "Fecha 'before' no válida (formato ISO 8601)"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            before = min(parsed, timezone.now())
+        else:
+            before = timezone.now()
+        
+        count = Notification.objects.mark_all_read(request.user, before=before)
+        return Response({'status': 'success', 'count': count, 'read_until': before})
+    
+    @action(detail=False, methods=['post'])
+    def broadcast(self, request):
+        """
+        Envía una notificación a usuarios, grupos y/o equipos (solo administradores).
+        La escritura se hace en segundo plano; responde 202 con el número de destinatarios.
+        """
+        user = request.user
+        if not get_rbac_scope(user).is_administrator:
+            return Response(
+                {'error': 'Solo los administradores pueden enviar notificaciones masivas'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        serializer = NotificationBroadcastSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipients = notify(actor=user, **serializer.validated_data)
+        return Response({'status': 'queued', 'recipients': recipients}, status=status.HTTP_202_ACCEPTED)
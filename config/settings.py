@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # third-party apps
     'crispy_bootstrap5',
     'rest_framework',
@@ -57,6 +58,8 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notifications.context_processors.unread_notifications',
             ],
         },
     },
@@ -101,6 +105,98 @@ DATABASES = {
     }
 }
 
+# Cache
+# Con varios workers usar Redis para que los contadores sean compartidos:
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#         'LOCATION': 'redis://127.0.0.1:6379/1',
+#     }
+# }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'myway-crm',
+    }
+}
+
+# Segundos que se guarda el contador de notificaciones no leídas por usuario.
+# Solo se usa con una caché compartida (Redis...): con LocMemCache se cuenta en la BD
+NOTIFICATIONS_UNREAD_CACHE_TIMEOUT = 60 * 5
+
+# Retención de notificaciones (purge_notifications)
+# Días que se conservan las leídas / no leídas por tipo; None = sin límite
+NOTIFICATIONS_RETENTION = {
+    'default': {'read_days': 90, 'unread_days': 365},
+    'system': {'read_days': 30},
+}
+NOTIFICATIONS_RETENTION_BATCH_SIZE = 1000
+NOTIFICATIONS_RETENTION_ARCHIVE = False
+
+# Envíos masivos (notifications/fanout.py): minutos sin avance tras los que
+# resume_notification_broadcasts retoma un envío pendiente
+NOTIFICATIONS_BROADCAST_STALE_MINUTES = 10
+
+# Kanban del pipeline (deals/pipeline.py)
+PIPELINE_COLUMN_LIMIT = 20
+PIPELINE_CLOSED_WINDOW_DAYS = 90
+
+# Tareas en segundo plano (core/background.py)
+# True ejecuta las tareas en línea, útil en tests y scripts
+BACKGROUND_TASKS_SYNC = False
+BACKGROUND_MAX_WORKERS = 4
+
+# Segundos que se cachean las estadísticas del listado de interacciones sin filtros
+# (0 = sin caché; solo con una caché compartida, no con LocMemCache)
+INTERACTIONS_STATS_CACHE_TIMEOUT = 60
+# Segundos que se cachea el total del listado de contactos sin búsqueda
+# (0 = sin caché; solo con una caché compartida, no con LocMemCache)
+CONTACTS_COUNT_CACHE_TIMEOUT = 60
+# Segundos que se cachea el resumen de cada empresa (accounts/summary.py)
+# (0 = sin caché; solo con una caché compartida, no con LocMemCache)
+ACCOUNT_SUMMARY_CACHE_TIMEOUT = 60 * 5
+
+# PDFs de cotizaciones (deals/pdf.py): procesos de WeasyPrint y hojas de estilo precargadas
+QUOTE_PDF_MAX_WORKERS = 2
+QUOTE_PDF_STYLESHEETS = [BASE_DIR / 'static' / 'css' / 'quote_pdf.css']
+
+# Búsqueda (core/search.py): 'trigram' (pg_trgm), 'icontains' o None = según el motor
+SEARCH_BACKEND = None
+# Resultados por tipo en la búsqueda global (/search/)
+SEARCH_GLOBAL_LIMIT = 5
+
+# Autocompletado de la paleta de comandos (core/autocomplete.py)
+# Segundos tras los que el índice en memoria se reconstruye entero (en segundo plano)
+AUTOCOMPLETE_MAX_AGE = 60 * 5
+AUTOCOMPLETE_LIMIT = 10
+
+# Instrumentación de consultas por petición (core/middleware.py)
+QUERY_INSTRUMENTATION = DEBUG
+# 'warn' registra un aviso al superar el presupuesto, 'raise' lanza QueryBudgetExceeded (tests/CI), 'off'
+QUERY_BUDGET_MODE = 'warn'
+# Máximo de consultas por vista (ruta 'módulo.vista'); None = sin límite
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGETS = {
+    'contacts.views.contacts_list': 15,
+    'accounts.views.accounts_list': 15,
+    'interactions.views.interactions_list': 15,
+    'deals.views.pipeline_view': 20,
+}
+QUERY_SLOW_REQUEST_MS = 500
+QUERY_STATS_HISTORY = 50
+
+# Métricas de rendimiento en /metrics (core/metrics.py)
+METRICS_ENABLED = True
+# Directorio local compartido por los workers de gunicorn y los comandos, donde cada
+# proceso vuelca sus métricas (None = /metrics solo ve el proceso que lo atiende)
+METRICS_DIR = BASE_DIR / 'var' / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+# /metrics solo para staff con sesión o con 'Authorization: Bearer <METRICS_TOKEN>'
+METRICS_TOKEN = None
+# True permite leer /metrics sin autenticación (solo si el endpoint no es accesible desde fuera)
+METRICS_PUBLIC = False
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -408,3 +504,7 @@ REST_FRAMEWORK = {
     ],
 }
 
+
+# Segundos que se guarda en caché el alcance RBAC de cada usuario (core/rbac.py).
+# Solo se usa con una caché compartida (Redis...): con LocMemCache se recalcula por petición
+RBAC_SCOPE_CACHE_TIMEOUT = 60 * 5
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin, TabularInline
 from core.rbac_mixins import RBACModelAdminMixin, RestrictExportMixin
+from core.search import SearchBackendAdminMixin
 from .models import Contact
 
 
@@ -18,8 +19,8 @@ class ContactInteractionInline(TabularInline):
 
 
 @admin.register(Contact)
-class ContactAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
-    list_display = ("full_name", "account", "job_title", "email", "phone", "interaction_count")
+class ContactAdmin(RBACModelAdminMixin, RestrictExportMixin, SearchBackendAdminMixin, ModelAdmin):
+    list_display = ("full_name", "account", "job_title", "email", "phone", "interaction_count", "next_contact_at")
     list_filter = ("account",)
     search_fields = ("first_name", "last_name", "email", "account__name")
     list_select_related = ("account",)
@@ -57,7 +58,7 @@ class ContactAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
     def next_contact_date(self, obj):
         """Calcula y muestra la próxima fecha de contacto sugerida"""
         from interactions.models import Interaction
-        next_date = Interaction.calculate_next_contact_date(contact=obj)
+        next_date = obj.next_contact_at or Interaction.calculate_next_contact_date(contact=obj)
         if next_date:
             return format_html(
                 '<span style="background-color: #0ea5e9; color: white; padding: 8px 15px; '
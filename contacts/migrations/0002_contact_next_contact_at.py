@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contacts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contact',
+            name='next_contact_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Próximo contacto'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_accountvisibility'),
+        ('contacts', '0002_contact_next_contact_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['first_name', 'last_name', 'id'], name='contact_name_list_idx'),
+        ),
+    ]
@@ -1,7 +1,45 @@
+from django.apps import apps
 from django.db import models
-
-from django.db import models
+from django.db.models.functions import Coalesce
 from accounts.models import Account
+from core.dates import end_of_today
+from core.rbac import RBACQuerySet, account_visible_for
+
+class ContactQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Contactos de empresas con algún deal del usuario o de su equipo"""
+        return account_visible_for('account_id', scope)
+    
+    def due_for_contact(self, until=None):
+        """Contactos con el próximo contacto sugerido vencido o para hoy (índice next_contact_at)"""
+        return self.filter(next_contact_at__lte=until or end_of_today())
+    
+    def with_activity_counts(self):
+        """
+        Anota deals_count e interactions_count con subconsultas correlacionadas
+        (una por contacto y tabla, por índice contact_id). Dos Count() sobre
+        JOINs a la vez multiplican las filas entre sí y falsean los totales.
+        """
+        Deal = apps.get_model('deals', 'Deal')
+        Interaction = apps.get_model('interactions', 'Interaction')
+        return self.annotate(
+            deals_count=_count_by_contact(Deal),
+            interactions_count=_count_by_contact(Interaction),
+        )
+
+
+def _count_by_contact(model):
+    """COUNT(*) de las filas de model del contacto exterior, como subconsulta"""
+    counts = (
+        model.objects
+        .filter(contact_id=models.OuterRef('pk'))
+        .order_by()
+        .values('contact_id')
+        .annotate(count=models.Count('pk'))
+        .values('count')
+    )
+    return Coalesce(models.Subquery(counts, output_field=models.IntegerField()), 0)
+
 
 class Contact(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='contacts')
@@ -10,6 +48,23 @@ class Contact(models.Model):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=20, blank=True)
     job_title = models.CharField(max_length=100, blank=True)
+    
+    # Próximo contacto sugerido, precalculado (interactions/next_contact.py)
+    next_contact_at = models.DateTimeField(
+        'Próximo contacto',
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
 
+    objects = ContactQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Listado ordenado por nombre con paginación por cursor (contacts_list)
+            models.Index(fields=['first_name', 'last_name', 'id'], name='contact_name_list_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.account.name})"
\ No newline at end of file
@@ -1,3 +1,101 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Account
+from deals.models import Deal
+from interactions.models import Interaction
+from .models import Contact
+from .views import CONTACTS_PAGE_SIZE
+
+
+class ContactActivityCountsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        account = Account.objects.create(name='Acme')
+        cls.busy = Contact.objects.create(account=account, first_name='Ana', last_name='Pérez', email='ana@acme.test')
+        cls.idle = Contact.objects.create(account=account, first_name='Luis', last_name='Gil', email='luis@acme.test')
+        for index in range(2):
+            Deal.objects.create(name=f'Deal {index}', account=account, contact=cls.busy,
+                                value=Decimal('10'), assigned_to=cls.user)
+        Interaction.objects.bulk_create([
+            Interaction(interaction_type='call', subject=f'Llamada {index}', account=account, contact=cls.busy,
+                        assigned_to=cls.user, scheduled_at=timezone.now())
+            for index in range(3)
+        ])
+
+    def test_counts_are_not_multiplied_between_tables(self):
+        counts = {
+            contact.pk: (contact.deals_count, contact.interactions_count)
+            for contact in Contact.objects.with_activity_counts()
+        }
+        self.assertEqual(counts, {self.busy.pk: (2, 3), self.idle.pk: (0, 0)})
+
+
+class ContactDetailTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        account = Account.objects.create(name='Acme')
+        cls.contact = Contact.objects.create(account=account, first_name='Ana', last_name='Pérez',
+                                             email='ana@acme.test')
+        Deal.objects.create(name='Deal', account=account, contact=cls.contact, value=Decimal('10'),
+                            assigned_to=cls.user)
+        now = timezone.now()
+        Interaction.objects.bulk_create([
+            Interaction(interaction_type='call', subject=f'Llamada {days}', account=account, contact=cls.contact,
+                        assigned_to=cls.user, scheduled_at=now - timedelta(days=days))
+            for days in (2, 0, 1)
+        ])
+
+    def test_interactions_are_listed_newest_first(self):
+        self.client.force_login(self.user)
+        response = self.client.get(f'/contacts/{self.contact.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([interaction.subject for interaction in response.context['interactions']],
+                         ['Llamada 0', 'Llamada 1', 'Llamada 2'])
+
+
+class ContactsListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        account = Account.objects.create(name='Acme')
+        Contact.objects.bulk_create([
+            Contact(account=account, first_name=f'Nombre {index:02d}', last_name='X', email=f'{index}@acme.test')
+            for index in range(CONTACTS_PAGE_SIZE + 5)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_list_is_paginated_by_cursor(self):
+        first = self.client.get('/contacts/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.context['total_count'], CONTACTS_PAGE_SIZE + 5)
+        self.assertEqual(len(first.context['contacts']), CONTACTS_PAGE_SIZE)
+        self.assertTrue(first.context['page'].has_next)
+
+        second = self.client.get('/contacts/', {'cursor': first.context['page'].next_cursor})
+        names = [contact.first_name for contact in first.context['contacts'] + second.context['contacts']]
+        self.assertEqual(names, [f'Nombre {index:02d}' for index in range(CONTACTS_PAGE_SIZE + 5)])
+        self.assertFalse(second.context['page'].has_next)
+
+    def test_search_counts_only_matches(self):
+        response = self.client.get('/contacts/', {'q': 'nombre 07'})
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertEqual([contact.first_name for contact in response.context['contacts']], ['Nombre 07'])
 
-# Create your tests here.
+    def test_total_is_not_cached_per_process(self):
+        self.assertEqual(self.client.get('/contacts/').context['total_count'], CONTACTS_PAGE_SIZE + 5)
+        Contact.objects.filter(first_name='Nombre 00').delete()
+        self.assertEqual(self.client.get('/contacts/').context['total_count'], CONTACTS_PAGE_SIZE + 4)
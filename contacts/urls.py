@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('', views.contacts_list, name='contacts_list'),
+    path('due/', views.contacts_due, name='contacts_due'),
     path('<int:contact_id>/', views.contact_detail, name='contact_detail'),
 ]
@@ -1,45 +1,77 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count, Sum
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from core.caching import shared_cache_enabled
+from core.dates import start_of_today
+from core.pagination import keyset_paginate
+from core.rbac import get_rbac_scope
+from core.search import search_queryset
 from .models import Contact
+from .work_queue import WORK_QUEUE_BUCKETS, get_work_queue_page
 from deals.models import Deal
 from interactions.models import Interaction
 
+CONTACT_SEARCH_FIELDS = ['first_name', 'last_name', 'email', 'job_title', 'account__name']
+CONTACTS_PAGE_SIZE = 50
+CONTACTS_ORDERING = ['first_name', 'last_name', 'id']
+CONTACTS_COUNT_CACHE_TIMEOUT = getattr(settings, 'CONTACTS_COUNT_CACHE_TIMEOUT', 60)
+
+def cached_contact_count(user):
+    """
+    Total de contactos visibles, cacheado por alcance RBAC.
+    Solo con una caché compartida entre workers (ver core/caching.py).
+    """
+    contacts = Contact.objects.visible_to(user)
+    if not shared_cache_enabled(CONTACTS_COUNT_CACHE_TIMEOUT):
+        return contacts.count()
+
+    scope = get_rbac_scope(user)
+    key = 'contacts:count:all' if scope.sees_all else f'contacts:count:user:{scope.user_id}'
+    count = cache.get(key)
+    if count is None:
+        count = contacts.count()
+        cache.set(key, count, CONTACTS_COUNT_CACHE_TIMEOUT)
+    return count
+
 @login_required
 def contacts_list(request):
-    """Lista de todos los contactos con búsqueda"""
+    """Lista de todos los contactos con búsqueda, paginada por cursor"""
     query = request.GET.get('q', '')
     
-    contacts = Contact.objects.select_related('account').annotate(
-        deals_count=Count('deal'),
-        interactions_count=Count('interaction')
-    )
+    contacts = Contact.objects.visible_to(request.user)
     
     if query:
-        contacts = contacts.filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(email__icontains=query) |
-            Q(job_title__icontains=query) |
-            Q(account__name__icontains=query)
-        )
+        contacts = search_queryset(contacts, query, CONTACT_SEARCH_FIELDS)
+        total_count = contacts.count()
+    else:
+        total_count = cached_contact_count(request.user)
     
-    contacts = contacts.order_by('first_name', 'last_name')
+    # Los contadores se calculan solo para los contactos de la página
+    page = keyset_paginate(
+        contacts.select_related('account').with_activity_counts(),
+        CONTACTS_ORDERING,
+        CONTACTS_PAGE_SIZE,
+        request.GET.get('cursor')
+    )
     
     context = {
-        'contacts': contacts,
+        'contacts': page.items,
+        'page': page,
         'query': query,
+        'total_count': total_count,
     }
     return render(request, 'contacts/contacts_list.html', context)
 
 @login_required
 def contact_detail(request, contact_id):
     """Detalle de un contacto con sus deals e interacciones"""
-    contact = get_object_or_404(Contact.objects.select_related('account'), id=contact_id)
+    contact = get_object_or_404(Contact.objects.visible_to(request.user).select_related('account'), id=contact_id)
     
-    deals = Deal.objects.filter(contact=contact).select_related('account', 'assigned_to').order_by('-created_at')
-    interactions = Interaction.objects.filter(contact=contact).select_related('assigned_to').order_by('-date')[:20]
+    deals = Deal.objects.visible_to(request.user).filter(contact=contact).select_related('account', 'assigned_to').order_by('-created_at')
+    interactions = Interaction.objects.visible_to(request.user).filter(contact=contact).select_related('assigned_to').order_by('-scheduled_at')[:20]
     
     # Estadísticas del contacto
     total_deals = deals.count()
@@ -54,4 +86,19 @@ def contact_detail(request, contact_id):
         'won_deals': won_deals,
         'total_value': total_value,
     }
-    return render(request, 'contacts/contact_detail.html', context)
\ No newline at end of file
+    return render(request, 'contacts/contact_detail.html', context)
+
+@login_required
+def contacts_due(request):
+    """Cola de trabajo: contactos a contactar hoy o con el contacto vencido"""
+    bucket = request.GET.get('bucket', 'due')
+    if bucket not in WORK_QUEUE_BUCKETS:
+        bucket = 'due'
+    page = get_work_queue_page(request.user, bucket, cursor=request.GET.get('cursor'))
+    
+    context = {
+        'page': page,
+        'bucket': bucket,
+        'today_start': start_of_today(),
+    }
+    return render(request, 'contacts/contacts_due.html', context)
@@ -0,0 +1,60 @@
+"""
+Cola de trabajo: contactos a contactar hoy
+==========================================
+
+Lista de contactos visibles para el usuario con next_contact_at vencido
+o para hoy (precalculado, ver interactions/next_contact.py), ordenada por
+el lead score de su mejor deal abierto y luego por antigüedad del aviso.
+
+Una sola consulta por página: filtro por el índice de next_contact_at,
+el score del deal como subconsulta correlacionada y paginación por cursor.
+
+Franjas (bucket):
+- 'due':     vencidos y de hoy (por defecto)
+- 'overdue': solo vencidos (antes de hoy)
+- 'today':   solo los de hoy
+"""
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.dates import end_of_today, start_of_today
+from core.pagination import keyset_paginate
+from deals.models import Deal
+from deals.pipeline import CLOSED_STAGES
+from .models import Contact
+
+
+WORK_QUEUE_LIMIT = getattr(settings, 'CONTACTS_WORK_QUEUE_LIMIT', 25)
+WORK_QUEUE_ORDERING = ['-deal_score', 'next_contact_at', 'id']
+WORK_QUEUE_BUCKETS = ('due', 'overdue', 'today')
+
+
+def work_queue(user, bucket='due'):
+    """QuerySet de la cola del usuario, anotado con el mejor deal abierto visible"""
+    contacts = Contact.objects.visible_to(user)
+    if bucket == 'overdue':
+        contacts = contacts.filter(next_contact_at__lt=start_of_today())
+    elif bucket == 'today':
+        contacts = contacts.filter(next_contact_at__gte=start_of_today(), next_contact_at__lte=end_of_today())
+    else:
+        contacts = contacts.due_for_contact()
+    
+    top_deal = (
+        Deal.objects.visible_to(user)
+        .filter(contact_id=OuterRef('pk'))
+        .exclude(stage__in=CLOSED_STAGES)
+        .order_by('-lead_score', '-id')
+    )
+    return contacts.select_related('account').annotate(
+        # Sin deal abierto: al final de la cola (el cursor necesita un valor no nulo)
+        deal_score=Coalesce(Subquery(top_deal.values('lead_score')[:1]), Value(-1)),
+        top_deal_id=Subquery(top_deal.values('id')[:1]),
+        deal_name=Subquery(top_deal.values('name')[:1]),
+    )
+
+
+def get_work_queue_page(user, bucket='due', cursor=None, limit=None):
+    """Página de la cola de trabajo (KeysetPage)"""
+    return keyset_paginate(work_queue(user, bucket), WORK_QUEUE_ORDERING, limit or WORK_QUEUE_LIMIT, cursor)
@@ -0,0 +1,382 @@
+"""
+Autocompletado de la paleta de comandos
+=======================================
+
+Índice de prefijos en memoria (por proceso) de empresas, contactos, deals
+y productos, para saltar a cualquiera tecleando unas letras:
+
+- Claves normalizadas (minúsculas, sin acentos) en una lista ordenada:
+  la búsqueda es un bisect + recorrido de las claves con ese prefijo
+- Cada objeto se indexa por cada palabra de su nombre ('ana perez' y
+  'perez'), así 'per' encuentra a Ana Pérez
+- Se construye en la primera consulta y se mantiene al día con las señales
+  post_save/post_delete (core/signals.py) al confirmar la transacción
+- Las escrituras masivas (update, bulk_create) no emiten señales: el
+  índice se reconstruye entero cada AUTOCOMPLETE_MAX_AGE segundos, en
+  segundo plano (core/background.py) y una sola reconstrucción a la vez.
+  Mientras tanto las búsquedas usan el índice anterior, y los cambios que
+  llegan por señales durante la reconstrucción se reaplican al terminar
+
+RBAC: los productos son visibles para todos y los deals se filtran en
+memoria por vendedor asignado. Para empresas y contactos se consulta
+AccountVisibility por cada bloque de candidatos; los bloques crecen hasta
+reunir el límite de resultados visibles o agotar el prefijo (los usuarios
+que ven todo no generan ninguna consulta).
+"""
+
+import bisect
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import reverse
+
+from .background import run_in_background
+from .rbac import get_rbac_scope
+
+
+AUTOCOMPLETE_MAX_AGE = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 60 * 5)
+AUTOCOMPLETE_LIMIT = getattr(settings, 'AUTOCOMPLETE_LIMIT', 10)
+# Candidatos del primer bloque filtrado por RBAC (cada bloque siguiente dobla el anterior)
+AUTOCOMPLETE_CANDIDATES_BATCH = 500
+
+
+def normalize(text):
+    """Minúsculas, sin acentos y con espacios simples"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def index_keys(*texts):
+    """Claves de un objeto: cada texto desde el inicio de cada una de sus palabras"""
+    keys = set()
+    for text in texts:
+        words = normalize(text).split()
+        for position in range(len(words)):
+            keys.add(' '.join(words[position:]))
+    return keys
+
+
+@dataclass(frozen=True)
+class Entry:
+    """Objeto indexado"""
+    kind: str
+    id: int
+    label: str
+    keys: frozenset
+    owner_id: int = None
+    account_id: int = None
+
+    @property
+    def url(self):
+        return AUTOCOMPLETE_SOURCES[self.kind]['url'](self.id)
+
+
+def _account_entry(account):
+    return Entry('account', account.pk, account.name, frozenset(index_keys(account.name)),
+                 account_id=account.pk)
+
+
+def _contact_entry(contact):
+    label = f'{contact.first_name} {contact.last_name}'
+    return Entry('contact', contact.pk, label,
+                 frozenset(index_keys(label, contact.email.split('@')[0])),
+                 account_id=contact.account_id)
+
+
+def _deal_entry(deal):
+    return Entry('deal', deal.pk, deal.name, frozenset(index_keys(deal.name)),
+                 owner_id=deal.assigned_to_id)
+
+
+def _product_entry(product):
+    return Entry('product', product.pk, f'{product.name} ({product.sku})',
+                 frozenset(index_keys(product.name, product.sku)))
+
+
+# Tipos indexados: modelo, columnas a cargar, cómo construir la entrada y su URL.
+# Las entradas se construyen igual desde una instancia (señales) o desde una fila
+AUTOCOMPLETE_SOURCES = {
+    'account': {
+        'model': 'accounts.Account',
+        'fields': ['name'],
+        'entry': _account_entry,
+        'url': lambda pk: reverse('account_detail', args=[pk]),
+    },
+    'contact': {
+        'model': 'contacts.Contact',
+        'fields': ['first_name', 'last_name', 'email', 'account_id'],
+        'entry': _contact_entry,
+        'url': lambda pk: reverse('contact_detail', args=[pk]),
+    },
+    'deal': {
+        'model': 'deals.Deal',
+        'fields': ['name', 'assigned_to_id'],
+        'entry': _deal_entry,
+        'url': lambda pk: reverse('admin:deals_deal_change', args=[pk]),
+    },
+    'product': {
+        'model': 'deals.Product',
+        'fields': ['name', 'sku'],
+        'entry': _product_entry,
+        'url': lambda pk: reverse('admin:deals_product_change', args=[pk]),
+    },
+}
+
+
+def kind_for_model(model):
+    """Tipo del índice para un modelo (None si no se indexa)"""
+    label = model._meta.label
+    for kind, source in AUTOCOMPLETE_SOURCES.items():
+        if source['model'] == label:
+            return kind
+    return None
+
+
+class PrefixIndex:
+    """
+    Listas paralelas ordenadas por clave: _keys[i] -> _refs[i] = (tipo, id).
+    Altas y bajas con bisect; las lecturas y escrituras comparten un lock.
+
+    Durante una reconstrucción (start_rebuild() ... build()) las altas y
+    bajas se anotan además en un diario que build() reaplica sobre las
+    entradas cargadas: no se pierden los cambios posteriores a la carga.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        self._refs = []
+        self._entries = {}
+        self._journal = None
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def tracking(self):
+        """True si el índice está construido o en construcción (acepta altas y bajas)"""
+        return self.built_at is not None or self._journal is not None
+
+    def start_rebuild(self):
+        """Empieza a anotar altas y bajas antes de cargar las entradas"""
+        with self._lock:
+            self._journal = []
+
+    def abort_rebuild(self):
+        with self._lock:
+            self._journal = None
+
+    def build(self, entries):
+        """Reemplaza el contenido del índice (un solo sort) y reaplica el diario"""
+        pairs = sorted(
+            (key, (entry.kind, entry.id))
+            for entry in entries
+            for key in entry.keys
+        )
+        by_ref = {(entry.kind, entry.id): entry for entry in entries}
+        with self._lock:
+            self._keys = [key for key, _ref in pairs]
+            self._refs = [ref for _key, ref in pairs]
+            self._entries = by_ref
+            for operation, value in self._journal or ():
+                if operation == 'add':
+                    self._add_locked(value)
+                else:
+                    self._remove_locked(value)
+            self._journal = None
+            self.built_at = time.monotonic()
+
+    def _remove_locked(self, ref):
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect.bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._refs[position] == ref:
+                    del self._keys[position]
+                    del self._refs[position]
+                    break
+                position += 1
+
+    def _add_locked(self, entry):
+        ref = (entry.kind, entry.id)
+        self._remove_locked(ref)
+        self._entries[ref] = entry
+        for key in entry.keys:
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._refs.insert(position, ref)
+
+    def add(self, entry):
+        """Alta o actualización de un objeto"""
+        with self._lock:
+            self._add_locked(entry)
+            if self._journal is not None:
+                self._journal.append(('add', entry))
+
+    def remove(self, kind, pk):
+        with self._lock:
+            self._remove_locked((kind, pk))
+            if self._journal is not None:
+                self._journal.append(('remove', (kind, pk)))
+
+    def scan(self, prefix, limit, start=None, seen=frozenset()):
+        """
+        Hasta limit entradas (sin repetir ni las refs de seen) con alguna clave
+        que empieza por el prefijo, en orden de clave desde la clave start.
+        Retorna (entradas, clave desde la que seguir o None si se agotó el prefijo).
+        """
+        found = {}
+        with self._lock:
+            position = bisect.bisect_left(self._keys, start or prefix)
+            while position < len(self._keys):
+                key = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                if len(found) >= limit:
+                    return list(found.values()), key
+                ref = self._refs[position]
+                if ref not in found and ref not in seen:
+                    found[ref] = self._entries[ref]
+                position += 1
+        return list(found.values()), None
+
+    def candidates(self, prefix, limit):
+        """Entradas (sin repetir) con alguna clave que empieza por el prefijo, en orden de clave"""
+        return self.scan(prefix, limit)[0]
+
+
+_index = PrefixIndex()
+_build_lock = threading.Lock()
+# Tomado mientras una reconstrucción en segundo plano está encolada o en curso
+_rebuild_lock = threading.Lock()
+
+
+def load_entries():
+    """Todas las entradas desde la base de datos (una consulta por tipo)"""
+    entries = []
+    for source in AUTOCOMPLETE_SOURCES.values():
+        model = apps.get_model(source['model'])
+        # values(): sin instanciar modelos (ni sus trackers) por cada fila
+        rows = model._default_manager.values('pk', *source['fields']).iterator(chunk_size=5000)
+        for row in rows:
+            entries.append(source['entry'](SimpleNamespace(**row)))
+    return entries
+
+
+def build_index():
+    """Carga todas las entradas y reemplaza el contenido del índice"""
+    _index.start_rebuild()
+    try:
+        entries = load_entries()
+    except Exception:
+        _index.abort_rebuild()
+        raise
+    _index.build(entries)
+
+
+def _rebuild_in_background():
+    try:
+        build_index()
+    finally:
+        _rebuild_lock.release()
+
+
+def get_index():
+    """
+    Índice del proceso. La primera consulta lo construye (y las demás la
+    esperan); si superó AUTOCOMPLETE_MAX_AGE se reconstruye en segundo plano
+    y, mientras tanto, se sigue usando el contenido actual.
+    """
+    if _index.built_at is None:
+        with _build_lock:
+            if _index.built_at is None:
+                build_index()
+    elif time.monotonic() - _index.built_at > AUTOCOMPLETE_MAX_AGE:
+        if _rebuild_lock.acquire(blocking=False):
+            try:
+                run_in_background(_rebuild_in_background)
+            except Exception:
+                _rebuild_lock.release()
+                raise
+    return _index
+
+
+def index_object(instance):
+    """Actualiza el objeto en el índice (solo si ya está construido o en construcción)"""
+    kind = kind_for_model(type(instance))
+    if kind is not None and _index.tracking:
+        _index.add(AUTOCOMPLETE_SOURCES[kind]['entry'](instance))
+
+
+def unindex_object(model, pk):
+    kind = kind_for_model(model)
+    if kind is not None and _index.tracking:
+        _index.remove(kind, pk)
+
+
+def _visible_entries(entries, scope):
+    """Filtra las entradas por RBAC; una consulta para empresas y contactos"""
+    if scope.sees_all:
+        return entries
+
+    account_ids = {entry.account_id for entry in entries if entry.account_id is not None}
+    visible_accounts = set()
+    if account_ids:
+        AccountVisibility = apps.get_model('accounts', 'AccountVisibility')
+        visible_accounts = set(
+            AccountVisibility.objects.filter(
+                account_id__in=account_ids,
+                user_id__in=scope.team_user_ids
+            ).values_list('account_id', flat=True)
+        )
+
+    visible = []
+    for entry in entries:
+        if entry.kind == 'deal':
+            if entry.owner_id in scope.team_user_ids:
+                visible.append(entry)
+        elif entry.account_id is not None:
+            if entry.account_id in visible_accounts:
+                visible.append(entry)
+        else:
+            visible.append(entry)
+    return visible
+
+
+def autocomplete(user, query, limit=None):
+    """
+    Objetos visibles para el usuario cuyo nombre (alguna palabra) empieza
+    por la consulta. Retorna [{'type', 'id', 'label', 'url'}].
+    """
+    limit = limit or AUTOCOMPLETE_LIMIT
+    prefix = normalize(query)
+    if not prefix:
+        return []
+
+    scope = get_rbac_scope(user)
+    index = get_index()
+    # Quien ve todo no descarta candidatos: basta un bloque del tamaño del límite
+    batch_size = limit if scope.sees_all else AUTOCOMPLETE_CANDIDATES_BATCH
+    entries = []
+    seen = set()
+    start = None
+    while True:
+        batch, start = index.scan(prefix, batch_size, start, seen)
+        seen.update((entry.kind, entry.id) for entry in batch)
+        entries.extend(_visible_entries(batch, scope))
+        if len(entries) >= limit or start is None:
+            break
+        batch_size *= 2
+    return [
+        {'type': entry.kind, 'id': entry.id, 'label': entry.label, 'url': entry.url}
+        for entry in entries[:limit]
+    ]
@@ -0,0 +1,66 @@
+"""
+Tareas en segundo plano
+=======================
+
+Ejecuta trabajo pesado (fan-out de notificaciones, recálculos...) fuera del
+ciclo de la petición, en un pool de hilos del propio proceso.
+
+- on_commit_background(): encola la tarea cuando la transacción confirma,
+  así el hilo nunca ve datos sin commit ni trabaja para un rollback
+- BACKGROUND_TASKS_SYNC = True ejecuta todo en línea (tests, scripts)
+
+Cada hilo abre su propia conexión a la BD y la cierra al terminar.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_TASKS_SYNC = getattr(settings, 'BACKGROUND_TASKS_SYNC', False)
+BACKGROUND_MAX_WORKERS = getattr(settings, 'BACKGROUND_MAX_WORKERS', 4)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=BACKGROUND_MAX_WORKERS,
+                    thread_name_prefix='crm-background'
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Error en tarea en segundo plano %s', getattr(func, '__name__', func))
+        raise
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Ejecuta func(*args, **kwargs) en el pool de hilos.
+    Retorna un Future (o el resultado directo en modo síncrono).
+    """
+    if BACKGROUND_TASKS_SYNC:
+        return func(*args, **kwargs)
+    return _get_executor().submit(_run, func, args, kwargs)
+
+
+def on_commit_background(func, *args, **kwargs):
+    """Encola func en segundo plano cuando la transacción actual confirme"""
+    transaction.on_commit(lambda: run_in_background(func, *args, **kwargs))
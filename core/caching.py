@@ -0,0 +1,22 @@
+"""
+Cachés entre peticiones
+=======================
+
+Los valores derivados que se invalidan con señales (alcances RBAC,
+contadores, resúmenes) solo se guardan entre peticiones si la caché por
+defecto es compartida por todos los workers (Redis, Memcached, BD,
+ficheros). Con LocMemCache cada proceso tiene su copia: la invalidación
+solo llega al worker que atendió el cambio y los demás servirían el
+valor antiguo hasta que caduque. En ese caso se calcula en cada petición.
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def shared_cache_enabled(timeout):
+    """
+    True si se puede cachear un valor entre peticiones: timeout configurado
+    (0 lo desactiva) y caché por defecto compartida entre workers.
+    """
+    return bool(timeout) and not isinstance(caches['default'], LocMemCache)
@@ -0,0 +1,17 @@
+"""
+Utilidades de fechas en la zona horaria local
+"""
+
+from datetime import datetime, time
+
+from django.utils import timezone
+
+
+def end_of_today():
+    """Último instante de hoy, como datetime con zona horaria"""
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.max))
+
+
+def start_of_today():
+    """Inicio (00:00) de hoy, como datetime con zona horaria"""
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
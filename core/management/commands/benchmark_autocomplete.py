@@ -0,0 +1,90 @@
+"""
+Comando para comparar el autocompletado en memoria con la búsqueda del ORM
+Uso: python manage.py benchmark_autocomplete [--user USERNAME] [--queries N] [--prefix-length N]
+Toma prefijos de nombres reales y mide, por consulta, el índice de
+core/autocomplete.py frente a una consulta __icontains por modelo.
+"""
+
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from core.metrics import TimedCommand
+
+from accounts.models import Account
+from contacts.models import Contact
+from core.autocomplete import AUTOCOMPLETE_LIMIT, autocomplete, get_index, normalize
+from deals.models import Deal, Product
+
+
+def orm_search(user, query, limit=AUTOCOMPLETE_LIMIT):
+    """Búsqueda actual: una consulta icontains por modelo"""
+    results = []
+    results += Account.objects.visible_to(user).filter(name__icontains=query)[:limit]
+    results += Contact.objects.visible_to(user).filter(first_name__icontains=query)[:limit]
+    results += Contact.objects.visible_to(user).filter(last_name__icontains=query)[:limit]
+    results += Deal.objects.visible_to(user).filter(name__icontains=query)[:limit]
+    results += Product.objects.filter(name__icontains=query)[:limit]
+    return results[:limit]
+
+
+def _timings(func, user, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        func(user, query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+class Command(TimedCommand):
+    help = 'Compara la latencia del autocompletado en memoria con la búsqueda icontains del ORM'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Usuario con el que se aplica RBAC (por defecto, el primer superusuario)',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Número de consultas (por defecto: 200)',
+        )
+        parser.add_argument(
+            '--prefix-length',
+            type=int,
+            default=3,
+            help='Letras tecleadas por consulta (por defecto: 3)',
+        )
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('No se encontró el usuario')
+
+        started = time.perf_counter()
+        index = get_index()
+        build_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(f'Índice: {len(index)} objetos construidos en {build_ms:.0f} ms')
+
+        names = list(Account.objects.values_list('name', flat=True)[:1000])
+        names += list(Contact.objects.values_list('last_name', flat=True)[:1000])
+        names += list(Deal.objects.values_list('name', flat=True)[:1000])
+        prefixes = [normalize(name)[:options['prefix_length']] for name in names if normalize(name)]
+        if not prefixes:
+            raise CommandError('No hay datos con los que generar consultas')
+        queries = [random.choice(prefixes) for _ in range(options['queries'])]
+
+        for label, func in (('Índice en memoria', autocomplete), ('ORM icontains', orm_search)):
+            timings = sorted(_timings(func, user, queries))
+            p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: media {statistics.mean(timings):.3f} ms, '
+                f'p50 {statistics.median(timings):.3f} ms, p95 {p95:.3f} ms'
+            ))
@@ -0,0 +1,351 @@
+"""
+Métricas de rendimiento
+=======================
+
+Histogramas y contadores en memoria, expuestos en /metrics con el
+formato de texto de Prometheus:
+
+- crm_view_duration_seconds{view, method, status}: cada vista y acción
+  de la API (MetricsMiddleware, core/middleware.py)
+- crm_signal_receiver_duration_seconds{receiver, sender}: receptores de
+  señales decorados con @timed_receiver
+- crm_command_duration_seconds{command} y crm_command_runs_total{command,
+  status}: comandos basados en TimedCommand
+- Tramos propios con timed('nombre', etiqueta=valor) como context
+  manager o decorador, e increment() para contadores
+
+Varios workers (gunicorn): cada proceso vuelca sus métricas a un fichero
+propio en METRICS_DIR (metrics-<pid>-<inicio>.json, escritura atómica) como
+mucho cada METRICS_FLUSH_INTERVAL segundos y al salir; /metrics suma los
+ficheros de todos los procesos. El nombre incluye el instante de arranque:
+un PID reciclado no pisa el fichero de un worker anterior.
+
+Los valores son acumulados (como los contadores de Prometheus, solo
+crecen): al leer /metrics los ficheros de procesos ya terminados se suman
+a metrics-archive.json y se borran, así los totales no retroceden y el
+directorio no crece con cada worker reciclado. METRICS_DIR debe ser local
+a la máquina (la comprobación de procesos vivos usa el PID).
+"""
+
+import atexit
+import fcntl
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+METRICS_FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = '.metrics.lock'
+
+# Límites superiores de los tramos de los histogramas (segundos)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_HELP = {
+    'crm_view_duration_seconds': 'Duración de las peticiones por vista',
+    'crm_signal_receiver_duration_seconds': 'Duración de los receptores de señales',
+    'crm_command_duration_seconds': 'Duración de los comandos de gestión',
+    'crm_command_runs_total': 'Ejecuciones de comandos de gestión por resultado',
+}
+
+
+class MetricsRegistry:
+    """Contadores e histogramas por (nombre, etiquetas) de este proceso"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.reset()
+
+    def reset(self):
+        """Registro vacío con un identificador nuevo (al arrancar y tras un fork)"""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = time.monotonic()
+        self.filename = f'metrics-{os.getpid()}-{time.time_ns()}.json'
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    def increment(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {
+                    'buckets': [0] * len(self.buckets),
+                    'sum': 0.0,
+                    'count': 0,
+                }
+            for position, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][position] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        """Copia serializable: {'counters': [...], 'histograms': [...]}"""
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'histograms': [
+                    [name, list(labels), {**histogram, 'buckets': list(histogram['buckets'])}]
+                    for (name, labels), histogram in self._histograms.items()
+                ],
+            }
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush > METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Vuelca las métricas del proceso a METRICS_DIR (reemplazo atómico)"""
+        self._last_flush = time.monotonic()
+        directory = metrics_dir()
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        _write_snapshot(directory / self.filename, self.snapshot())
+
+
+def metrics_dir():
+    """Directorio compartido por los procesos (None = solo este proceso)"""
+    directory = getattr(settings, 'METRICS_DIR', None)
+    return Path(directory) if directory else None
+
+
+def _write_snapshot(path, snapshot):
+    temporary = path.with_name(f'.{path.stem}-{threading.get_ident()}.tmp')
+    temporary.write_text(json.dumps(snapshot))
+    os.replace(temporary, path)
+
+
+registry = MetricsRegistry()
+atexit.register(registry.flush)
+# Workers creados con fork (gunicorn --preload): no heredan las métricas ni el fichero del maestro
+os.register_at_fork(after_in_child=registry.reset)
+
+
+def increment(name, amount=1, **labels):
+    registry.increment(name, amount, **labels)
+
+
+def observe(name, seconds, **labels):
+    registry.observe(name, seconds, **labels)
+
+
+class timed(ContextDecorator):
+    """
+    Mide un tramo de código en el histograma 'name':
+        with timed('crm_quote_pdf_seconds', stage='render'):
+            ...
+        @timed('crm_revalue_deals_seconds')
+        def revalue_deals(...):
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self._started, **self.labels)
+        return False
+
+
+def timed_receiver(func):
+    """Decorador para receptores de señales (debajo de @receiver)"""
+    receiver_name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(sender, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(sender, **kwargs)
+        finally:
+            observe(
+                'crm_signal_receiver_duration_seconds',
+                time.perf_counter() - started,
+                receiver=receiver_name,
+                sender=getattr(sender, '__name__', str(sender)),
+            )
+    return wrapper
+
+
+class TimedCommand(BaseCommand):
+    """BaseCommand que registra la duración y el resultado de cada ejecución"""
+
+    def execute(self, *args, **options):
+        command = self.__module__.rsplit('.', 1)[-1]
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            result = super().execute(*args, **options)
+            status = 'ok'
+            return result
+        finally:
+            observe('crm_command_duration_seconds', time.perf_counter() - started, command=command)
+            increment('crm_command_runs_total', command=command, status=status)
+            registry.flush()
+
+
+def _merge(snapshots):
+    """Suma contadores e histogramas de varios procesos"""
+    counters = {}
+    histograms = {}
+    buckets = None
+    for snapshot in snapshots:
+        buckets = buckets or snapshot['buckets']
+        if snapshot['buckets'] != buckets:
+            continue
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+            total['sum'] += histogram['sum']
+            total['count'] += histogram['count']
+    return buckets or list(DEFAULT_BUCKETS), counters, histograms
+
+
+def _as_snapshot(buckets, counters, histograms):
+    """Resultado de _merge en el formato de MetricsRegistry.snapshot()"""
+    return {
+        'buckets': list(buckets),
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), histogram] for (name, labels), histogram in histograms.items()],
+    }
+
+
+def _read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _file_pid(path):
+    """PID del nombre metrics-<pid>-<inicio>.json (None para el archivo u otros)"""
+    try:
+        return int(path.stem.split('-')[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def compact_dead_processes(directory):
+    """
+    Suma los ficheros de procesos terminados a metrics-archive.json y los
+    borra. Con un lock sobre el directorio: dos lecturas simultáneas de
+    /metrics no suman dos veces el mismo fichero.
+    """
+    with open(directory / LOCK_FILE, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            dead = [
+                path for path in directory.glob('metrics-*.json')
+                if path.name != registry.filename
+                and (pid := _file_pid(path)) is not None
+                and not _process_alive(pid)
+            ]
+            if not dead:
+                return
+            archive = directory / ARCHIVE_FILE
+            snapshots = [_read_snapshot(path) for path in [archive, *dead] if path.exists()]
+            merged = _merge([snapshot for snapshot in snapshots if snapshot is not None])
+            _write_snapshot(archive, _as_snapshot(*merged))
+            for path in dead:
+                path.unlink(missing_ok=True)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def collect():
+    """Métricas de todos los procesos (METRICS_DIR) o solo de este"""
+    snapshots = [registry.snapshot()]
+    directory = metrics_dir()
+    if directory is not None and directory.is_dir():
+        compact_dead_processes(directory)
+        for path in directory.glob('metrics-*.json'):
+            if path.name == registry.filename:
+                continue
+            snapshot = _read_snapshot(path)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+    return _merge(snapshots)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def render_prometheus():
+    """Texto de exposición de Prometheus (versión 0.0.4)"""
+    buckets, counters, histograms = collect()
+    lines = []
+    described = set()
+
+    def header(name, kind):
+        if name not in described:
+            described.add(name)
+            lines.append(f'# HELP {name} {METRIC_HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f'{name}{_labels(labels)} {value}')
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(buckets, histogram['buckets']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(labels, [("le", _format_bound(bound))])} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+        lines.append(f'{name}_sum{_labels(labels)} {histogram["sum"]}')
+        lines.append(f'{name}_count{_labels(labels)} {histogram["count"]}')
+
+    return '\n'.join(lines) + '\n'
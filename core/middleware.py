@@ -0,0 +1,261 @@
+"""
+Instrumentación de peticiones
+=============================
+
+MetricsMiddleware registra la duración de cada petición por vista en el
+histograma crm_view_duration_seconds (core/metrics.py, expuesto en /metrics).
+
+QueryBudgetMiddleware mide cada petición con connection.execute_wrapper:
+
+- Número de consultas y tiempo total en base de datos
+- Consultas repetidas (N+1): se agrupan por huella (el SQL con los
+  literales sustituidos por '?') y, a partir de la segunda, se guarda el
+  punto del código del proyecto que la lanzó
+- Presupuesto por vista (QUERY_BUDGETS, por ruta 'módulo.vista': los
+  nombres de URL se repiten entre apps; QUERY_BUDGET_DEFAULT para el
+  resto): al superarlo se registra un
+  aviso o, con QUERY_BUDGET_MODE = 'raise' (tests, CI), se lanza
+  QueryBudgetExceeded
+- Peticiones lentas (QUERY_SLOW_REQUEST_MS) al log
+- Las últimas QUERY_STATS_HISTORY peticiones se consultan en JSON en
+  /debug/queries/ (solo staff); con DEBUG se añaden las cabeceras
+  X-Query-Count y X-Query-Time-Ms
+
+QUERY_INSTRUMENTATION activa el middleware (por defecto, con DEBUG).
+track_queries() sirve lo mismo como context manager para tests y scripts.
+"""
+
+import logging
+import re
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import observe
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', True)
+QUERY_INSTRUMENTATION = getattr(settings, 'QUERY_INSTRUMENTATION', settings.DEBUG)
+QUERY_BUDGET_MODE = getattr(settings, 'QUERY_BUDGET_MODE', 'warn')
+QUERY_BUDGET_DEFAULT = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+QUERY_BUDGETS = getattr(settings, 'QUERY_BUDGETS', {})
+QUERY_SLOW_REQUEST_MS = getattr(settings, 'QUERY_SLOW_REQUEST_MS', 500)
+QUERY_STATS_HISTORY = getattr(settings, 'QUERY_STATS_HISTORY', 50)
+
+PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+# Marcos de la pila que no se consideran el origen de una consulta
+IGNORED_PATHS = ('site-packages', 'dist-packages', str(Path(__file__).resolve()))
+
+_FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+_history = deque(maxlen=QUERY_STATS_HISTORY)
+_history_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """La petición superó su presupuesto de consultas (QUERY_BUDGET_MODE = 'raise')"""
+
+
+def fingerprint(sql):
+    """SQL sin literales: consultas iguales salvo por los parámetros comparten huella"""
+    for pattern, replacement in _FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def call_site():
+    """Primer marco de la pila dentro del proyecto ('ruta:línea en función')"""
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = frame.filename
+        if filename.startswith(PROJECT_ROOT) and not any(path in filename for path in IGNORED_PATHS):
+            return f'{Path(filename).relative_to(PROJECT_ROOT)}:{frame.lineno} en {frame.name}'
+    return None
+
+
+class QueryRecorder:
+    """execute_wrapper que cuenta consultas, tiempo y repeticiones"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self._record(sql)
+
+    def _record(self, sql):
+        key = fingerprint(sql)
+        entry = self.fingerprints.get(key)
+        if entry is None:
+            self.fingerprints[key] = {'count': 1, 'sites': set()}
+            return
+        entry['count'] += 1
+        # Solo las repeticiones pagan el coste de recorrer la pila
+        site = call_site()
+        if site:
+            entry['sites'].add(site)
+
+    @property
+    def duration_ms(self):
+        return round(self.duration * 1000, 2)
+
+    def duplicates(self):
+        """[{'sql', 'count', 'sites'}] de las consultas repetidas, de más a menos"""
+        repeated = [
+            {'sql': key, 'count': entry['count'], 'sites': sorted(entry['sites'])}
+            for key, entry in self.fingerprints.items()
+            if entry['count'] > 1
+        ]
+        repeated.sort(key=lambda item: -item['count'])
+        return repeated
+
+
+@contextmanager
+def track_queries(using=None):
+    """
+    Registra las consultas del bloque:
+        with track_queries() as recorder:
+            ...
+        recorder.count, recorder.duration_ms, recorder.duplicates()
+    """
+    recorder = QueryRecorder()
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+def view_path(match, method=None):
+    """
+    Ruta 'módulo.nombre' de la vista resuelta: la clase en vistas basadas en
+    clases y, en los viewsets de DRF, la clase más la acción del método
+    ('api.views.DealViewSet.list').
+    """
+    view = match.func
+    target = getattr(view, 'view_class', None) or getattr(view, 'cls', None) or view
+    qualname = getattr(target, '__qualname__', None) or type(target).__qualname__
+    path = f'{target.__module__}.{qualname}'
+    actions = getattr(view, 'actions', None)
+    if actions and method and method.lower() in actions:
+        path = f'{path}.{actions[method.lower()]}'
+    return path
+
+
+def get_query_budget(view_name):
+    """Presupuesto de la vista (por ruta 'módulo.vista') o el por defecto"""
+    return QUERY_BUDGETS.get(view_name, QUERY_BUDGET_DEFAULT)
+
+
+def recent_requests():
+    """Informes de las últimas peticiones instrumentadas, la más reciente primero"""
+    with _history_lock:
+        return list(reversed(_history))
+
+
+class QueryBudgetMiddleware:
+    """Mide las consultas de cada petición y aplica el presupuesto de su vista"""
+
+    def __init__(self, get_response):
+        if not QUERY_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with track_queries() as recorder:
+            response = self.get_response(request)
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        view_name = view_path(match, request.method) if match else None
+        budget = get_query_budget(view_name)
+        duplicates = recorder.duplicates()
+
+        report = {
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'url_name': url_name,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_time_ms': recorder.duration_ms,
+            'total_time_ms': elapsed_ms,
+            'budget': budget,
+            'duplicates': duplicates,
+        }
+        with _history_lock:
+            _history.append(report)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(recorder.count)
+            response['X-Query-Time-Ms'] = str(recorder.duration_ms)
+
+        if QUERY_SLOW_REQUEST_MS and elapsed_ms > QUERY_SLOW_REQUEST_MS:
+            logger.warning(
+                'Petición lenta %s %s: %.0f ms (%d consultas, %.0f ms en BD)',
+                request.method, request.path, elapsed_ms, recorder.count, recorder.duration_ms
+            )
+
+        if budget is not None and recorder.count > budget:
+            message = (
+                f'{request.method} {request.path} ({view_name}): {recorder.count} consultas, '
+                f'presupuesto {budget}'
+            )
+            if duplicates:
+                top = duplicates[0]
+                message += f'. Más repetida ({top["count"]}x): {top["sql"][:200]} desde {top["sites"][:3]}'
+            if QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(message)
+            if QUERY_BUDGET_MODE == 'warn':
+                logger.warning('Presupuesto de consultas superado: %s', message)
+
+        return response
+
+
+class MetricsMiddleware:
+    """Duración de cada petición por vista (ruta 'módulo.vista'), método y código de estado"""
+
+    def __init__(self, get_response):
+        if not METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            match = getattr(request, 'resolver_match', None)
+            view = view_path(match, request.method) if match else 'unresolved'
+            observe(
+                'crm_view_duration_seconds',
+                time.perf_counter() - started,
+                view=view,
+                method=request.method,
+                status=status,
+            )
@@ -0,0 +1,57 @@
+"""
+Índices GIN de trigramas (pg_trgm) para la búsqueda de core/search.py.
+
+Solo en PostgreSQL; en otros motores la migración no hace nada.
+Los índices se crean con CONCURRENTLY para no bloquear escrituras en
+tablas grandes, por eso la migración no es atómica.
+"""
+
+from django.db import migrations
+
+
+SEARCH_INDEXES = {
+    'accounts_account': ['name', 'industry', 'website'],
+    'contacts_contact': ['first_name', 'last_name', 'email', 'job_title'],
+    'deals_deal': ['name'],
+    'interactions_interaction': ['subject', 'summary'],
+}
+
+
+def _index_name(table, column):
+    return f'{table}_{column}_trgm_idx'
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCH_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {_index_name(table, column)} '
+                f'ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, columns in SEARCH_INDEXES.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {_index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0003_accountvisibility'),
+        ('contacts', '0002_contact_next_contact_at'),
+        ('deals', '0008_deal_next_contact_at'),
+        ('interactions', '0002_interaction_direction_interaction_summary_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,38 @@
+"""
+Índice GIN de trigramas para interactions.description, buscada desde la API
+(InteractionViewSet.search_fields). Igual que 0001: solo en PostgreSQL y
+con CONCURRENTLY.
+"""
+
+from django.db import migrations
+
+
+INDEX_NAME = 'interactions_interaction_description_trgm_idx'
+
+
+def create_description_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} '
+        f'ON interactions_interaction USING gin (description gin_trgm_ops)'
+    )
+
+
+def drop_description_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0001_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_description_index, drop_description_index),
+    ]
@@ -0,0 +1,100 @@
+"""
+Paginación por cursor (keyset)
+==============================
+
+En lugar de OFFSET, cada página continúa a partir de los valores de
+ordenación del último elemento de la anterior. El coste de una página
+no depende de lo lejos que esté en la lista.
+
+- ordering: campos de ordenación (o anotaciones); el último debe ser único (p. ej. 'id')
+- El cursor es un token opaco (base64 de los valores del último elemento)
+
+Uso:
+    page = keyset_paginate(qs, ['-lead_score', '-id'], limit=20, cursor=request.GET.get('cursor'))
+    page.items, page.next_cursor, page.has_next
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _split(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def encode_cursor(values):
+    """Codifica los valores de ordenación en un token para la URL"""
+    raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(model, ordering, cursor):
+    """Decodifica un cursor a valores Python; None si está vacío o no es válido"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        fields = _split(ordering)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [
+            _to_python(model, name, value)
+            for (name, _desc), value in zip(fields, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def _to_python(model, name, value):
+    """Valor de un campo del modelo; las anotaciones (p. ej. un Coalesce) se usan tal cual"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value
+    return field.to_python(value)
+
+
+def _after(ordering, values):
+    """Condición 'posterior a values' según la ordenación (comparación lexicográfica)"""
+    fields = _split(ordering)
+    condition = Q()
+    for index, (name, descending) in enumerate(fields):
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[index]})
+        for previous_index, (previous_name, _desc) in enumerate(fields[:index]):
+            step &= Q(**{previous_name: values[previous_index]})
+        condition |= step
+    return condition
+
+
+def keyset_paginate(queryset, ordering, limit, cursor=None):
+    """
+    Retorna una KeysetPage con hasta `limit` elementos a partir del cursor.
+    Los campos de ordering no deben admitir NULL.
+    """
+    values = decode_cursor(queryset.model, ordering, cursor)
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_after(ordering, values))
+
+    items = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, name) for name, _desc in _split(ordering)])
+    return KeysetPage(items=items, next_cursor=next_cursor)
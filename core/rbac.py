@@ -0,0 +1,184 @@
+"""
+Resolución de alcance RBAC
+==========================
+
+Calcula una sola vez el alcance de un usuario (rol, grupos y usuarios
+cuyo trabajo puede ver) y lo reutiliza:
+
+- Dentro de la petición: se guarda en el propio objeto user
+- Entre peticiones: en la caché, bajo una clave versionada, solo si la
+  caché es compartida por todos los workers (Redis, Memcached, BD). Con
+  LocMemCache la invalidación solo llegaría al proceso que atendió el
+  cambio y los demás conservarían permisos retirados: se recalcula en
+  cada petición
+
+Cualquier cambio en UserProfile, en los grupos o en los usuarios
+incrementa la versión global (ver core/signals.py), lo que invalida
+todos los alcances de golpe: un cambio de equipo afecta tanto al
+vendedor como a su manager.
+
+Los modelos con datos por vendedor usan un QuerySet basado en RBACQuerySet
+y exponen Model.objects.visible_to(user), que filtra en SQL (joins o EXISTS).
+
+Roles:
+- 'admin':   ve todo (superusuario, grupo Administrator o perfil manager)
+- 'manager': grupo Sales Manager, ve su equipo (usuarios que creó) y lo suyo
+- 'sales':   resto, solo sus propios registros
+"""
+
+from dataclasses import dataclass
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+from .caching import shared_cache_enabled
+
+
+RBAC_SCOPE_CACHE_TIMEOUT = getattr(settings, 'RBAC_SCOPE_CACHE_TIMEOUT', 60 * 5)
+
+ADMIN_GROUP = 'Administrator'
+MANAGER_GROUP = 'Sales Manager'
+SALES_GROUP = 'Sales Representative'
+
+_VERSION_KEY = 'rbac:scope:version'
+
+
+@dataclass(frozen=True)
+class RBACScope:
+    """Alcance precalculado de un usuario"""
+    user_id: int
+    role: str
+    is_superuser: bool
+    groups: frozenset
+    team_user_ids: frozenset
+
+    @property
+    def sees_all(self):
+        return self.role == 'admin'
+
+    @property
+    def is_administrator(self):
+        """Superusuario o grupo Administrator (permisos de edición, borrado y exportación)"""
+        return self.is_superuser or ADMIN_GROUP in self.groups
+
+    def in_group(self, name):
+        return name in self.groups
+
+    @property
+    def visible_user_ids(self):
+        """Usuarios cuyos registros puede ver (None = todos)"""
+        if self.sees_all:
+            return None
+        return self.team_user_ids
+
+
+def _get_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(_VERSION_KEY, version, None)
+    return version
+
+
+def scope_cache_enabled():
+    """Los alcances se cachean entre peticiones solo en una caché compartida"""
+    return shared_cache_enabled(RBAC_SCOPE_CACHE_TIMEOUT)
+
+
+def invalidate_rbac_scopes():
+    """Invalida los alcances en caché de todos los usuarios"""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, None)
+
+
+def _compute_scope(user):
+    from accounts.models import UserProfile
+
+    groups = frozenset(user.groups.values_list('name', flat=True))
+    profile_role = UserProfile.objects.filter(user=user).values_list('role', flat=True).first()
+
+    if user.is_superuser or ADMIN_GROUP in groups or profile_role == 'manager':
+        role = 'admin'
+    elif MANAGER_GROUP in groups:
+        role = 'manager'
+    else:
+        role = 'sales'
+
+    # Equipo: el propio usuario más, si es Sales Manager, los usuarios que creó
+    team_user_ids = frozenset({user.pk})
+    if MANAGER_GROUP in groups:
+        team_user_ids |= frozenset(
+            UserProfile.objects.filter(created_by=user).values_list('user_id', flat=True)
+        )
+
+    return RBACScope(
+        user_id=user.pk,
+        role=role,
+        is_superuser=user.is_superuser,
+        groups=groups,
+        team_user_ids=team_user_ids,
+    )
+
+
+def get_rbac_scope(user):
+    """
+    Retorna el RBACScope del usuario.
+    Una sola resolución por petición y, entre peticiones, desde la caché
+    (si es compartida, ver scope_cache_enabled).
+    """
+    scope = getattr(user, '_rbac_scope', None)
+    if scope is not None:
+        return scope
+
+    if not getattr(user, 'is_authenticated', False):
+        scope = RBACScope(None, 'sales', False, frozenset(), frozenset())
+    elif not scope_cache_enabled():
+        scope = _compute_scope(user)
+    else:
+        key = f'rbac:scope:{_get_version()}:{user.pk}'
+        scope = cache.get(key)
+        if scope is None:
+            scope = _compute_scope(user)
+            cache.set(key, scope, RBAC_SCOPE_CACHE_TIMEOUT)
+
+    user._rbac_scope = scope
+    return scope
+
+
+def account_visible_for(account_ref, scope):
+    """
+    EXISTS sobre la tabla materializada AccountVisibility: la empresa
+    referenciada tiene algún deal asignado al equipo del alcance
+    """
+    AccountVisibility = apps.get_model('accounts', 'AccountVisibility')
+    return models.Exists(
+        AccountVisibility.objects.filter(
+            account_id=models.OuterRef(account_ref),
+            user_id__in=scope.team_user_ids
+        )
+    )
+
+
+class RBACQuerySet(models.QuerySet):
+    """
+    QuerySet base para filtrado RBAC a nivel de fila.
+    Cada modelo define rbac_condition(scope) con su regla de visibilidad.
+    """
+    
+    def visible_to(self, user):
+        """Registros que el usuario puede ver según su rol"""
+        scope = get_rbac_scope(user)
+        if scope.sees_all:
+            return self
+        return self.filter(self.rbac_condition(scope))
+    
+    def rbac_condition(self, scope):
+        """
+        Condición (Q o expresión) para usuarios que no ven todo.
+        Por defecto no se ve nada: un modelo sin regla propia no expone sus filas.
+        """
+        return models.Q(pk__in=[])
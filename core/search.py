@@ -0,0 +1,212 @@
+"""
+Búsqueda unificada
+==================
+
+Un solo camino de búsqueda para las vistas HTML, el admin (search_fields),
+la API (SearchFilter) y la búsqueda global (/search/):
+
+- TrigramSearchBackend (PostgreSQL + pg_trgm): cada término debe coincidir
+  en algún campo por similitud de palabra (tolerante a erratas, operador %>)
+  o por subcadena (ILIKE directo sobre la columna: __icontains genera
+  UPPER(col) LIKE y no usa el índice); ambos usan los índices GIN gin_trgm_ops creados
+  en core/migrations/0001_search_trigram_indexes.py. Resultados ordenables
+  por relevancia (word_similarity).
+- IContainsSearchBackend: __icontains clásico, para SQLite y otros motores.
+
+Los campos de modelos relacionados ('account__name') se resuelven como
+subconsulta (account_id IN (SELECT id FROM account WHERE ...)) en lugar de
+un JOIN con OR, para que cada tabla pueda usar su propio índice.
+
+SEARCH_BACKEND = 'trigram' | 'icontains' fuerza el backend; por defecto se
+elige según el motor de la base de datos.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.db.models import CharField, Lookup, Q, TextField
+from django.db.models.functions import Greatest
+from django.urls import reverse
+
+
+SEARCH_BACKEND = getattr(settings, 'SEARCH_BACKEND', None)
+SEARCH_GLOBAL_LIMIT = getattr(settings, 'SEARCH_GLOBAL_LIMIT', 5)
+
+# Por debajo de esta longitud los trigramas no discriminan: solo subcadena
+TRIGRAM_MIN_LENGTH = 3
+
+
+class ILikeContains(Lookup):
+    """col ILIKE '%term%' sin transformar la columna (PostgreSQL, indexable con gin_trgm_ops)"""
+    lookup_name = 'ilike_contains'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [f'%{connection.ops.prep_for_like_query(value)}%']
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+# TextField no hereda de CharField: se registra en ambos
+CharField.register_lookup(ILikeContains)
+TextField.register_lookup(ILikeContains)
+
+
+class IContainsSearchBackend:
+    """Búsqueda por subcadena (sin índice en la mayoría de motores)"""
+    name = 'icontains'
+
+    def term_condition(self, field, term):
+        return Q(**{f'{field}__icontains': term})
+
+    def rank_expression(self, fields, query):
+        """Expresión de relevancia (None = sin orden por relevancia)"""
+        return None
+
+    def field_condition(self, model, field, term):
+        """
+        Condición de un término sobre un campo. Los campos relacionados se
+        convierten en una subconsulta sobre el modelo relacionado.
+        """
+        if '__' in field:
+            relation, rest = field.split('__', 1)
+            related_model = model._meta.get_field(relation).related_model
+            matches = related_model._default_manager.filter(
+                self.field_condition(related_model, rest, term)
+            ).values('pk')
+            return Q(**{f'{relation}__in': matches})
+        return self.term_condition(field, term)
+
+    def filter(self, queryset, query, fields, rank=False):
+        """
+        Filtra el queryset: cada término de la consulta debe coincidir en
+        algún campo. Con rank=True anota 'search_rank' y ordena por él.
+        """
+        terms = query.split()
+        fields = [field.lstrip('^=@$') for field in fields]
+        if not terms or not fields:
+            return queryset
+
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= self.field_condition(queryset.model, field, term)
+            queryset = queryset.filter(condition)
+
+        if rank:
+            expression = self.rank_expression(fields, query)
+            if expression is not None:
+                queryset = queryset.annotate(search_rank=expression).order_by('-search_rank', '-pk')
+        return queryset
+
+
+class TrigramSearchBackend(IContainsSearchBackend):
+    """Búsqueda difusa con pg_trgm (índices GIN gin_trgm_ops)"""
+    name = 'trigram'
+
+    def term_condition(self, field, term):
+        condition = Q(**{f'{field}__ilike_contains': term})
+        if len(term) >= TRIGRAM_MIN_LENGTH:
+            condition |= Q(**{f'{field}__trigram_word_similar': term})
+        return condition
+
+    def rank_expression(self, fields, query):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarities = [TrigramWordSimilarity(query, field) for field in fields]
+        if len(similarities) == 1:
+            return similarities[0]
+        return Greatest(*similarities)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (IContainsSearchBackend, TrigramSearchBackend)
+}
+
+
+def get_search_backend(using='default'):
+    """Backend configurado o, por defecto, trigram en PostgreSQL e icontains en el resto"""
+    name = SEARCH_BACKEND
+    if name is None:
+        name = 'trigram' if connections[using].vendor == 'postgresql' else 'icontains'
+    return BACKENDS[name]()
+
+
+def search_queryset(queryset, query, fields, rank=False):
+    """Aplica la búsqueda del backend activo al queryset"""
+    query = (query or '').strip()
+    if not query:
+        return queryset
+    return get_search_backend(queryset.db).filter(queryset, query, fields, rank=rank)
+
+
+# Búsqueda global: modelos, campos y cómo mostrar cada resultado
+GLOBAL_SEARCH_MODELS = [
+    {
+        'key': 'accounts',
+        'model': 'accounts.Account',
+        'fields': ['name', 'industry', 'website'],
+        'select_related': [],
+        'url': lambda obj: reverse('account_detail', args=[obj.pk]),
+    },
+    {
+        'key': 'contacts',
+        'model': 'contacts.Contact',
+        'fields': ['first_name', 'last_name', 'email', 'job_title'],
+        'select_related': ['account'],
+        'url': lambda obj: reverse('contact_detail', args=[obj.pk]),
+    },
+    {
+        'key': 'deals',
+        'model': 'deals.Deal',
+        'fields': ['name'],
+        'select_related': ['account'],
+        'url': lambda obj: reverse('admin:deals_deal_change', args=[obj.pk]),
+    },
+    {
+        'key': 'interactions',
+        'model': 'interactions.Interaction',
+        'fields': ['subject', 'summary'],
+        'select_related': ['account'],
+        'url': lambda obj: reverse('interaction_detail', args=[obj.pk]),
+    },
+]
+
+
+def global_search(user, query, limit=None):
+    """
+    Busca en empresas, contactos, deals e interacciones visibles para el
+    usuario. Una consulta por tipo, ordenada por relevancia.
+    Retorna {key: [{'id', 'label', 'url'}]}.
+    """
+    limit = limit or SEARCH_GLOBAL_LIMIT
+    results = {}
+    for entry in GLOBAL_SEARCH_MODELS:
+        model = apps.get_model(entry['model'])
+        queryset = model.objects.visible_to(user).select_related(*entry['select_related'])
+        matches = search_queryset(queryset, query, entry['fields'], rank=True)
+        if not matches.query.order_by:
+            matches = matches.order_by('-pk')
+        results[entry['key']] = [
+            {'id': obj.pk, 'label': str(obj), 'url': entry['url'](obj)}
+            for obj in matches[:limit]
+        ]
+    return results
+
+
+class SearchBackendAdminMixin:
+    """
+    Mixin para ModelAdmin: search_fields (y autocomplete_fields que apunten
+    a este admin) usan el backend de búsqueda en lugar de icontains con JOINs.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        search_fields = self.get_search_fields(request)
+        if not search_fields or not search_term.strip():
+            return queryset, False
+        # Campos relacionados resueltos como subconsulta: sin filas duplicadas
+        return search_queryset(queryset, search_term, search_fields), False
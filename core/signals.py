@@ -0,0 +1,60 @@
+"""
+Signals de core:
+- Invalidan los alcances RBAC en caché (core/rbac.py)
+- Mantienen al día el índice de autocompletado (core/autocomplete.py)
+"""
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from accounts.models import Account, UserProfile
+from contacts.models import Contact
+from deals.models import Deal, Product
+from .autocomplete import index_object, unindex_object
+from .rbac import invalidate_rbac_scopes
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def rbac_source_changed(sender, **kwargs):
+    """Perfil o grupo modificado: cambia el rol o el equipo de algún usuario"""
+    invalidate_rbac_scopes()
+
+
+@receiver(post_save, sender=User)
+def rbac_user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Solo invalida si puede haber cambiado is_superuser (no en cada last_login)"""
+    if created:
+        return
+    if update_fields is None or 'is_superuser' in update_fields:
+        invalidate_rbac_scopes()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def rbac_groups_changed(sender, action, **kwargs):
+    """Usuarios añadidos o quitados de grupos"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_rbac_scopes()
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Deal)
+@receiver(post_save, sender=Product)
+def autocomplete_object_saved(sender, instance, **kwargs):
+    """Alta o cambio de nombre: se reindexa al confirmar la transacción (en orden, gana la última)"""
+    transaction.on_commit(lambda: index_object(instance))
+
+
+@receiver(post_delete, sender=Account)
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Deal)
+@receiver(post_delete, sender=Product)
+def autocomplete_object_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: unindex_object(sender, pk))
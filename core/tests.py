@@ -1,3 +1,476 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.auth.models import Group, User
+from django.db import connection, transaction
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.test import TestCase, override_settings
+from django.urls import resolve
+from django.utils import timezone
+
+from accounts.models import Account, UserProfile
+from accounts.views import ACCOUNT_SEARCH_FIELDS
+from api.filters import SearchBackendFilter
+from api.urls import router
+from contacts.models import Contact
+from contacts.views import CONTACT_SEARCH_FIELDS
+from core import autocomplete as autocomplete_module, metrics, middleware
+from core.autocomplete import PrefixIndex, autocomplete
+from core.middleware import track_queries, view_path
+from core.pagination import encode_cursor, keyset_paginate
+from core.rbac import RBACQuerySet, get_rbac_scope, scope_cache_enabled
+from core.search import (
+    GLOBAL_SEARCH_MODELS, IContainsSearchBackend, SearchBackendAdminMixin, TrigramSearchBackend,
+)
+from core.transactions import on_commit_once
+from deals.models import Deal, Quote
+from documents.models import Document
+from email_templates.models import EmailLog
+from interactions.models import Interaction
+from interactions.views import INTERACTION_SEARCH_FIELDS
+from tasks.models import Task
+
+
+def search_field_sets():
+    """(origen, modelo, campos) de todos los sitios que buscan con core/search.py"""
+    sets = []
+    for prefix, viewset, _basename in router.registry:
+        if SearchBackendFilter in getattr(viewset, 'filter_backends', []):
+            model = viewset.queryset.model
+            sets.append((f'api:{prefix}', model, viewset.search_fields))
+    for model, model_admin in admin.site._registry.items():
+        if isinstance(model_admin, SearchBackendAdminMixin) and model_admin.search_fields:
+            sets.append((f'admin:{model._meta.label}', model, model_admin.search_fields))
+    for entry in GLOBAL_SEARCH_MODELS:
+        sets.append((f'global:{entry["key"]}', apps.get_model(entry['model']), entry['fields']))
+    sets += [
+        ('view:accounts', Account, ACCOUNT_SEARCH_FIELDS),
+        ('view:contacts', Contact, CONTACT_SEARCH_FIELDS),
+        ('view:interactions', Interaction, INTERACTION_SEARCH_FIELDS),
+    ]
+    return sets
+
+
+def postgresql_connection():
+    """Conexión PostgreSQL sin abrir: basta para compilar el SQL de los lookups de pg_trgm"""
+    if connection.vendor == 'postgresql':
+        return connection
+    return PostgreSQLDatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+
+
+class SearchBackendTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = Account.objects.create(name='Acme Logística', industry='technology', website='https://acme.test')
+        cls.other = Account.objects.create(name='Globex', industry='retail')
+        Contact.objects.create(account=cls.account, first_name='Ana', last_name='Pérez', email='ana@acme.test')
+
+    def test_every_search_field_set_is_known(self):
+        sources = {source for source, _model, _fields in search_field_sets()}
+        self.assertIn('api:interactions', sources)
+        self.assertIn('admin:deals.Deal', sources)
+
+    def test_icontains_backend_runs_every_search_field_set(self):
+        backend = IContainsSearchBackend()
+        for source, model, fields in search_field_sets():
+            with self.subTest(source=source):
+                queryset = backend.filter(model._default_manager.all(), 'acme ana', fields, rank=True)
+                list(queryset)
+
+    def test_trigram_backend_compiles_every_search_field_set(self):
+        backend = TrigramSearchBackend()
+        pg = postgresql_connection()
+        for source, model, fields in search_field_sets():
+            with self.subTest(source=source):
+                queryset = backend.filter(model._default_manager.all(), 'acme ana', fields, rank=True)
+                sql, params = queryset.query.get_compiler(connection=pg).as_sql()
+                self.assertIn('ILIKE', sql)
+                if connection.vendor == 'postgresql':
+                    list(queryset)
+
+    def test_trigram_backend_supports_text_fields(self):
+        queryset = TrigramSearchBackend().filter(
+            Interaction.objects.all(), 'hola mundo', ['subject', 'summary', 'description']
+        )
+        sql, _params = queryset.query.get_compiler(connection=postgresql_connection()).as_sql()
+        self.assertIn('"interactions_interaction"."description" ILIKE', sql)
+
+    def test_icontains_backend_requires_every_term(self):
+        backend = IContainsSearchBackend()
+        accounts = backend.filter(Account.objects.all(), 'acme logística', ACCOUNT_SEARCH_FIELDS)
+        self.assertEqual(list(accounts), [self.account])
+        self.assertFalse(backend.filter(Account.objects.all(), 'acme globex', ACCOUNT_SEARCH_FIELDS).exists())
+
+    def test_related_fields_match_through_subquery(self):
+        contacts = IContainsSearchBackend().filter(Contact.objects.all(), 'logística', CONTACT_SEARCH_FIELDS)
+        self.assertEqual(contacts.count(), 1)
+        self.assertNotIn('JOIN', str(contacts.query))
+
+
+class RBACScopeCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.administrators = Group.objects.create(name='Administrator')
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.user.groups.add(cls.administrators)
+
+    def scope(self):
+        # Objeto nuevo en cada "petición": sin el alcance guardado en el usuario
+        return get_rbac_scope(User.objects.get(pk=self.user.pk))
+
+    def test_process_local_cache_is_not_used(self):
+        self.assertFalse(scope_cache_enabled())
+        self.assertTrue(self.scope().sees_all)
+        self.user.groups.remove(self.administrators)
+        self.assertFalse(self.scope().sees_all)
+
+    def test_shared_cache_is_invalidated_on_group_change(self):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp(),
+        }}
+        with override_settings(CACHES=caches):
+            self.assertTrue(scope_cache_enabled())
+            self.assertTrue(self.scope().sees_all)
+            with self.assertNumQueries(1):
+                self.scope()  # solo la carga del usuario
+            self.user.groups.remove(self.administrators)
+            self.assertFalse(self.scope().sees_all)
+
+
+class MetricsViewTests(TestCase):
+
+    def test_anonymous_access_is_denied_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    def test_staff_can_read_metrics(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'x', is_staff=True))
+        self.client.get('/metrics')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('crm_view_duration_seconds_bucket{method="GET",status="200",view="core.views.metrics_view"', response.content.decode())
+
+    def test_non_staff_user_is_denied(self):
+        self.client.force_login(User.objects.create_user('ana', 'ana@example.com', 'x'))
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secreto')
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_public_metrics_setting(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class MetricsAggregationTests(TestCase):
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.override = override_settings(METRICS_DIR=self.directory)
+        self.override.enable()
+        self.addCleanup(self.override.disable)
+
+    def write(self, filename, runs):
+        snapshot = {
+            'buckets': list(metrics.DEFAULT_BUCKETS),
+            'counters': [['crm_test_runs_total', [['command', 'prueba']], runs]],
+            'histograms': [],
+        }
+        (self.directory / filename).write_text(json.dumps(snapshot))
+
+    def runs(self):
+        _buckets, counters, _histograms = metrics.collect()
+        return counters.get(('crm_test_runs_total', (('command', 'prueba'),)), 0)
+
+    def test_process_files_have_unique_names(self):
+        metrics.registry.flush()
+        self.assertTrue((self.directory / metrics.registry.filename).exists())
+        self.assertRegex(metrics.registry.filename, rf'^metrics-{os.getpid()}-\d+\.json$')
+
+    def test_collect_sums_every_process(self):
+        self.write(f'metrics-{os.getpid()}-1.json', 2)
+        self.write(f'metrics-{os.getpid()}-2.json', 3)
+        self.assertEqual(self.runs(), 5)
+
+    def test_dead_processes_are_archived_without_going_backwards(self):
+        # PID por encima del máximo de Linux: el proceso no existe
+        self.write('metrics-999999999-1.json', 4)
+        self.write(f'metrics-{os.getpid()}-1.json', 1)
+        self.assertEqual(self.runs(), 5)
+        self.assertFalse((self.directory / 'metrics-999999999-1.json').exists())
+        self.assertTrue((self.directory / metrics.ARCHIVE_FILE).exists())
+
+        self.write('metrics-999999998-1.json', 2)
+        self.assertEqual(self.runs(), 7)
+        self.assertEqual(self.runs(), 7)
+
+
+class RBACQuerySetTests(TestCase):
+
+    def test_every_scoped_model_defines_its_rule(self):
+        scoped = [
+            model for model in apps.get_models()
+            if isinstance(model._default_manager.all(), RBACQuerySet)
+        ]
+        self.assertGreaterEqual(len(scoped), 10)
+        for model in scoped:
+            with self.subTest(model=model._meta.label):
+                queryset_class = type(model._default_manager.all())
+                self.assertIsNot(queryset_class.rbac_condition, RBACQuerySet.rbac_condition)
+
+    def test_missing_rule_denies_access(self):
+        user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        Account.objects.create(name='Acme')
+        queryset = RBACQuerySet(model=Account)
+        self.assertFalse(queryset.visible_to(user).exists())
+
+
+class OnCommitOnceTests(TestCase):
+
+    def test_runs_once_per_key(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                on_commit_once('clave', lambda: calls.append('a'))
+            on_commit_once('otra', lambda: calls.append('b'))
+        self.assertEqual(calls, ['a', 'b'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            on_commit_once('clave', lambda: calls.append('a'))
+        self.assertEqual(calls, ['a', 'b', 'a'])
+
+    def test_rolled_back_savepoint_releases_the_key(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    on_commit_once('clave', lambda: calls.append('descartado'))
+                    raise ValueError
+            except ValueError:
+                pass
+            on_commit_once('clave', lambda: calls.append('confirmado'))
+        self.assertEqual(calls, ['confirmado'])
+
+
+class QueryBudgetTests(TestCase):
+
+    def test_view_path_uses_the_view_function_or_viewset_action(self):
+        self.assertEqual(view_path(resolve('/deals/pipeline/')), 'deals.views.pipeline_view')
+        self.assertEqual(view_path(resolve('/reports/pipeline/')), 'reports.views.pipeline_report')
+        self.assertEqual(view_path(resolve('/api/deals/'), 'GET'), 'api.views.DealViewSet.list')
+        self.assertEqual(view_path(resolve('/api/deals/1/'), 'PATCH'), 'api.views.DealViewSet.partial_update')
+
+    def test_track_queries_groups_repeated_queries(self):
+        account = Account.objects.create(name='Acme')
+        Contact.objects.bulk_create([
+            Contact(account=account, first_name=f'C{i}', last_name='X', email=f'{i}@acme.test') for i in range(3)
+        ])
+        with track_queries() as recorder:
+            for contact in Contact.objects.all():
+                contact.account.name
+        self.assertEqual(recorder.count, 4)
+        duplicates = recorder.duplicates()
+        self.assertEqual(duplicates[0]['count'], 3)
+        self.assertTrue(any('core/tests.py' in site for site in duplicates[0]['sites']))
+
+    def test_budget_is_looked_up_by_view_path(self):
+        with mock.patch.object(middleware, 'QUERY_BUDGETS', {'deals.views.pipeline_view': 20}):
+            self.assertEqual(middleware.get_query_budget('deals.views.pipeline_view'), 20)
+            self.assertIsNone(middleware.get_query_budget('reports.views.pipeline_report'))
+
+
+class VisibleToTests(TestCase):
+    """visible_to() de cada modelo con datos por vendedor, para cada rol"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.manager = User.objects.create_user('marta', 'marta@example.com', 'x')
+        cls.manager.groups.add(Group.objects.create(name='Sales Manager'))
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        UserProfile.objects.create(user=cls.ana, created_by=cls.manager)
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+
+        today = timezone.localdate()
+        now = timezone.now()
+        cls.objects = {}
+        for owner, name in ((cls.ana, 'Acme'), (cls.luis, 'Globex')):
+            account = Account.objects.create(name=name)
+            deal = Deal.objects.create(name=f'{name} 1', account=account, value=Decimal('10'), assigned_to=owner)
+            contact = Contact.objects.create(account=account, first_name=name, last_name='X',
+                                             email=f'{owner.username}@{name.lower()}.test')
+            rows = [
+                account,
+                deal,
+                contact,
+                Quote.objects.bulk_create([Quote(quote_number=f'Q-{name}', deal=deal, account=account,
+                                                 title=name, issue_date=today, valid_until=today)])[0],
+                Task.objects.bulk_create([Task(title=name, assigned_to=owner, due_date=now)])[0],
+                Interaction.objects.bulk_create([Interaction(interaction_type='call', subject=name, account=account,
+                                                             assigned_to=owner, scheduled_at=now)])[0],
+                Document.objects.bulk_create([Document(name=name, document_type='contract', file='documents/x.pdf',
+                                                       uploaded_by=owner)])[0],
+                EmailLog.objects.bulk_create([EmailLog(to_email='a@b.test', from_email='c@d.test', subject=name,
+                                                       sent_by=owner)])[0],
+            ]
+            for row in rows:
+                cls.objects.setdefault(type(row), {})[owner.username] = row.pk
+
+    def assertVisible(self, user, *owners):
+        for model, pks in self.objects.items():
+            with self.subTest(model=model._meta.label, user=user.username):
+                visible = set(model.objects.visible_to(user).values_list('pk', flat=True))
+                self.assertEqual(visible, {pks[owner] for owner in owners})
+
+    def test_sales_users_see_only_their_own_rows(self):
+        self.assertVisible(self.ana, 'ana')
+        self.assertVisible(self.luis, 'luis')
+
+    def test_managers_see_their_team(self):
+        self.assertVisible(self.manager, 'ana')
+
+    def test_administrators_see_everything(self):
+        self.assertVisible(self.admin, 'ana', 'luis')
+
+    def test_reassigning_a_deal_moves_account_visibility(self):
+        deal = Deal.objects.get(pk=self.objects[Deal]['luis'])
+        deal.assigned_to = self.ana
+        deal.save()
+        accounts = set(Account.objects.visible_to(self.ana).values_list('name', flat=True))
+        self.assertEqual(accounts, {'Acme', 'Globex'})
+        self.assertFalse(Account.objects.visible_to(self.luis).exists())
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Account.objects.bulk_create([Account(name=name) for name in 'CABACBDAE'])
+
+    def walk(self, ordering, limit):
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(Account.objects.all(), ordering, limit, cursor)
+            pages.append([account.pk for account in page.items])
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_the_ordering_without_gaps_or_repeats(self):
+        for ordering in (['name', 'id'], ['-name', 'id'], ['-name', '-id']):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(ordering, 4)
+                expected = list(Account.objects.order_by(*ordering).values_list('pk', flat=True))
+                self.assertEqual([pk for page in pages for pk in page], expected)
+                self.assertEqual([len(page) for page in pages], [4, 4, 1])
+
+    def test_cursor_survives_deleted_rows(self):
+        first = keyset_paginate(Account.objects.all(), ['name', 'id'], 3)
+        Account.objects.filter(pk=first.items[-1].pk).delete()
+        second = keyset_paginate(Account.objects.all(), ['name', 'id'], 3, first.next_cursor)
+        expected = list(Account.objects.order_by('name', 'id').values_list('pk', flat=True)[2:5])
+        self.assertEqual([account.pk for account in second.items], expected)
+
+    def test_invalid_cursor_restarts_from_the_first_page(self):
+        for cursor in ('no-es-un-cursor', encode_cursor(['A'])):
+            with self.subTest(cursor=cursor):
+                page = keyset_paginate(Account.objects.all(), ['name', 'id'], 2, cursor)
+                self.assertEqual(page.items, list(Account.objects.order_by('name', 'id')[:2]))
+
+    def test_last_page_has_no_cursor(self):
+        page = keyset_paginate(Account.objects.all(), ['name', 'id'], 9)
+        self.assertEqual(len(page.items), 9)
+        self.assertIsNone(page.next_cursor)
+
+
+class AutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        acme = Account.objects.create(name='Acme Perfumes')
+        globex = Account.objects.create(name='Globex')
+        Deal.objects.create(name='Renovación Acme', account=acme, value=Decimal('10'), assigned_to=cls.ana)
+        Deal.objects.create(name='Renovación Globex', account=globex, value=Decimal('10'), assigned_to=cls.luis)
+        Contact.objects.create(account=acme, first_name='Ana', last_name='Pérez', email='ana.perez@acme.test')
+        Contact.objects.create(account=globex, first_name='Pedro', last_name='Peralta', email='pp@globex.test')
+
+    def setUp(self):
+        for name, value in (('_index', PrefixIndex()), ('_rebuild_lock', threading.Lock())):
+            patcher = mock.patch.object(autocomplete_module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def labels(self, user, query, limit=None):
+        return sorted(result['label'] for result in autocomplete(user, query, limit))
+
+    def test_matches_any_word_without_accents(self):
+        self.assertEqual(self.labels(self.admin, 'per'), ['Acme Perfumes', 'Ana Pérez', 'Pedro Peralta'])
+        self.assertEqual(self.labels(self.admin, 'RENOVACION g'), ['Renovación Globex'])
+
+    def test_results_are_filtered_by_rbac(self):
+        self.assertEqual(self.labels(self.ana, 'per'), ['Acme Perfumes', 'Ana Pérez'])
+        self.assertEqual(self.labels(self.luis, 'renov'), ['Renovación Globex'])
+
+    def test_limit(self):
+        self.assertEqual(len(autocomplete(self.admin, 'per', limit=2)), 2)
+
+    def test_rbac_keeps_scanning_past_hidden_candidates(self):
+        # 'peralta' (Globex, no visible para Ana) es el primer candidato
+        with mock.patch.object(autocomplete_module, 'AUTOCOMPLETE_CANDIDATES_BATCH', 1):
+            self.assertEqual(self.labels(self.ana, 'per'), ['Acme Perfumes', 'Ana Pérez'])
+            self.assertEqual(self.labels(self.ana, 'per', limit=1), ['Ana Pérez'])
+
+    def test_stale_index_is_served_while_rebuilding_in_background(self):
+        autocomplete(self.admin, 'x')
+        Account.objects.bulk_create([Account(name='Initech')])  # sin señales
+        with mock.patch.object(autocomplete_module, 'AUTOCOMPLETE_MAX_AGE', 0), \
+                mock.patch.object(autocomplete_module, 'run_in_background') as run_in_background:
+            self.assertEqual(self.labels(self.admin, 'initech'), [])
+            self.assertEqual(self.labels(self.admin, 'initech'), [])
+        # Una sola reconstrucción encolada aunque lleguen varias búsquedas
+        run_in_background.assert_called_once()
+        rebuild, = run_in_background.call_args.args
+        rebuild()
+        self.assertEqual(self.labels(self.admin, 'initech'), ['Initech'])
+        self.assertFalse(autocomplete_module._rebuild_lock.locked())
+
+    def test_changes_during_a_rebuild_are_kept(self):
+        autocomplete(self.admin, 'x')
+        index = autocomplete_module._index
+        index.start_rebuild()
+        entries = autocomplete_module.load_entries()
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.create(name='Initech')
+        with self.captureOnCommitCallbacks(execute=True):
+            Account.objects.get(name='Globex').delete()
+        index.build(entries)
+        self.assertEqual(self.labels(self.admin, 'initech'), ['Initech'])
+        self.assertEqual(self.labels(self.admin, 'globex'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        autocomplete(self.admin, 'x')  # construye el índice
+        with self.captureOnCommitCallbacks(execute=True):
+            account = Account.objects.create(name='Initech')
+        self.assertEqual(self.labels(self.admin, 'initech'), ['Initech'])
+        with self.captureOnCommitCallbacks(execute=True):
+            account.name = 'Umbrella'
+            account.save()
+        self.assertEqual(self.labels(self.admin, 'initech'), [])
+        self.assertEqual(self.labels(self.admin, 'umbr'), ['Umbrella'])
+        with self.captureOnCommitCallbacks(execute=True):
+            account.delete()
+        self.assertEqual(self.labels(self.admin, 'umbr'), [])
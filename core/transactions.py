@@ -0,0 +1,53 @@
+"""
+Utilidades de transacciones
+===========================
+
+on_commit_once(): registra un callback para cuando la transacción actual
+confirme, pero una sola vez por clave. Sirve para agrupar recálculos que
+disparan muchas escrituras de la misma transacción (p. ej. guardar 50
+líneas de una cotización en un formset recalcula sus totales una vez).
+
+- Fuera de un bloque atómico el callback se ejecuta en el acto
+- Si la transacción (o el savepoint que lo registró) hace rollback, el
+  callback se descarta y la clave puede volver a registrarse
+
+Las claves pendientes se guardan en la conexión (una por hilo) con una
+referencia débil al callback: el propio callback borra su clave al
+ejecutarse y, si un rollback lo descarta, Django suelta la última
+referencia y la clave queda libre.
+"""
+
+import weakref
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+def _pending(connection):
+    pending = getattr(connection, '_on_commit_once', None)
+    if pending is None:
+        pending = connection._on_commit_once = {}
+    return pending
+
+
+def on_commit_once(key, func, using=None):
+    """
+    Ejecuta func() al confirmar la transacción, como mucho una vez por
+    clave dentro de la misma transacción.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if not connection.in_atomic_block:
+        func()
+        return
+
+    pending = _pending(connection)
+    scheduled = pending.get(key)
+    # Sigue registrado mientras no se haya descartado por un rollback
+    if scheduled is not None and scheduled() is not None:
+        return
+
+    def callback():
+        pending.pop(key, None)
+        func()
+
+    pending[key] = weakref.ref(callback)
+    transaction.on_commit(callback, using=using)
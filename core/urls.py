@@ -3,4 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard_index, name='dashboard'),
+    path('search/', views.search_view, name='global_search'),
+    path('search/autocomplete/', views.autocomplete_view, name='autocomplete'),
+    path('debug/queries/', views.query_stats_view, name='query_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
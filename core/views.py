@@ -1,8 +1,15 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.db.models import Sum, Count, F, DecimalField, Case, When
 from django.db.models.functions import Coalesce
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.conf import settings
 from deals.models import Deal
+from .autocomplete import autocomplete
+from .metrics import render_prometheus
+from .middleware import recent_requests
+from .search import global_search
 
 def dashboard_index(request):
     """Dashboard principal - muestra landing si no está autenticado"""
@@ -15,18 +22,21 @@ def dashboard_index(request):
 def dashboard_view(request):
     """Dashboard principal con estadísticas y forecasting"""
     
+    # Solo los deals visibles para el usuario (RBAC)
+    deals = Deal.objects.visible_to(request.user)
+    
     # Deals activos (no cerrados perdidos)
-    active_deals = Deal.objects.exclude(stage='closed_lost')
+    active_deals = deals.exclude(stage='closed_lost')
     
     # Estadísticas básicas
-    total_revenue = Deal.objects.filter(stage='closed_won').aggregate(
+    total_revenue = deals.filter(stage='closed_won').aggregate(
         Sum('value'))['value__sum'] or 0
-    total_deals = Deal.objects.count()
+    total_deals = deals.count()
     active_deals_count = active_deals.count()
     
     # Win rate
-    closed_deals = Deal.objects.filter(stage__in=['closed_won', 'closed_lost']).count()
-    won_deals = Deal.objects.filter(stage='closed_won').count()
+    closed_deals = deals.filter(stage__in=['closed_won', 'closed_lost']).count()
+    won_deals = deals.filter(stage='closed_won').count()
     win_rate = (won_deals / closed_deals * 100) if closed_deals > 0 else 0
     
     # FORECASTING: Valor nominal vs valor ponderado por etapa
@@ -38,7 +48,7 @@ def dashboard_view(request):
         if stage_key == 'closed_lost':
             continue  # No contamos deals perdidos en forecasting
             
-        deals_in_stage = Deal.objects.filter(stage=stage_key)
+        deals_in_stage = deals.filter(stage=stage_key)
         count = deals_in_stage.count()
         nominal_value = deals_in_stage.aggregate(Sum('value'))['value__sum'] or 0
         
@@ -82,6 +92,68 @@ def dashboard_view(request):
     }
     return render(request, 'core/dashboard.html', context)
 
+
+@login_required
+def search_view(request):
+    """Búsqueda global (JSON): empresas, contactos, deals e interacciones visibles"""
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'query': query, 'results': {}})
+    return JsonResponse({'query': query, 'results': global_search(request.user, query)})
+
+
+AUTOCOMPLETE_TYPE_LABELS = {
+    'account': 'Empresa',
+    'contact': 'Contacto',
+    'deal': 'Deal',
+    'product': 'Producto',
+}
+
+
+@login_required
+def autocomplete_view(request):
+    """
+    Paleta de comandos: objetos cuyo nombre empieza por lo tecleado
+    (índice en memoria, core/autocomplete.py). HTML para HTMX, JSON si no.
+    """
+    query = request.GET.get('q', '').strip()
+    results = autocomplete(request.user, query)
+    if request.htmx:
+        for item in results:
+            item['type_label'] = AUTOCOMPLETE_TYPE_LABELS[item['type']]
+        return render(request, 'core/partials/autocomplete_results.html', {
+            'query': query,
+            'results': results,
+        })
+    return JsonResponse({'query': query, 'results': results})
+
+@staff_member_required
+def query_stats_view(request):
+    """Consultas SQL de las últimas peticiones (core/middleware.py), para depurar N+1"""
+    requests = recent_requests()
+    if request.GET.get('over_budget'):
+        requests = [
+            item for item in requests
+            if item['budget'] is not None and item['queries'] > item['budget']
+        ]
+    return JsonResponse({'requests': requests})
+
+def metrics_view(request):
+    """
+    Métricas en formato de texto de Prometheus (core/metrics.py).
+    Acceso: staff con sesión, 'Authorization: Bearer <METRICS_TOKEN>' o,
+    solo si METRICS_PUBLIC = True, cualquiera.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    allowed = (
+        getattr(settings, 'METRICS_PUBLIC', False)
+        or (token and request.headers.get('Authorization') == f'Bearer {token}')
+        or (request.user.is_active and request.user.is_staff)
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 #  EL ERROR DE WEASYPRINT
 # def export_dashboard_pdf(request):
-#     pass
\ No newline at end of file
+#     pass
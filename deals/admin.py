@@ -1,8 +1,10 @@
 from django.contrib import admin
+from django.urls import reverse
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin, TabularInline
 from simple_history.admin import SimpleHistoryAdmin
 from core.rbac_mixins import RBACModelAdminMixin, RestrictExportMixin
+from core.search import SearchBackendAdminMixin
 from .models import Deal, Product, DealProduct, Quote, QuoteItem
 
 
@@ -33,7 +35,7 @@ class DealInteractionInline(TabularInline):
 
 
 @admin.register(Deal)
-class DealAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin, SimpleHistoryAdmin):
+class DealAdmin(RBACModelAdminMixin, RestrictExportMixin, SearchBackendAdminMixin, ModelAdmin, SimpleHistoryAdmin):
     list_display = (
         "name", 
         "account", 
@@ -42,7 +44,8 @@ class DealAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin, SimpleHist
         "stage", 
         "lead_score_display",
         "assigned_to", 
-        "expected_close_date"
+        "expected_close_date",
+        "next_contact_at"
     )
     list_filter = ("stage", "account", "assigned_to", "lead_score")
     search_fields = ("name", "account__name")
@@ -72,7 +75,7 @@ class DealAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin, SimpleHist
     def next_contact_date(self, obj):
         """Calcula y muestra la próxima fecha de contacto sugerida para este deal"""
         from interactions.models import Interaction
-        next_date = Interaction.calculate_next_contact_date(deal=obj)
+        next_date = obj.next_contact_at or Interaction.calculate_next_contact_date(deal=obj)
         if next_date:
             return format_html(
                 '<div style="background: linear-gradient(135deg, #0ea5e9 0%, #0284c7 100%); '
@@ -209,7 +212,8 @@ class QuoteAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
         'total_display',
         'issue_date',
         'valid_until',
-        'expired_badge'
+        'expired_badge',
+        'pdf_link'
     )
     list_filter = ('status', 'issue_date', 'valid_until')
     search_fields = ('quote_number', 'title', 'account__name', 'contact__first_name', 'contact__last_name')
@@ -237,6 +241,11 @@ class QuoteAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
     )
     readonly_fields = ('subtotal', 'tax_amount', 'discount_amount', 'total', 'sent_at', 'viewed_at', 'accepted_at')
     
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Un solo recálculo al confirmar, aunque el formset guarde muchas líneas
+        form.instance.recalculate_on_commit()
+    
     def status_badge(self, obj):
         colors = {
             'draft': '#64748b',
@@ -259,13 +268,18 @@ class QuoteAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
     total_display.short_description = 'Total'
     
     def expired_badge(self, obj):
-        if obj.is_expired():
+        # Estado mantenido por el comando expire_quotes, sin calcular fila a fila
+        if obj.status == 'expired':
             return format_html(
                 '<span style="background-color: #ef4444; color: white; padding: 3px 8px; '
                 'border-radius: 10px; font-size: 11px; font-weight: 600;">⚠️ EXPIRADA</span>'
             )
         return '-'
     expired_badge.short_description = 'Estado'
+    
+    def pdf_link(self, obj):
+        return format_html('<a href="{}" target="_blank">📕 PDF</a>', reverse('quote_pdf', args=[obj.pk]))
+    pdf_link.short_description = 'PDF'
 
 
 @admin.register(QuoteItem)
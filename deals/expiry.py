@@ -0,0 +1,61 @@
+"""
+Expiración de cotizaciones
+==========================
+
+Barrido periódico (comando expire_quotes) que pasa a 'expired' todas las
+cotizaciones abiertas (borrador, enviada, vista) con valid_until vencido:
+
+- Un único UPDATE apoyado en el índice parcial quote_open_valid_until_idx
+- Un solo evento de timeline con el resumen de la ejecución, no uno por
+  cotización (el UPDATE no dispara post_save)
+
+Así el admin y los reportes filtran por status='expired' en lugar de
+evaluar Quote.is_expired() fila a fila.
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Quote
+
+
+def expire_quotes(today=None, dry_run=False):
+    """
+    Expira las cotizaciones vencidas.
+    Retorna {'expired', 'by_status', 'seconds'}.
+    """
+    from timeline.models import TimelineEvent
+
+    started = time.monotonic()
+    today = today or timezone.localdate()
+    overdue = Quote.objects.overdue(today)
+
+    # Desglose por estado previo para el resumen (una consulta agregada)
+    by_status = dict(
+        overdue.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total')
+    )
+
+    expired = sum(by_status.values())
+    if not dry_run and expired:
+        with transaction.atomic():
+            expired = Quote.objects.expire_overdue(today)
+            TimelineEvent.create_event(
+                event_type='quote',
+                action='expired',
+                title=f"Cotizaciones expiradas: {expired}",
+                description=f"Cotizaciones abiertas con validez anterior al {today:%d/%m/%Y}",
+                metadata={
+                    'expired': expired,
+                    'by_status': by_status,
+                    'date': today.isoformat(),
+                }
+            )
+
+    return {
+        'expired': expired,
+        'by_status': by_status,
+        'seconds': round(time.monotonic() - started, 3),
+    }
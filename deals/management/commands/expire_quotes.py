@@ -0,0 +1,36 @@
+"""
+Comando para expirar las cotizaciones abiertas con validez vencida
+Uso: python manage.py expire_quotes [--dry-run]
+Programarlo periódicamente (cron), p. ej. una vez al día tras la medianoche.
+"""
+
+from core.metrics import TimedCommand
+from deals.expiry import expire_quotes
+
+
+class Command(TimedCommand):
+    help = 'Pasa a "expirada" las cotizaciones abiertas con valid_until vencido'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo contar las cotizaciones que expirarían',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.WARNING(
+            'Buscando cotizaciones vencidas...' if dry_run else 'Expirando cotizaciones vencidas...'
+        ))
+        
+        result = expire_quotes(dry_run=dry_run)
+        
+        self.stdout.write('')
+        for status, total in sorted(result['by_status'].items()):
+            self.stdout.write(f'   {status}: {total}')
+        
+        verb = 'expirarían' if dry_run else 'expiradas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['expired']} cotizaciones {verb} en {result['seconds']}s"
+        ))
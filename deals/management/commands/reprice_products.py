@@ -0,0 +1,68 @@
+"""
+Comando para aplicar una lista de precios al catálogo y a los deals abiertos
+Uso: python manage.py reprice_products precios.csv [--dry-run] [--report diff.csv]
+El CSV debe tener las columnas 'sku' y 'unit_price'.
+"""
+
+import sys
+
+from django.core.management.base import CommandError
+from core.metrics import TimedCommand
+from deals.repricing import PriceListError, load_price_list, reprice_products, write_diff_report
+
+
+class Command(TimedCommand):
+    help = 'Reprecia productos y líneas de deals abiertos desde un CSV (sku, unit_price)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('price_list', help='Ruta del CSV con la lista de precios')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo calcular el diff, sin escribir nada',
+        )
+        parser.add_argument(
+            '--report',
+            help="Ruta donde escribir el diff en CSV ('-' para la salida estándar)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='SKUs por bloque',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['price_list'], newline='', encoding='utf-8-sig') as file:
+                prices = load_price_list(file)
+        except OSError as e:
+            raise CommandError(f'No se pudo leer la lista de precios: {e}')
+        except PriceListError as e:
+            raise CommandError(f'Lista de precios no válida:\n{e}')
+        
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.WARNING(
+            f'Calculando diff de {len(prices)} SKUs...' if dry_run else f'Repreciando {len(prices)} SKUs...'
+        ))
+        
+        result = reprice_products(prices, dry_run=dry_run, batch_size=options['batch_size'])
+        
+        report = options['report']
+        if report == '-':
+            write_diff_report(result['diff'], sys.stdout)
+        elif report:
+            with open(report, 'w', newline='', encoding='utf-8') as file:
+                write_diff_report(result['diff'], file)
+            self.stdout.write(f'Diff escrito en {report}')
+        
+        if result['unknown_skus']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(result['unknown_skus'])} SKUs no existen en el catálogo: "
+                f"{', '.join(result['unknown_skus'][:20])}"
+            ))
+        
+        verb = 'cambiarían' if dry_run else 'actualizados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['products']} productos, {result['lines']} líneas y "
+            f"{result['deals']} deals {verb} en {result['seconds']}s"
+        ))
@@ -3,13 +3,13 @@ Comando para recalcular el Lead Score de todos los Deals
 Uso: python manage.py update_lead_scores
 """
 
-from django.core.management.base import BaseCommand
+from core.metrics import TimedCommand
 from django.utils import timezone
 from deals.models import Deal
 from deals.signals import calculate_lead_score
 
 
-class Command(BaseCommand):
+class Command(TimedCommand):
     help = 'Recalcula el Lead Score de todos los deals existentes'
 
     def add_arguments(self, parser):
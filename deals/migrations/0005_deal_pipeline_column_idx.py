@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_accountvisibility'),
+        ('contacts', '0001_initial'),
+        ('deals', '0004_quote_quoteitem_quote_deals_quote_status_f33c56_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deal',
+            index=models.Index(fields=['stage', '-lead_score', '-id'], name='deal_pipeline_column_idx'),
+        ),
+    ]
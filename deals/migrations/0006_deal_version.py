@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0005_deal_pipeline_column_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='version',
+            field=models.PositiveIntegerField(default=1, verbose_name='Versión'),
+        ),
+    ]
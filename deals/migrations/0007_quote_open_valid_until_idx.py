@@ -0,0 +1,21 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_accountvisibility'),
+        ('contacts', '0001_initial'),
+        ('deals', '0006_deal_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(condition=models.Q(('status__in', ('draft', 'sent', 'viewed'))), fields=['valid_until'], name='quote_open_valid_until_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0007_quote_open_valid_until_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='next_contact_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Próximo contacto'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0008_deal_next_contact_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quote',
+            name='pdf_checksum',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='Checksum del PDF'),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='pdf_error',
+            field=models.TextField(blank=True, editable=False, verbose_name='Error del PDF'),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='pdf_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Generando'), ('ready', 'Generado'), ('failed', 'Error')], max_length=10, verbose_name='Estado del PDF'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:47
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_closed_at(apps, schema_editor):
+    """Los deals ya cerrados toman updated_at como la mejor aproximación disponible"""
+    Deal = apps.get_model('deals', 'Deal')
+    Deal.objects.filter(stage__in=['closed_won', 'closed_lost']).update(closed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0009_quote_pdf_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deal',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Cerrado el'),
+        ),
+        migrations.RunPython(backfill_closed_at, migrations.RunPython.noop),
+    ]
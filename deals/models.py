@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models.functions import Round
 from django.contrib.auth.models import User
 from django.utils import timezone
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 from model_utils import FieldTracker
 from accounts.models import Account
 from contacts.models import Contact
+from core.rbac import RBACQuerySet
+from core.dates import end_of_today
+from core.transactions import on_commit_once
 
 
 class Product(models.Model):
@@ -50,6 +54,31 @@ class Product(models.Model):
         return f"{self.name} ({self.sku})"
 
 
+# Factor de porcentaje como literal numeric: discount_percent * 0.01 en lugar de / 100
+PERCENT = models.Value(Decimal('0.01'))
+
+
+def deal_product_total_expression():
+    """Total de un DealProduct en SQL: cantidad x precio con el descuento aplicado, a 2 decimales"""
+    return Round(
+        models.ExpressionWrapper(
+            models.F('quantity') * models.F('unit_price') * (1 - models.F('discount_percent') * PERCENT),
+            output_field=models.DecimalField(max_digits=15, decimal_places=4)
+        ),
+        2
+    )
+
+
+class DealQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Deals asignados al usuario o a su equipo"""
+        return models.Q(assigned_to_id__in=scope.team_user_ids)
+    
+    def due_for_contact(self, until=None):
+        """Deals con el próximo contacto sugerido vencido o para hoy (índice next_contact_at)"""
+        return self.filter(next_contact_at__lte=until or end_of_today())
+
+
 class Deal(models.Model):
     STAGES = [
         ('prospecting', 'Prospección'),
@@ -65,6 +94,16 @@ class Deal(models.Model):
         'closed_won': 1.00,     # 100% (ya cerrado)
         'closed_lost': 0.00,    # 0% (perdido)
     }
+    
+    # Transiciones de etapa permitidas en el pipeline (origen -> destinos)
+    STAGE_TRANSITIONS = {
+        'prospecting': {'negotiation', 'closed_won', 'closed_lost'},
+        'negotiation': {'prospecting', 'closed_won', 'closed_lost'},
+        'closed_won': {'negotiation'},
+        'closed_lost': {'prospecting', 'negotiation'},
+    }
+    
+    CLOSED_STAGES = ('closed_won', 'closed_lost')
 
     name = models.CharField(max_length=255)
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='deals')
@@ -104,17 +143,60 @@ class Deal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     
+    # Próximo contacto sugerido, precalculado (interactions/next_contact.py)
+    next_contact_at = models.DateTimeField(
+        'Próximo contacto',
+        null=True,
+        blank=True,
+        db_index=True,
+        editable=False
+    )
+    
+    # Momento en que pasó a una etapa cerrada (ventana del Kanban, deals/pipeline.py)
+    closed_at = models.DateTimeField('Cerrado el', null=True, blank=True, editable=False)
+    
+    # Control de concurrencia optimista: se incrementa en cada guardado
+    version = models.PositiveIntegerField('Versión', default=1)
+    
     # Tracker para detectar cambios en campos
-    tracker = FieldTracker(fields=['stage', 'value'])
+    tracker = FieldTracker(fields=['stage', 'value', 'assigned_to', 'account'])
+    
+    objects = DealQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'Trato'
         verbose_name_plural = 'Tratos'
         ordering = ['-lead_score', '-created_at']
+        indexes = [
+            # Columnas del Kanban (deals/pipeline.py)
+            models.Index(fields=['stage', '-lead_score', '-id'], name='deal_pipeline_column_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.value}"
     
+    def save(self, *args, **kwargs):
+        """
+        Incrementa la versión en cada guardado (ver deals/pipeline.py:move_deal_stage)
+        y fija closed_at cuando cambia la etapa.
+        """
+        update_fields = kwargs.get('update_fields')
+        stage_saved = update_fields is None or 'stage' in update_fields
+        if stage_saved and (not self.pk or self.tracker.has_changed('stage')):
+            self.closed_at = timezone.now() if self.stage in self.CLOSED_STAGES else None
+            if update_fields is not None:
+                update_fields = {*update_fields, 'closed_at'}
+        if self.pk:
+            self.version += 1
+            if update_fields is not None:
+                update_fields = {*update_fields, 'version'}
+        if update_fields is not None:
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+    
+    def can_transition_to(self, stage):
+        return stage in self.STAGE_TRANSITIONS.get(self.stage, set())
+    
     def get_score_category(self):
         """Retorna la categoría del lead según su puntuación"""
         if self.lead_score >= 80:
@@ -138,12 +220,9 @@ class Deal(models.Model):
         return colors.get(category, '#999999')
     
     def calculate_total_from_products(self):
-        """Calcula el valor total basado en los productos agregados"""
-        total = sum(
-            item.quantity * item.unit_price 
-            for item in self.deal_products.all()
-        )
-        return total
+        """Calcula el valor total (con descuentos) de los productos en una consulta agregada"""
+        total = self.deal_products.aggregate(total=models.Sum(deal_product_total_expression()))['total']
+        return total or Decimal('0')
     
     def get_probability(self):
         """Retorna la probabilidad de cierre según la etapa actual"""
@@ -211,6 +290,52 @@ class DealProduct(models.Model):
         return self.get_subtotal() - self.get_discount_amount()
 
 
+CENTS = Decimal('0.01')
+
+
+def line_total_expression():
+    """Total de una línea en SQL: cantidad x precio menos el descuento, a 2 decimales"""
+    return Round(
+        models.ExpressionWrapper(
+            models.F('quantity') * models.F('unit_price') * (100 - models.F('discount_percent')) * PERCENT,
+            output_field=models.DecimalField(max_digits=15, decimal_places=4)
+        ),
+        2
+    )
+
+
+class QuoteItemQuerySet(models.QuerySet):
+    def refresh_line_totals(self):
+        """
+        Recalcula line_total en SQL (un UPDATE) en las líneas desactualizadas.
+        Necesario tras bulk_create/update, que no pasan por save().
+        """
+        expression = line_total_expression()
+        return self.exclude(line_total=expression).update(line_total=expression)
+
+
+# Estados en los que una cotización puede expirar
+QUOTE_OPEN_STATUSES = ('draft', 'sent', 'viewed')
+
+
+class QuoteQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Cotizaciones de deals del equipo o creadas por él"""
+        return (
+            models.Q(deal__assigned_to_id__in=scope.team_user_ids) |
+            models.Q(created_by_id__in=scope.team_user_ids)
+        )
+    
+    def overdue(self, today=None):
+        """Cotizaciones abiertas con valid_until vencido (índice parcial quote_open_valid_until_idx)"""
+        today = today or timezone.localdate()
+        return self.filter(status__in=QUOTE_OPEN_STATUSES, valid_until__lt=today)
+    
+    def expire_overdue(self, today=None):
+        """Pasa a 'expired' las cotizaciones vencidas con un único UPDATE; retorna cuántas"""
+        return self.overdue(today).update(status='expired', updated_at=timezone.now())
+
+
 class Quote(models.Model):
     """
     Sistema de cotizaciones
@@ -224,6 +349,12 @@ class Quote(models.Model):
         ('expired', 'Expirada'),
     ]
     
+    PDF_STATUS_CHOICES = [
+        ('pending', 'Generando'),
+        ('ready', 'Generado'),
+        ('failed', 'Error'),
+    ]
+    
     quote_number = models.CharField('Número de cotización', max_length=50, unique=True)
     deal = models.ForeignKey(Deal, on_delete=models.CASCADE, related_name='quotes', verbose_name='Trato')
     account = models.ForeignKey('accounts.Account', on_delete=models.CASCADE, verbose_name='Empresa')
@@ -263,6 +394,11 @@ class Quote(models.Model):
     viewed_at = models.DateTimeField('Vista el', null=True, blank=True)
     accepted_at = models.DateTimeField('Aceptada el', null=True, blank=True)
     
+    # Último renderizado del PDF (deals/pdf.py), para el contenido pdf_checksum
+    pdf_status = models.CharField('Estado del PDF', max_length=10, choices=PDF_STATUS_CHOICES, blank=True)
+    pdf_checksum = models.CharField('Checksum del PDF', max_length=64, blank=True, editable=False)
+    pdf_error = models.TextField('Error del PDF', blank=True, editable=False)
+    
     # Usuario responsable
     created_by = models.ForeignKey(
         User,
@@ -275,6 +411,8 @@ class Quote(models.Model):
     # Tracker para detectar cambios en campos
     tracker = FieldTracker(fields=['status'])
     
+    objects = QuoteQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Cotización'
         verbose_name_plural = 'Cotizaciones'
@@ -283,27 +421,59 @@ class Quote(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['account']),
             models.Index(fields=['deal']),
+            models.Index(
+                fields=['valid_until'],
+                name='quote_open_valid_until_idx',
+                condition=models.Q(status__in=QUOTE_OPEN_STATUSES)
+            ),
         ]
     
     def __str__(self):
         return f"{self.quote_number} - {self.account.name}"
     
-    def calculate_totals(self):
-        """Calcula los totales de la cotización"""
-        items = self.items.all()
-        self.subtotal = sum([item.get_line_total() for item in items])
+    def recalculate(self):
+        """
+        Recalcula subtotal, descuento, impuestos y total de la cotización.
+        Sincroniza line_total de los items (por si hubo operaciones masivas),
+        suma las líneas con un único agregado SQL y guarda los totales con
+        un UPDATE, sin disparar post_save (ni eventos de timeline).
+        """
+        self.items.refresh_line_totals()
+        subtotal = self.items.aggregate(total=models.Sum('line_total'))['total'] or Decimal('0')
+        self.subtotal = subtotal.quantize(CENTS)
         
-        # Calcular descuento
+        # Calcular descuento (sin porcentaje se respeta el monto manual)
         if self.discount_percent > 0:
-            self.discount_amount = (self.subtotal * self.discount_percent) / 100
+            self.discount_amount = (self.subtotal * self.discount_percent / 100).quantize(CENTS)
         
         # Calcular impuestos
         subtotal_after_discount = self.subtotal - self.discount_amount
-        self.tax_amount = (subtotal_after_discount * self.tax_rate) / 100
+        self.tax_amount = (subtotal_after_discount * self.tax_rate / 100).quantize(CENTS)
         
         # Total final
         self.total = subtotal_after_discount + self.tax_amount
-        self.save()
+        self.updated_at = timezone.now()
+        Quote.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal,
+            discount_amount=self.discount_amount,
+            tax_amount=self.tax_amount,
+            total=self.total,
+            updated_at=self.updated_at
+        )
+    
+    # Compatibilidad con el nombre anterior
+    calculate_totals = recalculate
+    
+    def recalculate_on_commit(self):
+        """Programa recalculate() una sola vez al confirmar la transacción actual"""
+        quote_id = self.pk
+        
+        def _recalculate():
+            quote = Quote.objects.filter(pk=quote_id).first()
+            if quote is not None:
+                quote.recalculate()
+        
+        on_commit_once(('quote-totals', quote_id), _recalculate)
     
     def mark_sent(self):
         """Marca la cotización como enviada"""
@@ -321,8 +491,9 @@ class Quote(models.Model):
     
     def is_expired(self):
         """Verifica si la cotización ha expirado"""
-        from datetime import date
-        return date.today() > self.valid_until and self.status not in ['accepted', 'rejected']
+        if self.status == 'expired':
+            return True
+        return self.status in QUOTE_OPEN_STATUSES and timezone.localdate() > self.valid_until
     
     def get_status_color(self):
         """Retorna color según estado"""
@@ -353,6 +524,8 @@ class QuoteItem(models.Model):
     order = models.IntegerField('Orden', default=0)
     created_at = models.DateTimeField('Creado el', auto_now_add=True)
     
+    objects = QuoteItemQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Item de Cotización'
         verbose_name_plural = 'Items de Cotización'
@@ -362,15 +535,21 @@ class QuoteItem(models.Model):
         return f"{self.description} - {self.quantity} x {self.unit_price}"
     
     def get_line_total(self):
-        """Calcula el total de la línea"""
+        """Calcula el total de la línea (mismo redondeo que line_total_expression)"""
         subtotal = self.quantity * self.unit_price
         if self.discount_percent > 0:
             discount = (subtotal * self.discount_percent) / 100
-            return subtotal - discount
-        return subtotal
+            subtotal -= discount
+        return Decimal(subtotal).quantize(CENTS, rounding=ROUND_HALF_UP)
     
     def save(self, *args, **kwargs):
         self.line_total = self.get_line_total()
         super().save(*args, **kwargs)
-        # Recalcular totales de la cotización
-        self.quote.calculate_totals()
\ No newline at end of file
+        # Totales de la cotización: una vez por transacción, no por línea
+        self.quote.recalculate_on_commit()
+    
+    def delete(self, *args, **kwargs):
+        quote = self.quote
+        result = super().delete(*args, **kwargs)
+        quote.recalculate_on_commit()
+        return result
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+PDFs de cotizaciones
+====================
+
+Renderiza la cotización a HTML (plantilla deals/quote_pdf.html) y la
+convierte a PDF con WeasyPrint en un pool de procesos, sin bloquear la
+petición:
+
+- El HTML renderizado se resume en un hash (SHA-256): si ya existe un
+  Document de tipo 'quote' con ese checksum, se sirve directamente
+- Si no, se encola el renderizado y la vista responde 202; al terminar,
+  el PDF se guarda como documents.Document con el checksum y se borran
+  (fila y fichero) los PDFs anteriores de la cotización
+- Si el renderizado falla, Quote.pdf_status queda en 'failed' para ese
+  contenido: la vista muestra el error en lugar de seguir esperando y
+  solo se reintenta a petición (retry=True)
+- Un mismo contenido solo se renderiza una vez a la vez por proceso
+- Fuentes y CSS se precargan una vez por proceso (deals/pdf_worker.py)
+
+BACKGROUND_TASKS_SYNC = True renderiza en línea (tests, scripts).
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from core.background import BACKGROUND_TASKS_SYNC, run_in_background
+from documents.models import Document
+from . import pdf_worker
+from .models import Quote
+
+
+logger = logging.getLogger(__name__)
+
+QUOTE_PDF_MAX_WORKERS = getattr(settings, 'QUOTE_PDF_MAX_WORKERS', 2)
+QUOTE_PDF_STYLESHEETS = tuple(str(path) for path in getattr(settings, 'QUOTE_PDF_STYLESHEETS', ()))
+QUOTE_PDF_TEMPLATE = 'deals/quote_pdf.html'
+
+_executor = None
+_lock = threading.Lock()
+_pending = {}
+
+
+class QuotePDFError(Exception):
+    """El renderizado del contenido actual de la cotización falló"""
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # spawn: los procesos no heredan conexiones ni hilos del servidor
+                _executor = ProcessPoolExecutor(
+                    max_workers=QUOTE_PDF_MAX_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=pdf_worker.init_worker,
+                    initargs=(QUOTE_PDF_STYLESHEETS,)
+                )
+    return _executor
+
+
+def render_quote_html(quote):
+    """HTML de la cotización con sus líneas"""
+    return render_to_string(QUOTE_PDF_TEMPLATE, {
+        'quote': quote,
+        'items': quote.items.select_related('product'),
+    })
+
+
+def content_checksum(html):
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+
+def find_cached_pdf(quote, checksum):
+    """Document ya generado para este contenido de la cotización"""
+    return Document.objects.filter(
+        quote_id=quote.pk,
+        document_type='quote',
+        checksum=checksum
+    ).order_by('-uploaded_at').first()
+
+
+def _delete_documents(documents):
+    """Borra los Document y, tras el commit, sus ficheros"""
+    documents = list(documents)
+    for document in documents:
+        document.delete()
+
+    def delete_files():
+        for document in documents:
+            document.file.delete(save=False)
+
+    transaction.on_commit(delete_files)
+
+
+def store_quote_pdf(quote_id, checksum, pdf, user_id=None):
+    """Guarda el PDF como Document de la cotización y borra los que reemplaza"""
+    quote = Quote.objects.get(pk=quote_id)
+    document = Document(
+        name=f'Cotización {quote.quote_number}',
+        description=quote.title,
+        document_type='quote',
+        account_id=quote.account_id,
+        contact_id=quote.contact_id,
+        deal_id=quote.deal_id,
+        quote_id=quote.pk,
+        uploaded_by_id=user_id,
+        checksum=checksum
+    )
+    document.file.save(f'{quote.quote_number}.pdf', ContentFile(pdf), save=False)
+    with transaction.atomic():
+        document.save()
+        _delete_documents(
+            Document.objects.filter(quote_id=quote.pk, document_type='quote').exclude(pk=document.pk)
+        )
+        Quote.objects.filter(pk=quote.pk, pdf_checksum=checksum).update(pdf_status='ready', pdf_error='')
+    return document
+
+
+def _mark_failed(quote_id, checksum, error):
+    logger.error('Error al renderizar el PDF de la cotización %s: %s', quote_id, error)
+    Quote.objects.filter(pk=quote_id, pdf_checksum=checksum).update(
+        pdf_status='failed',
+        pdf_error=f'{type(error).__name__}: {error}'
+    )
+
+
+def _finish_render(future, quote_id, checksum, user_id):
+    """Guarda el resultado del proceso (en un hilo con su propia conexión)"""
+    try:
+        try:
+            pdf = future.result()
+        except Exception as e:
+            _mark_failed(quote_id, checksum, e)
+            return
+        store_quote_pdf(quote_id, checksum, pdf, user_id)
+    finally:
+        with _lock:
+            _pending.pop(checksum, None)
+
+
+def get_quote_pdf(quote, user=None, retry=False):
+    """
+    Retorna el Document con el PDF del contenido actual de la cotización.
+    Si aún no existe, encola el renderizado y retorna None.
+    Lanza QuotePDFError si el último renderizado de este contenido falló;
+    con retry=True se vuelve a intentar.
+    """
+    html = render_quote_html(quote)
+    checksum = content_checksum(html)
+    document = find_cached_pdf(quote, checksum)
+    if document is not None:
+        return document
+
+    if quote.pdf_checksum == checksum and quote.pdf_status == 'failed' and not retry:
+        raise QuotePDFError(quote.pdf_error)
+    if quote.pdf_checksum != checksum or quote.pdf_status != 'pending':
+        Quote.objects.filter(pk=quote.pk).update(pdf_status='pending', pdf_checksum=checksum, pdf_error='')
+        quote.pdf_status, quote.pdf_checksum, quote.pdf_error = 'pending', checksum, ''
+
+    user_id = getattr(user, 'pk', None)
+    base_url = str(settings.BASE_DIR)
+    if BACKGROUND_TASKS_SYNC:
+        try:
+            pdf = pdf_worker.render_pdf(html, base_url, QUOTE_PDF_STYLESHEETS)
+        except Exception as e:
+            _mark_failed(quote.pk, checksum, e)
+            raise QuotePDFError(str(e)) from e
+        return store_quote_pdf(quote.pk, checksum, pdf, user_id)
+
+    with _lock:
+        if checksum in _pending:
+            return None
+        future = _get_executor().submit(pdf_worker.render_pdf, html, base_url, QUOTE_PDF_STYLESHEETS)
+        _pending[checksum] = future
+
+    # Fuera del lock: si el futuro ya terminó, el callback se ejecuta en este hilo
+    future.add_done_callback(
+        lambda done: run_in_background(_finish_render, done, quote.pk, checksum, user_id)
+    )
+    return None
@@ -0,0 +1,38 @@
+"""
+Proceso de renderizado de PDFs
+==============================
+
+Código que corre dentro de los procesos del pool de deals/pdf.py.
+No importa Django: recibe HTML ya renderizado y devuelve los bytes del PDF.
+
+WeasyPrint, la configuración de fuentes y las hojas de estilo se cargan
+una sola vez por proceso (init_worker) y se reutilizan en cada PDF.
+"""
+
+_font_config = None
+_stylesheets = []
+
+
+def init_worker(stylesheet_paths=()):
+    """Inicializador del proceso: importa WeasyPrint y precarga fuentes y CSS"""
+    global _font_config, _stylesheets
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    _font_config = FontConfiguration()
+    _stylesheets = [
+        CSS(filename=str(path), font_config=_font_config)
+        for path in stylesheet_paths
+    ]
+
+
+def render_pdf(html, base_url=None, stylesheet_paths=()):
+    """Convierte el HTML en PDF (bytes) con las hojas de estilo precargadas"""
+    from weasyprint import HTML
+
+    if _font_config is None:
+        init_worker(stylesheet_paths)
+    return HTML(string=html, base_url=base_url).write_pdf(
+        stylesheets=_stylesheets,
+        font_config=_font_config
+    )
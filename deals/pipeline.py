@@ -0,0 +1,134 @@
+"""
+Motor del Kanban del pipeline
+=============================
+
+Cada columna (etapa) se consulta por separado con un límite y paginación
+por cursor, así la página cuesta lo mismo con 100 que con 100.000 deals:
+
+- Columnas abiertas: ordenadas por lead score
+- Columnas cerradas: solo los deals cerrados (closed_at) en la ventana
+  reciente (PIPELINE_CLOSED_WINDOW_DAYS), también por lead score
+- Totales de todas las columnas en una sola consulta agregada
+- Movimiento de etapa con un UPDATE condicional (versión + transición
+  permitida); scoring, resumen de la empresa y timeline se ejecutan tras el
+  commit en segundo plano
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from core.background import on_commit_background
+from core.pagination import keyset_paginate
+from .models import Deal
+
+
+PIPELINE_COLUMN_LIMIT = getattr(settings, 'PIPELINE_COLUMN_LIMIT', 20)
+PIPELINE_CLOSED_WINDOW_DAYS = getattr(settings, 'PIPELINE_CLOSED_WINDOW_DAYS', 90)
+
+CLOSED_STAGES = Deal.CLOSED_STAGES
+COLUMN_ORDERING = ['-lead_score', '-id']
+
+
+class StageMoveError(Exception):
+    """Movimiento de etapa rechazado (transición no permitida)"""
+
+
+class StaleDealError(StageMoveError):
+    """El deal cambió desde que se cargó la tarjeta (versión distinta)"""
+
+
+def _stage_condition(stage, now=None):
+    """
+    Filtro de una columna: la etapa y, si está cerrada, la ventana reciente.
+    La ventana usa closed_at y no updated_at, que también mueven la
+    revalorización, el repricing o cualquier guardado del admin.
+    """
+    condition = Q(stage=stage)
+    if stage in CLOSED_STAGES:
+        now = now or timezone.now()
+        condition &= Q(closed_at__gte=now - timedelta(days=PIPELINE_CLOSED_WINDOW_DAYS))
+    return condition
+
+
+def get_column(user, stage, cursor=None, limit=None):
+    """Página de deals de una columna visibles para el usuario"""
+    deals = Deal.objects.visible_to(user).filter(_stage_condition(stage)).select_related('account')
+    return keyset_paginate(deals, COLUMN_ORDERING, limit or PIPELINE_COLUMN_LIMIT, cursor)
+
+
+def get_column_totals(user, stages=None):
+    """Número de deals y valor por columna (o solo las indicadas) en una sola consulta"""
+    now = timezone.now()
+    stages = stages or [stage for stage, _label in Deal.STAGES]
+    aggregates = {}
+    for stage in stages:
+        condition = _stage_condition(stage, now)
+        aggregates[f'{stage}__count'] = Count('id', filter=condition)
+        aggregates[f'{stage}__value'] = Sum('value', filter=condition)
+
+    result = Deal.objects.visible_to(user).aggregate(**aggregates)
+    return {
+        stage: {
+            'count': result[f'{stage}__count'],
+            'value': result[f'{stage}__value'] or 0,
+        }
+        for stage in stages
+    }
+
+
+def build_board(user, limit=None):
+    """Columnas del tablero con su primera página y sus totales"""
+    totals = get_column_totals(user)
+    return [
+        {
+            'stage': stage,
+            'label': label,
+            'is_closed': stage in CLOSED_STAGES,
+            'page': get_column(user, stage, limit=limit),
+            'totals': totals[stage],
+        }
+        for stage, label in Deal.STAGES
+    ]
+
+
+def move_deal_stage(user, deal_id, from_stage, stage, version):
+    """
+    Mueve un deal de etapa con un único UPDATE condicional: solo si el
+    usuario lo ve, sigue en from_stage y la versión coincide con la de la tarjeta.
+    Lanza Deal.DoesNotExist, StaleDealError o StageMoveError.
+    """
+    if stage not in Deal.STAGE_TRANSITIONS.get(from_stage, set()):
+        raise StageMoveError(f'No se permite pasar de {from_stage} a {stage}')
+    
+    deals = Deal.objects.visible_to(user).filter(pk=deal_id)
+    now = timezone.now()
+    with transaction.atomic():
+        updated = deals.filter(stage=from_stage, version=version).update(
+            stage=stage,
+            closed_at=now if stage in CLOSED_STAGES else None,
+            version=F('version') + 1,
+            updated_at=now
+        )
+        if not updated:
+            if not deals.exists():
+                raise Deal.DoesNotExist
+            raise StaleDealError('El deal fue modificado por otro usuario')
+        on_commit_background(after_stage_move, deal_id, from_stage, user.pk)
+
+
+def after_stage_move(deal_id, previous_stage, user_id):
+    """Trabajo diferido de un movimiento: score, resumen de la empresa y evento de timeline"""
+    from django.contrib.auth.models import User
+    from accounts.summary import invalidate_account_summary
+    from timeline.signals import build_deal_event
+    from .signals import rescore_deals
+    
+    rescore_deals([deal_id])
+    deal = Deal.objects.select_related('account', 'contact').get(pk=deal_id)
+    # El UPDATE del movimiento no emite señales: ganados y su valor cambian aquí
+    invalidate_account_summary(deal.account_id)
+    build_deal_event(deal, previous_stage=previous_stage, user=User.objects.filter(pk=user_id).first()).save()
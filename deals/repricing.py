@@ -0,0 +1,170 @@
+"""
+Repreciado masivo de productos
+==============================
+
+Aplica una lista de precios (SKU -> precio) al catálogo y a las líneas
+(DealProduct) de los deals abiertos, con operaciones de conjunto:
+
+- Por bloques de SKUs: una consulta para los productos, otra para las
+  líneas afectadas y un UPDATE con CASE/WHEN para cada tabla
+- Los UPDATE no disparan señales: el valor y el score de los deals
+  afectados se recalculan al final en bloque (deals/valuation.py), que
+  también invalida el resumen en caché de sus empresas
+- dry_run: no escribe nada, solo calcula el diff (línea a línea)
+
+La lista puede venir de un CSV (columnas 'sku' y 'unit_price') o de un dict.
+"""
+
+import csv
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, Value, When
+from django.utils import timezone
+
+from .models import CENTS, DealProduct, Product
+from .pipeline import CLOSED_STAGES
+from .valuation import revalue_deals
+
+
+REPRICING_BATCH_SIZE = 500
+
+DIFF_FIELDS = ['deal_id', 'deal_name', 'sku', 'product_name', 'old_price', 'new_price']
+
+
+class PriceListError(ValueError):
+    """Lista de precios con filas no válidas"""
+
+
+def parse_price(value):
+    """Precio como Decimal con 2 decimales; ValueError si no es válido o es negativo"""
+    try:
+        price = Decimal(str(value).strip()).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Precio no válido: {value!r}')
+    if price < 0:
+        raise ValueError(f'Precio negativo: {value!r}')
+    return price
+
+
+def load_price_list(file):
+    """
+    Lee un CSV con columnas 'sku' y 'unit_price' (o 'price').
+    Retorna {sku: Decimal}; lanza PriceListError con las filas no válidas.
+    """
+    prices = {}
+    errors = []
+    for line_number, row in enumerate(csv.DictReader(file), start=2):
+        sku = (row.get('sku') or '').strip()
+        raw_price = row.get('unit_price', row.get('price'))
+        if not sku or raw_price is None:
+            errors.append(f'Línea {line_number}: faltan sku o unit_price')
+            continue
+        try:
+            prices[sku] = parse_price(raw_price)
+        except ValueError as e:
+            errors.append(f'Línea {line_number}: {e}')
+    if errors:
+        raise PriceListError('\n'.join(errors))
+    return prices
+
+
+def _price_case(prices_by_product, field='product_id'):
+    """CASE <field> WHEN ... THEN nuevo precio"""
+    return Case(
+        *[When(**{field: product_id}, then=Value(price)) for product_id, price in prices_by_product.items()],
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+def _reprice_batch(prices, dry_run):
+    """Reprecia un bloque de SKUs. Retorna (productos cambiados, diff, deals afectados, SKUs encontrados)"""
+    products = list(Product.objects.filter(sku__in=prices).values_list('id', 'sku', 'unit_price'))
+    new_prices = {product_id: prices[sku] for product_id, sku, _price in products}
+    changed_products = {
+        product_id: prices[sku]
+        for product_id, sku, price in products
+        if price != prices[sku]
+    }
+
+    lines = (
+        DealProduct.objects
+        .filter(product_id__in=new_prices)
+        .exclude(deal__stage__in=CLOSED_STAGES)
+        .values_list('deal_id', 'deal__name', 'product_id', 'product__sku', 'product__name', 'unit_price')
+    )
+    diff = []
+    line_prices = {}
+    for deal_id, deal_name, product_id, sku, product_name, old_price in lines:
+        new_price = new_prices[product_id]
+        if old_price != new_price:
+            line_prices[product_id] = new_price
+            diff.append({
+                'deal_id': deal_id,
+                'deal_name': deal_name,
+                'sku': sku,
+                'product_name': product_name,
+                'old_price': old_price,
+                'new_price': new_price,
+            })
+
+    if not dry_run:
+        if changed_products:
+            # update() no aplica auto_now: updated_at se fija a mano
+            Product.objects.filter(pk__in=changed_products).update(
+                unit_price=_price_case(changed_products, 'pk'),
+                updated_at=timezone.now()
+            )
+        if line_prices:
+            # Las líneas que ya tenían el precio nuevo se reescriben con el mismo valor
+            DealProduct.objects.filter(product_id__in=line_prices).exclude(
+                deal__stage__in=CLOSED_STAGES
+            ).update(unit_price=_price_case(line_prices))
+
+    return len(changed_products), diff, {row['deal_id'] for row in diff}, {sku for _id, sku, _price in products}
+
+
+def reprice_products(prices, dry_run=False, batch_size=None):
+    """
+    Aplica la lista de precios {sku: precio} al catálogo y a los deals abiertos.
+    Retorna {'products', 'lines', 'deals', 'unknown_skus', 'diff', 'seconds'}.
+    """
+    batch_size = batch_size or REPRICING_BATCH_SIZE
+    started = time.monotonic()
+    prices = {sku: parse_price(price) for sku, price in prices.items()}
+    skus = list(prices)
+
+    products_changed = 0
+    diff = []
+    deal_ids = set()
+    found_skus = set()
+    with transaction.atomic():
+        for start in range(0, len(skus), batch_size):
+            batch = {sku: prices[sku] for sku in skus[start:start + batch_size]}
+            changed, batch_diff, batch_deals, batch_found = _reprice_batch(batch, dry_run)
+            products_changed += changed
+            diff.extend(batch_diff)
+            deal_ids |= batch_deals
+            found_skus |= batch_found
+
+        if not dry_run:
+            deal_ids_list = sorted(deal_ids)
+            for start in range(0, len(deal_ids_list), batch_size):
+                revalue_deals(deal_ids_list[start:start + batch_size])
+
+    return {
+        'products': products_changed,
+        'lines': len(diff),
+        'deals': len(deal_ids),
+        'unknown_skus': sorted(set(skus) - found_skus),
+        'diff': diff,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def write_diff_report(diff, file):
+    """Escribe el diff (una fila por línea de deal) como CSV"""
+    writer = csv.DictWriter(file, fieldnames=DIFF_FIELDS)
+    writer.writeheader()
+    writer.writerows(diff)
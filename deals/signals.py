@@ -9,14 +9,42 @@ Metodología de dos ejes:
 Score final: 0-100 puntos
 """
 
+from django.db.models import Count, Max, Q
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 from datetime import timedelta
 from deals.models import Deal, DealProduct
+from deals.valuation import schedule_revalue
+from core.metrics import timed_receiver
 from interactions.models import Interaction
 
 
+def _get_last_interaction_at(deal):
+    """
+    Fecha de la última interacción del deal.
+    Usa la anotación precargada por rescore_deals() si existe.
+    """
+    if hasattr(deal, 'last_interaction_at'):
+        return deal.last_interaction_at
+    return Interaction.objects.filter(
+        deal=deal
+    ).order_by('-scheduled_at').values_list('scheduled_at', flat=True).first()
+
+
+def _get_recent_interactions_count(deal, now):
+    """
+    Interacciones del deal en los últimos 30 días.
+    Usa la anotación precargada por rescore_deals() si existe.
+    """
+    if hasattr(deal, 'recent_interactions_count'):
+        return deal.recent_interactions_count
+    return Interaction.objects.filter(
+        deal=deal,
+        scheduled_at__gte=now - timedelta(days=30)
+    ).count()
+
+
 def calculate_fit_score(deal):
     """
     Eje A: Perfil de Empresa (FIT) - 50 puntos máximo
@@ -66,12 +94,10 @@ def calculate_engagement_score(deal):
     now = timezone.now()
     
     # 1. Recencia de Interacciones (25 puntos)
-    last_interaction = Interaction.objects.filter(
-        deal=deal
-    ).order_by('-scheduled_at').first()
+    last_interaction_at = _get_last_interaction_at(deal)
     
-    if last_interaction:
-        days_since_interaction = (now - last_interaction.scheduled_at).days
+    if last_interaction_at:
+        days_since_interaction = (now - last_interaction_at).days
         
         if days_since_interaction <= 3:
             score += 25  # Muy reciente (últimos 3 días)
@@ -87,10 +113,7 @@ def calculate_engagement_score(deal):
     
     # 2. Frecuencia de Interacciones (10 puntos)
     # Contar interacciones en los últimos 30 días
-    recent_interactions_count = Interaction.objects.filter(
-        deal=deal,
-        scheduled_at__gte=now - timedelta(days=30)
-    ).count()
+    recent_interactions_count = _get_recent_interactions_count(deal, now)
     
     if recent_interactions_count >= 5:
         score += 10  # Muy activo
@@ -133,12 +156,10 @@ def calculate_degradation(deal):
     penalty = 0
     now = timezone.now()
     
-    last_interaction = Interaction.objects.filter(
-        deal=deal
-    ).order_by('-scheduled_at').first()
+    last_interaction_at = _get_last_interaction_at(deal)
     
-    if last_interaction:
-        days_inactive = (now - last_interaction.scheduled_at).days
+    if last_interaction_at:
+        days_inactive = (now - last_interaction_at).days
         weeks_inactive = days_inactive // 7
         
         # Penalización: 5 puntos por semana de inactividad (máximo -30 puntos)
@@ -174,7 +195,44 @@ def calculate_lead_score(deal):
     return final_score
 
 
+def rescore_deals(deal_ids):
+    """
+    Recalcula el Lead Score de varios deals en bloque.
+    
+    La actividad de todos los deals se precarga en una sola consulta
+    (última interacción + interacciones recientes) y los scores se guardan
+    con un único bulk_update, en lugar de 3 consultas + 1 UPDATE por deal.
+    El score es derivado: como los receivers de score, no incrementa la
+    versión del deal (una tarjeta abierta del kanban sigue siendo válida).
+    Retorna el número de deals actualizados.
+    """
+    deal_ids = {pk for pk in deal_ids if pk}
+    if not deal_ids:
+        return 0
+    
+    now = timezone.now()
+    deals = list(
+        Deal.objects.filter(pk__in=deal_ids)
+        .select_related('account', 'contact')
+        .annotate(
+            last_interaction_at=Max('interactions__scheduled_at'),
+            recent_interactions_count=Count(
+                'interactions',
+                filter=Q(interactions__scheduled_at__gte=now - timedelta(days=30))
+            ),
+        )
+    )
+    
+    for deal in deals:
+        deal.lead_score = calculate_lead_score(deal)
+        deal.last_score_update = now
+    
+    Deal.objects.bulk_update(deals, ['lead_score', 'last_score_update'], batch_size=500)
+    return len(deals)
+
+
 @receiver(post_save, sender=Deal)
+@timed_receiver
 def update_deal_score_on_save(sender, instance, created, **kwargs):
     """
     Recalcula el score cada vez que se guarda un Deal
@@ -192,6 +250,7 @@ def update_deal_score_on_save(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=Interaction)
+@timed_receiver
 def update_deal_score_on_interaction(sender, instance, **kwargs):
     """
     Recalcula el score del deal cuando se crea/actualiza una interacción
@@ -206,6 +265,7 @@ def update_deal_score_on_interaction(sender, instance, **kwargs):
 
 
 @receiver(post_delete, sender=Interaction)
+@timed_receiver
 def update_deal_score_on_interaction_delete(sender, instance, **kwargs):
     """
     Recalcula el score del deal cuando se elimina una interacción
@@ -221,25 +281,14 @@ def update_deal_score_on_interaction_delete(sender, instance, **kwargs):
 
 @receiver(post_save, sender=DealProduct)
 @receiver(post_delete, sender=DealProduct)
+@timed_receiver
 def update_deal_on_product_change(sender, instance, **kwargs):
     """
     Actualiza automáticamente el valor del Deal y recalcula el score
     cuando se agregan, modifican o eliminan productos
     
     Esta es una funcionalidad crítica para mantener la integridad
-    contable del sistema.
+    contable del sistema. El recálculo (agregado SQL + score) se agrupa
+    y se ejecuta una vez por deal al confirmar la transacción, no por línea.
     """
-    if instance.deal:
-        # 1. Calcular el nuevo valor total desde los productos
-        total_value = instance.deal.calculate_total_from_products()
-        
-        # 2. Recalcular el lead score (que usa el valor)
-        new_score = calculate_lead_score(instance.deal)
-        
-        # 3. Actualizar ambos campos en una sola operación
-        Deal.objects.filter(pk=instance.deal.pk).update(
-            value=total_value,
-            lead_score=new_score,
-            last_score_update=timezone.now()
-        )
-
+    schedule_revalue(instance.deal_id)
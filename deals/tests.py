@@ -1,3 +1,232 @@
-from django.test import TestCase
+import os
+import tempfile
+from concurrent.futures import Future
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import Account
+from documents.models import Document
+from . import pdf
+from .models import Deal, DealProduct, Product, Quote
+from .pipeline import (
+    PIPELINE_CLOSED_WINDOW_DAYS, StaleDealError, after_stage_move, build_board, get_column,
+    get_column_totals, move_deal_stage
+)
+from .repricing import reprice_products
+from .signals import rescore_deals
+from .valuation import revalue_deals
+
+
+class RepricingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.account = Account.objects.create(name='Acme')
+        cls.product = Product.objects.create(name='Licencia', sku='LIC-1', category='software',
+                                             unit_price=Decimal('10.00'))
+        cls.deal = Deal.objects.create(name='Abierto', account=cls.account, value=Decimal('0'),
+                                       assigned_to=cls.user)
+        DealProduct.objects.create(deal=cls.deal, product=cls.product, quantity=3, unit_price=Decimal('10.00'))
+
+    def test_reprice_updates_products_lines_and_deal_value(self):
+        old_updated_at = timezone.now() - timedelta(days=1)
+        Product.objects.filter(pk=self.product.pk).update(updated_at=old_updated_at)
+
+        result = reprice_products({'LIC-1': '12.50', 'NO-EXISTE': '1'})
+
+        self.assertEqual((result['products'], result['lines'], result['deals']), (1, 1, 1))
+        self.assertEqual(result['unknown_skus'], ['NO-EXISTE'])
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.unit_price, Decimal('12.50'))
+        self.assertGreater(product.updated_at, old_updated_at)
+        self.assertEqual(DealProduct.objects.get(deal=self.deal).unit_price, Decimal('12.50'))
+        self.assertEqual(Deal.objects.get(pk=self.deal.pk).value, Decimal('37.50'))
+
+    def test_dry_run_writes_nothing(self):
+        result = reprice_products({'LIC-1': '12.50'}, dry_run=True)
+        self.assertEqual(result['lines'], 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).unit_price, Decimal('10.00'))
+
+
+class OptimisticLockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.account = Account.objects.create(name='Acme')
+
+    def setUp(self):
+        self.deal = Deal.objects.create(name='Abierto', account=self.account, value=Decimal('0'),
+                                        assigned_to=self.user)
+
+    def version(self):
+        return Deal.objects.filter(pk=self.deal.pk).values_list('version', flat=True).get()
+
+    def test_only_value_changes_bump_the_version(self):
+        version = self.version()
+        revalue_deals([self.deal.pk])
+        self.assertEqual(self.version(), version + 1)
+        rescore_deals([self.deal.pk])
+        self.assertEqual(self.version(), version + 1)
+
+    def test_stage_move_detects_a_concurrent_revalue(self):
+        version = self.version()
+        revalue_deals([self.deal.pk])
+        with self.assertRaises(StaleDealError):
+            move_deal_stage(self.user, self.deal.pk, 'prospecting', 'negotiation', version)
+        move_deal_stage(self.user, self.deal.pk, 'prospecting', 'negotiation', version + 1)
+        self.assertEqual(self.version(), version + 2)
+
+    def test_deferred_rescore_keeps_the_moved_card_current(self):
+        version = self.version()
+        move_deal_stage(self.user, self.deal.pk, 'prospecting', 'negotiation', version)
+        after_stage_move(self.deal.pk, 'prospecting', self.user.pk)
+        move_deal_stage(self.user, self.deal.pk, 'negotiation', 'closed_won', version + 1)
+
+    def test_stage_move_ignores_a_concurrent_rescore(self):
+        version = self.version()
+        rescore_deals([self.deal.pk])
+        move_deal_stage(self.user, self.deal.pk, 'prospecting', 'negotiation', version)
+        self.assertEqual(self.version(), version + 1)
+
+
+
+class PipelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+        cls.account = Account.objects.create(name='Acme')
+
+    def deal(self, name, stage='prospecting', owner=None, score=0):
+        deal = Deal.objects.create(name=name, account=self.account, value=Decimal('10'), stage=stage,
+                                   assigned_to=owner or self.ana)
+        # El scoring recalcula lead_score al guardar: se fija sin señales
+        Deal.objects.filter(pk=deal.pk).update(lead_score=score)
+        deal.refresh_from_db()
+        return deal
+
+    def names(self, page):
+        return [deal.name for deal in page.items]
+
+    def test_closed_at_follows_the_stage(self):
+        deal = self.deal('Abierto')
+        self.assertIsNone(deal.closed_at)
+        deal.stage = 'closed_won'
+        deal.save()
+        self.assertIsNotNone(deal.closed_at)
+        move_deal_stage(self.ana, deal.pk, 'closed_won', 'negotiation', deal.version)
+        self.assertIsNone(Deal.objects.get(pk=deal.pk).closed_at)
+
+    def test_closed_columns_ignore_later_saves(self):
+        old = self.deal('Antiguo', stage='closed_won')
+        Deal.objects.filter(pk=old.pk).update(
+            closed_at=timezone.now() - timedelta(days=PIPELINE_CLOSED_WINDOW_DAYS + 1)
+        )
+        revalue_deals([old.pk])
+        Deal.objects.get(pk=old.pk).save()
+        recent = self.deal('Reciente', stage='negotiation')
+        move_deal_stage(self.ana, recent.pk, 'negotiation', 'closed_won', recent.version)
+
+        self.assertEqual(self.names(get_column(self.ana, 'closed_won')), ['Reciente'])
+        self.assertEqual(get_column_totals(self.ana, ['closed_won'])['closed_won'],
+                         {'count': 1, 'value': Decimal('10')})
+
+    def test_columns_are_scoped_and_paginated_by_score(self):
+        for score in (30, 20, 10):
+            self.deal(f'Ana {score}', score=score)
+        self.deal('Luis', owner=self.luis, score=90)
+
+        first = get_column(self.ana, 'prospecting', limit=2)
+        self.assertEqual(self.names(first), ['Ana 30', 'Ana 20'])
+        rest = get_column(self.ana, 'prospecting', cursor=first.next_cursor, limit=2)
+        self.assertEqual(self.names(rest), ['Ana 10'])
+        self.assertIsNone(rest.next_cursor)
+        self.assertEqual(get_column_totals(self.ana)['prospecting']['count'], 3)
+
+    def test_board_costs_one_query_per_column_plus_totals(self):
+        for stage, _label in Deal.STAGES:
+            self.deal(stage, stage=stage)
+        user = User.objects.get(pk=self.ana.pk)
+        build_board(user)
+        with self.assertNumQueries(1 + len(Deal.STAGES)):
+            board = build_board(user)
+        self.assertEqual([column['totals']['count'] for column in board], [1, 1, 1, 1])
+        self.assertEqual([column['is_closed'] for column in board], [False, False, True, True])
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class QuotePDFTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        account = Account.objects.create(name='Acme')
+        deal = Deal.objects.create(name='Abierto', account=account, value=Decimal('0'), assigned_to=cls.user)
+        today = timezone.localdate()
+        cls.quote = Quote.objects.bulk_create([Quote(quote_number='Q-1', deal=deal, account=account, title='Licencias',
+                                                     issue_date=today, valid_until=today)])[0]
+
+    def setUp(self):
+        patcher = mock.patch.object(pdf, 'BACKGROUND_TASKS_SYNC', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.render_pdf = mock.patch.object(pdf.pdf_worker, 'render_pdf', return_value=b'%PDF-1.4').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def reload(self):
+        return Quote.objects.get(pk=self.quote.pk)
+
+    def test_rerender_replaces_the_previous_document(self):
+        first = pdf.get_quote_pdf(self.reload())
+        self.assertEqual(pdf.get_quote_pdf(self.reload()), first)
+        self.assertEqual(self.render_pdf.call_count, 1)
+
+        Quote.objects.filter(pk=self.quote.pk).update(title='Licencias 2027')
+        with self.captureOnCommitCallbacks(execute=True):
+            second = pdf.get_quote_pdf(self.reload())
+        self.assertNotEqual(second, first)
+        self.assertEqual(list(Document.objects.filter(quote=self.quote)), [second])
+        self.assertFalse(os.path.exists(first.file.path))
+        self.assertTrue(os.path.exists(second.file.path))
+        self.assertEqual(self.reload().pdf_status, 'ready')
+
+    def test_failed_render_stops_waiting_until_retried(self):
+        self.render_pdf.side_effect = OSError('fuente no encontrada')
+        with self.assertLogs('deals.pdf', 'ERROR'), self.assertRaises(pdf.QuotePDFError):
+            pdf.get_quote_pdf(self.reload())
+        self.assertEqual(self.reload().pdf_status, 'failed')
+
+        self.client.force_login(self.user)
+        response = self.client.get(f'/deals/quotes/{self.quote.pk}/pdf/')
+        self.assertEqual(response.status_code, 500)
+        self.assertNotContains(response, 'http-equiv="refresh"', status_code=500)
+        self.assertEqual(self.render_pdf.call_count, 1)
+
+        self.render_pdf.side_effect = None
+        response = self.client.get(f'/deals/quotes/{self.quote.pk}/pdf/', {'retry': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reload().pdf_status, 'ready')
+
+    def test_background_failure_is_recorded(self):
+        checksum = pdf.content_checksum(pdf.render_quote_html(self.reload()))
+        Quote.objects.filter(pk=self.quote.pk).update(pdf_status='pending', pdf_checksum=checksum)
+        future = Future()
+        future.set_exception(RuntimeError('proceso terminado'))
+        pdf._pending[checksum] = future
+
+        with self.assertLogs('deals.pdf', 'ERROR'):
+            pdf._finish_render(future, self.quote.pk, checksum, None)
+
+        self.assertNotIn(checksum, pdf._pending)
+        quote = self.reload()
+        self.assertEqual(quote.pdf_status, 'failed')
+        self.assertIn('proceso terminado', quote.pdf_error)
+        with self.assertRaises(pdf.QuotePDFError):
+            pdf.get_quote_pdf(quote)
@@ -3,5 +3,7 @@ from . import views
 
 urlpatterns = [
     path('pipeline/', views.pipeline_view, name='pipeline'),
+    path('pipeline/column/<str:stage>/', views.pipeline_column, name='pipeline_column'),
     path('pipeline/update/<int:deal_id>/', views.update_deal_stage, name='update_deal_stage'),
+    path('quotes/<int:quote_id>/pdf/', views.quote_pdf, name='quote_pdf'),
 ]
\ No newline at end of file
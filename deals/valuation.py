@@ -0,0 +1,93 @@
+"""
+Valoración de deals desde sus productos
+=======================================
+
+El valor de un deal es la suma de sus líneas (DealProduct) con descuento:
+
+    Sum(quantity * unit_price * (1 - discount_percent / 100))
+
+- revalue_deals(): recalcula el valor de uno o muchos deals con un único
+  UPDATE (subconsulta agregada por deal), los re-puntúa en bloque e
+  invalida el resumen de sus empresas (accounts/summary.py)
+- schedule_revalue(): usado por las señales de DealProduct, agrupa los
+  cambios de una transacción (p. ej. un inline de 200 líneas en el admin)
+  en un solo recálculo al confirmar
+
+Para repreciar deals en masa basta con pasar sus ids (o un queryset) a
+revalue_deals().
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.transactions import on_commit_once
+from .models import Deal, DealProduct, deal_product_total_expression
+
+
+def _products_total_subquery():
+    """Total con descuento de los productos del deal de la fila externa"""
+    totals = (
+        DealProduct.objects
+        .filter(deal_id=OuterRef('pk'))
+        .order_by()
+        .values('deal_id')
+        .annotate(total=Sum(deal_product_total_expression()))
+        .values('total')
+    )
+    return Coalesce(
+        Subquery(totals, output_field=DecimalField(max_digits=15, decimal_places=2)),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=15, decimal_places=2)
+    )
+
+
+def compute_deal_values(deal_ids):
+    """{deal_id: total con descuento} en una sola consulta agregada"""
+    return dict(
+        DealProduct.objects
+        .filter(deal_id__in=deal_ids)
+        .order_by()
+        .values('deal_id')
+        .annotate(total=Sum(deal_product_total_expression()))
+        .values_list('deal_id', 'total')
+    )
+
+
+def revalue_deals(deals, rescore=True):
+    """
+    Recalcula Deal.value desde los productos con un UPDATE y, si se pide,
+    el lead score (que depende del valor). Acepta ids o un queryset de Deal.
+    Los deals sin productos quedan con valor 0.
+    Retorna el número de deals actualizados.
+    """
+    if isinstance(deals, QuerySet):
+        deal_ids = list(deals.values_list('pk', flat=True))
+    else:
+        deal_ids = [pk for pk in deals if pk]
+    if not deal_ids:
+        return 0
+
+    # version: el valor es visible en la tarjeta, el kanban (move_deal_stage)
+    # debe ver este cambio como concurrente. El score derivado no la incrementa
+    updated = Deal.objects.filter(pk__in=deal_ids).update(
+        value=_products_total_subquery(),
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if rescore:
+        from .signals import rescore_deals
+        rescore_deals(deal_ids)
+
+    from accounts.summary import invalidate_deals_accounts
+    transaction.on_commit(lambda: invalidate_deals_accounts(deal_ids))
+    return updated
+
+
+def schedule_revalue(deal_id):
+    """Programa revalue_deals() del deal una sola vez al confirmar la transacción"""
+    if deal_id:
+        on_commit_once(('deal-value', deal_id), lambda: revalue_deals([deal_id]))
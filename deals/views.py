@@ -1,25 +1,98 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import get_object_or_404, render
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
-from .models import Deal
+from django.views.decorators.http import require_POST
+from django.http import FileResponse, HttpResponse, Http404
+from .models import Deal, Quote
+from .pdf import QuotePDFError, get_quote_pdf
+from .pipeline import (
+    CLOSED_STAGES, PIPELINE_CLOSED_WINDOW_DAYS, StageMoveError, StaleDealError,
+    build_board, get_column, get_column_totals, move_deal_stage
+)
 
 @login_required
 def pipeline_view(request):
-    deals = Deal.objects.select_related('account').all()
-    # orden de las columnas
-    stages = [
-        ('prospecting', 'Prospección'),
-        ('negotiation', 'Negociación'),
-        ('closed_won', 'Ganado'),
-        ('closed_lost', 'Perdido'),
-    ]
-    return render(request, 'deals/pipeline.html', {'deals': deals, 'stages': stages})
+    """Kanban del pipeline: cada columna con su propia consulta limitada"""
+    columns = build_board(request.user)
+    stages = Deal.STAGES
+    return render(request, 'deals/pipeline.html', {
+        'columns': columns,
+        'stages': stages,
+        'closed_window_days': PIPELINE_CLOSED_WINDOW_DAYS,
+    })
 
+@login_required
+def pipeline_column(request, stage):
+    """Siguiente página de una columna del Kanban (HTMX 'cargar más')"""
+    if stage not in dict(Deal.STAGES):
+        raise Http404('Etapa no válida')
+    page = get_column(request.user, stage, cursor=request.GET.get('cursor'))
+    return render(request, 'deals/partials/pipeline_cards.html', {
+        'stage': stage,
+        'page': page,
+        'stages': Deal.STAGES,
+    })
+
+@login_required
+@require_POST
 def update_deal_stage(request, deal_id):
-    if request.method == "POST":
-        new_stage = request.POST.get('stage')
-        deal = get_object_or_404(Deal, id=deal_id) 
-        deal.stage = new_stage
-        deal.save()
-        return HttpResponse(f"Estado actualizado a {new_stage}")
-    return HttpResponse(status=405)
\ No newline at end of file
+    """
+    Mueve un deal de etapa desde el Kanban (HTMX).
+    Espera 'from_stage', 'stage' y 'version'; responde con la tarjeta en su
+    nueva columna y los totales actualizados (swaps out-of-band).
+    """
+    from_stage = request.POST.get('from_stage', '')
+    new_stage = request.POST.get('stage', '')
+    try:
+        version = int(request.POST.get('version', ''))
+    except ValueError:
+        return HttpResponse('Versión no válida', status=400)
+    
+    try:
+        move_deal_stage(request.user, deal_id, from_stage, new_stage, version)
+    except Deal.DoesNotExist:
+        raise Http404('Deal no encontrado')
+    except StaleDealError as e:
+        # La tarjeta está desactualizada: recargar el tablero
+        response = HttpResponse(str(e), status=409)
+        response['HX-Refresh'] = 'true'
+        return response
+    except StageMoveError as e:
+        return HttpResponse(str(e), status=422)
+    
+    deal = Deal.objects.select_related('account').get(pk=deal_id)
+    totals = get_column_totals(request.user, [from_stage, new_stage])
+    return render(request, 'deals/partials/pipeline_move.html', {
+        'deal': deal,
+        'stages': Deal.STAGES,
+        'columns': [
+            {'stage': stage, 'totals': stage_totals, 'is_closed': stage in CLOSED_STAGES}
+            for stage, stage_totals in totals.items()
+        ],
+        'closed_window_days': PIPELINE_CLOSED_WINDOW_DAYS,
+    })
+
+@login_required
+def quote_pdf(request, quote_id):
+    """
+    PDF de una cotización. Si ya existe para su contenido actual se sirve
+    al instante; si no, se genera en segundo plano y se responde 202.
+    Si el renderizado falló se muestra el error (?retry=1 lo reintenta).
+    """
+    quote = get_object_or_404(
+        Quote.objects.visible_to(request.user).select_related('account', 'contact'),
+        pk=quote_id
+    )
+    try:
+        document = get_quote_pdf(quote, request.user, retry=request.GET.get('retry') == '1')
+    except QuotePDFError:
+        return render(request, 'deals/quote_pdf_pending.html', {'quote': quote, 'failed': True}, status=500)
+    if document is None:
+        response = render(request, 'deals/quote_pdf_pending.html', {'quote': quote}, status=202)
+        response['Retry-After'] = '2'
+        return response
+    return FileResponse(
+        document.file.open('rb'),
+        as_attachment=request.GET.get('download') == '1',
+        filename=f'{quote.quote_number}.pdf',
+        content_type='application/pdf'
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='checksum',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Hash del contenido de origen (PDFs generados, p. ej. cotizaciones)', max_length=64, verbose_name='Checksum'),
+        ),
+    ]
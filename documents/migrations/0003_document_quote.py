@@ -0,0 +1,20 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deals', '0009_quote_pdf_status'),
+        ('documents', '0002_document_checksum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='quote',
+            field=models.ForeignKey(blank=True, help_text='Cotización de la que se generó el PDF (deals/pdf.py)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='deals.quote', verbose_name='Cotización'),
+        ),
+    ]
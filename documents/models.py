@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator
 import os
+from core.rbac import RBACQuerySet, account_visible_for
 
 
 def document_upload_path(instance, filename):
@@ -9,6 +10,16 @@ def document_upload_path(instance, filename):
     return f'documents/{instance.document_type}/{filename}'
 
 
+class DocumentQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Documentos subidos por el equipo o ligados a sus deals o empresas"""
+        return (
+            models.Q(uploaded_by_id__in=scope.team_user_ids) |
+            models.Q(deal__assigned_to_id__in=scope.team_user_ids) |
+            account_visible_for('account_id', scope)
+        )
+
+
 class Document(models.Model):
     """
     Modelo para gestión de documentos
@@ -36,6 +47,14 @@ class Document(models.Model):
         )]
     )
     file_size = models.IntegerField('Tamaño (bytes)', editable=False, null=True, blank=True)
+    checksum = models.CharField(
+        'Checksum',
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text='Hash del contenido de origen (PDFs generados, p. ej. cotizaciones)'
+    )
     
     # Relaciones
     account = models.ForeignKey(
@@ -62,6 +81,15 @@ class Document(models.Model):
         related_name='documents',
         verbose_name='Trato'
     )
+    quote = models.ForeignKey(
+        'deals.Quote',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='documents',
+        verbose_name='Cotización',
+        help_text='Cotización de la que se generó el PDF (deals/pdf.py)'
+    )
     
     # Metadata
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name='Subido por')
@@ -71,6 +99,8 @@ class Document(models.Model):
     # Seguridad
     is_confidential = models.BooleanField('Confidencial', default=False)
     
+    objects = DocumentQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Documento'
         verbose_name_plural = 'Documentos'
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
 from model_utils import FieldTracker
+from core.rbac import RBACQuerySet, account_visible_for
 
 
 class EmailTemplate(models.Model):
@@ -44,6 +45,15 @@ class EmailTemplate(models.Model):
         return f"{self.name} ({self.get_category_display()})"
 
 
+class EmailLogQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Emails enviados por el equipo o a empresas con sus deals"""
+        return (
+            models.Q(sent_by_id__in=scope.team_user_ids) |
+            account_visible_for('account_id', scope)
+        )
+
+
 class EmailLog(models.Model):
     """
     Registro de emails enviados
@@ -86,6 +96,8 @@ class EmailLog(models.Model):
     # Tracker para detectar cambios en campos
     tracker = FieldTracker(fields=['status'])
     
+    objects = EmailLogQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Log de Email'
         verbose_name_plural = 'Logs de Emails'
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from unfold.admin import ModelAdmin
 from core.rbac_mixins import RBACModelAdminMixin, RestrictExportMixin
+from core.search import SearchBackendAdminMixin
 from .models import Interaction, Call, Meeting
 
 
@@ -19,7 +20,7 @@ class MeetingInline(admin.StackedInline):
 
 
 @admin.register(Interaction)
-class InteractionAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
+class InteractionAdmin(RBACModelAdminMixin, RestrictExportMixin, SearchBackendAdminMixin, ModelAdmin):
     list_display = (
         'subject',
         'interaction_type_badge',
@@ -114,8 +115,9 @@ class InteractionAdmin(RBACModelAdminMixin, RestrictExportMixin, ModelAdmin):
     status_badge.admin_order_field = 'status'
     
     def next_contact_suggestion(self, obj):
-        """Muestra la próxima fecha de contacto sugerida"""
-        next_date = obj.get_next_suggested_contact()
+        """Muestra la próxima fecha de contacto sugerida (precalculada si existe)"""
+        related = obj.contact or obj.deal
+        next_date = getattr(related, 'next_contact_at', None) or obj.get_next_suggested_contact()
         if next_date:
             return format_html(
                 '<div style="background: linear-gradient(135deg, #1e293b 0%, #64748b 100%); '
@@ -0,0 +1,50 @@
+"""
+Comando para recalcular el próximo contacto sugerido de contactos y deals
+Uso: python manage.py update_next_contact_dates [--contacts] [--deals] [--batch-size N]
+Programarlo periódicamente (cron), p. ej. una vez al día de madrugada.
+"""
+
+from core.metrics import TimedCommand
+from contacts.models import Contact
+from deals.models import Deal
+from deals.pipeline import CLOSED_STAGES
+from interactions.next_contact import update_next_contact_dates
+
+
+class Command(TimedCommand):
+    help = 'Recalcula next_contact_at de contactos y deals abiertos en lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--contacts',
+            action='store_true',
+            help='Solo contactos',
+        )
+        parser.add_argument(
+            '--deals',
+            action='store_true',
+            help='Solo deals abiertos',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Filas por lote (una consulta de historial por lote)',
+        )
+
+    def handle(self, *args, **options):
+        both = not options['contacts'] and not options['deals']
+        batch_size = options['batch_size']
+        
+        if options['contacts'] or both:
+            self.stdout.write(self.style.WARNING('Recalculando contactos...'))
+            count = update_next_contact_dates(Contact, batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f'{count} contactos actualizados'))
+        
+        if options['deals'] or both:
+            self.stdout.write(self.style.WARNING('Recalculando deals abiertos...'))
+            count = update_next_contact_dates(
+                Deal,
+                Deal.objects.exclude(stage__in=CLOSED_STAGES),
+                batch_size=batch_size
+            )
+            self.stdout.write(self.style.SUCCESS(f'{count} deals actualizados'))
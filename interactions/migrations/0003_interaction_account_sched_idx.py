@@ -0,0 +1,22 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_account_number_of_employees'),
+        ('contacts', '0003_contact_name_list_idx'),
+        ('deals', '0008_deal_next_contact_at'),
+        ('interactions', '0002_interaction_direction_interaction_summary_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interaction',
+            index=models.Index(fields=['account', '-scheduled_at'], name='interaction_account_sched_idx'),
+        ),
+    ]
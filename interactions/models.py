@@ -2,9 +2,21 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import timedelta
+from model_utils import FieldTracker
 from accounts.models import Account
 from contacts.models import Contact
 from deals.models import Deal
+from core.rbac import RBACQuerySet
+from .next_contact import HISTORY_SIZE, suggest_from_history
+
+
+class InteractionQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Interacciones asignadas a o creadas por el usuario o su equipo"""
+        return (
+            models.Q(assigned_to_id__in=scope.team_user_ids) |
+            models.Q(created_by_id__in=scope.team_user_ids)
+        )
 
 
 class Interaction(models.Model):
@@ -108,6 +120,11 @@ class Interaction(models.Model):
         related_name='created_interactions'
     )
     
+    # Tracker para detectar cambios de contacto o deal (interactions/signals.py)
+    tracker = FieldTracker(fields=['contact', 'deal'])
+    
+    objects = InteractionQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-scheduled_at']
         verbose_name = 'Interacción'
@@ -116,6 +133,8 @@ class Interaction(models.Model):
             models.Index(fields=['-scheduled_at']),
             models.Index(fields=['contact', '-scheduled_at']),
             models.Index(fields=['deal', '-scheduled_at']),
+            # Última actividad por empresa (empresas inactivas en reports/analytics.py)
+            models.Index(fields=['account', '-scheduled_at'], name='interaction_account_sched_idx'),
         ]
     
     def __str__(self):
@@ -127,6 +146,9 @@ class Interaction(models.Model):
         Calcula la próxima fecha de contacto sugerida basada en la frecuencia
         de las últimas interacciones del contacto o deal.
         
+        Para muchos contactos o deals a la vez usar interactions/next_contact.py
+        (una consulta por lote) y el campo precalculado next_contact_at.
+        
         Lógica:
         - Analiza las últimas 5 interacciones
         - Calcula el promedio de días entre interacciones
@@ -150,39 +172,9 @@ class Interaction(models.Model):
         
         # Obtener últimas interacciones
         recent_interactions = list(
-            qs.order_by('-scheduled_at')[:5].values_list('scheduled_at', flat=True)
+            qs.order_by('-scheduled_at')[:HISTORY_SIZE].values_list('scheduled_at', flat=True)
         )
-        
-        if len(recent_interactions) < 2:
-            # No hay suficiente historial, sugerir 7 días
-            return now + timedelta(days=7)
-        
-        # Calcular intervalos entre interacciones
-        intervals = []
-        for i in range(len(recent_interactions) - 1):
-            delta = (recent_interactions[i] - recent_interactions[i + 1]).days
-            intervals.append(delta)
-        
-        # Promedio de días entre interacciones
-        avg_interval = sum(intervals) / len(intervals)
-        
-        # Ajustes inteligentes
-        if avg_interval < 3:
-            suggested_days = 3  # Mínimo 3 días
-        elif avg_interval > 30:
-            suggested_days = 30  # Máximo 30 días
-        else:
-            suggested_days = int(avg_interval)
-        
-        # Calcular próxima fecha desde la última interacción
-        last_interaction_date = recent_interactions[0]
-        next_date = last_interaction_date + timedelta(days=suggested_days)
-        
-        # Si la fecha calculada ya pasó, usar hoy + intervalo
-        if next_date < now:
-            next_date = now + timedelta(days=suggested_days)
-        
-        return next_date
+        return suggest_from_history(recent_interactions, now)
     
     def get_next_suggested_contact(self):
         """Método de instancia para obtener la próxima fecha sugerida"""
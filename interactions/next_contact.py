@@ -0,0 +1,108 @@
+"""
+Predicción del próximo contacto
+===============================
+
+Sugiere cuándo volver a contactar a un contacto o deal según el ritmo de
+sus últimas interacciones completadas:
+
+- Se toman las últimas HISTORY_SIZE interacciones (por defecto 5)
+- El intervalo medio entre ellas, acotado a [3, 30] días, se suma a la
+  última; si esa fecha ya pasó, la sugerencia se cuenta desde hoy
+- Sin historial suficiente (menos de 2) se sugieren 7 días
+
+La versión por lotes obtiene el historial de muchos contactos o deals en
+una sola consulta con ROW_NUMBER() OVER (PARTITION BY ... ORDER BY
+scheduled_at DESC) y guarda el resultado en next_contact_at, de modo que
+"a quién contactar hoy" es una consulta indexada (due_for_contact()).
+El valor guardado es la fecha prevista sin adelantarla a hoy: si ya pasó,
+el contacto aparece como vencido en la cola de trabajo.
+"""
+
+from datetime import timedelta
+from itertools import groupby
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+
+HISTORY_SIZE = 5
+DEFAULT_INTERVAL_DAYS = 7
+MIN_INTERVAL_DAYS = 3
+MAX_INTERVAL_DAYS = 30
+
+BATCH_SIZE = 1000
+
+
+def suggest_from_history(dates, now=None, allow_past=False):
+    """
+    Próxima fecha sugerida a partir de las fechas de las últimas
+    interacciones (de la más reciente a la más antigua).
+    Con allow_past=True una fecha prevista ya pasada se retorna tal cual.
+    """
+    now = now or timezone.now()
+    if len(dates) < 2:
+        return now + timedelta(days=DEFAULT_INTERVAL_DAYS)
+    
+    intervals = [(newer - older).days for newer, older in zip(dates, dates[1:])]
+    avg_interval = sum(intervals) / len(intervals)
+    suggested_days = min(max(int(avg_interval), MIN_INTERVAL_DAYS), MAX_INTERVAL_DAYS)
+    
+    next_date = dates[0] + timedelta(days=suggested_days)
+    if next_date < now and not allow_past:
+        next_date = now + timedelta(days=suggested_days)
+    return next_date
+
+
+def recent_history(field, ids, now=None):
+    """
+    {id: [fechas]} con las últimas HISTORY_SIZE interacciones completadas de
+    cada contacto o deal (field = 'contact_id' o 'deal_id'), en una consulta.
+    """
+    from .models import Interaction
+    
+    now = now or timezone.now()
+    rows = (
+        Interaction.objects
+        .filter(status='completed', scheduled_at__lte=now, **{f'{field}__in': ids})
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F(field)],
+            order_by=F('scheduled_at').desc()
+        ))
+        .filter(position__lte=HISTORY_SIZE)
+        .order_by(field, 'position')
+        .values_list(field, 'scheduled_at')
+    )
+    return {
+        key: [scheduled_at for _key, scheduled_at in group]
+        for key, group in groupby(rows, key=lambda row: row[0])
+    }
+
+
+def predict_next_contact(field, ids, now=None, allow_past=False):
+    """{id: próxima fecha sugerida} para todos los ids indicados"""
+    now = now or timezone.now()
+    ids = list(ids)
+    history = recent_history(field, ids, now)
+    return {pk: suggest_from_history(history.get(pk, []), now, allow_past) for pk in ids}
+
+
+def update_next_contact_dates(model, queryset=None, batch_size=None):
+    """
+    Recalcula y guarda next_contact_at de Contact o Deal (model) por lotes:
+    una consulta de historial y un bulk_update por lote.
+    Retorna el número de filas actualizadas.
+    """
+    field = f'{model._meta.model_name}_id'
+    batch_size = batch_size or BATCH_SIZE
+    queryset = model.objects.all() if queryset is None else queryset
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    now = timezone.now()
+    
+    updated = 0
+    for start in range(0, len(ids), batch_size):
+        predictions = predict_next_contact(field, ids[start:start + batch_size], now, allow_past=True)
+        objects = [model(pk=pk, next_contact_at=next_at) for pk, next_at in predictions.items()]
+        updated += model.objects.bulk_update(objects, ['next_contact_at'], batch_size=batch_size)
+    return updated
@@ -0,0 +1,46 @@
+"""
+Mantenimiento incremental del próximo contacto
+==============================================
+
+Al guardar o borrar una interacción se recalcula next_contact_at de su
+contacto y de su deal (y de los anteriores si la interacción se movió).
+El recálculo se agrupa: una vez por contacto/deal al confirmar la
+transacción, aunque se guarden muchas interacciones.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from contacts.models import Contact
+from core.transactions import on_commit_once
+from deals.models import Deal
+from .models import Interaction
+from .next_contact import update_next_contact_dates
+
+
+def schedule_next_contact_update(contact_ids=(), deal_ids=()):
+    """Programa el recálculo de next_contact_at al confirmar la transacción"""
+    for model, ids in ((Contact, contact_ids), (Deal, deal_ids)):
+        for pk in {pk for pk in ids if pk}:
+            on_commit_once(
+                ('next-contact', model._meta.model_name, pk),
+                lambda model=model, pk=pk: update_next_contact_dates(model, model.objects.filter(pk=pk))
+            )
+
+
+@receiver(post_save, sender=Interaction)
+def interaction_saved_next_contact(sender, instance, created, **kwargs):
+    """Recalcula el próximo contacto del contacto y deal de la interacción"""
+    contact_ids = [instance.contact_id]
+    deal_ids = [instance.deal_id]
+    if not created:
+        # Si la interacción cambió de contacto o deal, el anterior también cambia
+        contact_ids.append(instance.tracker.previous('contact'))
+        deal_ids.append(instance.tracker.previous('deal'))
+    schedule_next_contact_update(contact_ids, deal_ids)
+
+
+@receiver(post_delete, sender=Interaction)
+def interaction_deleted_next_contact(sender, instance, **kwargs):
+    """Recalcula el próximo contacto tras borrar una interacción"""
+    schedule_next_contact_update([instance.contact_id], [instance.deal_id])
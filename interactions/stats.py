@@ -0,0 +1,52 @@
+"""
+Estadísticas del listado de interacciones
+=========================================
+
+Total, llamadas, reuniones y completadas en una sola consulta con
+agregación condicional (Count(filter=Q(...))) sobre el mismo queryset
+filtrado del listado.
+
+Sin filtros, el resultado se puede cachear unos segundos por alcance
+RBAC (INTERACTIONS_STATS_CACHE_TIMEOUT; 0 lo desactiva): son contadores
+aproximados que no justifican recorrer la tabla en cada visita. Solo con
+una caché compartida entre workers (ver core/caching.py).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core.caching import shared_cache_enabled
+from core.rbac import get_rbac_scope
+from .models import Interaction
+
+
+INTERACTIONS_STATS_CACHE_TIMEOUT = getattr(settings, 'INTERACTIONS_STATS_CACHE_TIMEOUT', 60)
+
+
+def interaction_stats(queryset):
+    """{'total', 'calls', 'meetings', 'completed'} del queryset en una consulta"""
+    return queryset.order_by().aggregate(
+        total=Count('id'),
+        calls=Count('id', filter=Q(interaction_type='call')),
+        meetings=Count('id', filter=Q(interaction_type='meeting')),
+        completed=Count('id', filter=Q(status='completed')),
+    )
+
+
+def cached_interaction_stats(user):
+    """
+    Estadísticas de todas las interacciones visibles para el usuario,
+    cacheadas por alcance (quien ve todo comparte una sola entrada).
+    """
+    queryset = Interaction.objects.visible_to(user)
+    if not shared_cache_enabled(INTERACTIONS_STATS_CACHE_TIMEOUT):
+        return interaction_stats(queryset)
+
+    scope = get_rbac_scope(user)
+    key = 'interactions:stats:all' if scope.sees_all else f'interactions:stats:user:{scope.user_id}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = interaction_stats(queryset)
+        cache.set(key, stats, INTERACTIONS_STATS_CACHE_TIMEOUT)
+    return stats
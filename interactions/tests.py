@@ -1,3 +1,87 @@
-from django.test import TestCase
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Account
+from deals.models import Deal
+from .models import Interaction
+from .stats import cached_interaction_stats, interaction_stats
+
+
+class InteractionStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        account = Account.objects.create(name='Acme')
+        now = timezone.now()
+        Interaction.objects.bulk_create([
+            Interaction(interaction_type=interaction_type, status=status, subject='...', account=account,
+                        assigned_to=cls.user, scheduled_at=now)
+            for interaction_type, status in (('call', 'completed'), ('call', 'scheduled'), ('meeting', 'completed'))
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = interaction_stats(Interaction.objects.all())
+        self.assertEqual(stats, {'total': 3, 'calls': 2, 'meetings': 1, 'completed': 2})
+
+    def test_process_local_cache_is_not_used(self):
+        self.assertEqual(cached_interaction_stats(self.user)['total'], 3)
+        Interaction.objects.filter(interaction_type='meeting').delete()
+        self.assertEqual(cached_interaction_stats(self.user)['total'], 2)
+
+    def test_shared_cache_is_used(self):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp(),
+        }}
+        with override_settings(CACHES=caches):
+            self.assertEqual(cached_interaction_stats(self.user)['total'], 3)
+            user = User.objects.get(pk=self.user.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(cached_interaction_stats(user)['total'], 3)
+
+
+class BulkInteractionAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.account = Account.objects.create(name='Acme')
+        cls.old_deal = Deal.objects.create(name='Anterior', account=cls.account, value=Decimal('10'),
+                                           assigned_to=cls.user)
+        cls.new_deal = Deal.objects.create(name='Nuevo', account=cls.account, value=Decimal('10'),
+                                           assigned_to=cls.user)
+
+    def score(self, deal):
+        return Deal.objects.filter(pk=deal.pk).values_list('lead_score', flat=True).get()
+
+    def test_moving_interactions_rescores_both_deals(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        base_score = self.score(self.old_deal)
+        rows = [
+            {'interaction_type': 'meeting', 'subject': f'Reunión {index}', 'account': self.account.pk,
+             'deal': self.old_deal.pk, 'assigned_to': self.user.pk, 'scheduled_at': timezone.now().isoformat()}
+            for index in range(5)
+        ]
+        created = client.post('/api/interactions/bulk-create/', rows, format='json').json()['created_ids']
+        self.assertGreater(self.score(self.old_deal), base_score)
+
+        response = client.patch(
+            '/api/interactions/bulk-update/',
+            [{'id': pk, 'deal': self.new_deal.pk} for pk in created],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.score(self.old_deal), base_score)
+        self.assertGreater(self.score(self.new_deal), base_score)
@@ -1,8 +1,14 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from core.pagination import keyset_paginate
+from core.search import search_queryset
 from .models import Interaction
+from .stats import cached_interaction_stats, interaction_stats
+
+INTERACTIONS_PAGE_SIZE = 100
+INTERACTIONS_ORDERING = ['-scheduled_at', '-id']
+INTERACTION_SEARCH_FIELDS = ['subject', 'summary', 'account__name', 'contact__first_name', 'contact__last_name']
 
 @login_required
 def interactions_list(request):
@@ -11,7 +17,7 @@ def interactions_list(request):
     status = request.GET.get('status', '')
     query = request.GET.get('q', '')
     
-    interactions = Interaction.objects.select_related('account', 'contact', 'assigned_to')
+    interactions = Interaction.objects.visible_to(request.user).select_related('account', 'contact', 'assigned_to')
     
     if interaction_type:
         interactions = interactions.filter(interaction_type=interaction_type)
@@ -20,30 +26,31 @@ def interactions_list(request):
         interactions = interactions.filter(status=status)
     
     if query:
-        interactions = interactions.filter(
-            Q(subject__icontains=query) |
-            Q(account__name__icontains=query) |
-            Q(contact__first_name__icontains=query) |
-            Q(contact__last_name__icontains=query)
-        )
+        interactions = search_queryset(interactions, query, INTERACTION_SEARCH_FIELDS)
     
-    interactions = interactions.order_by('-scheduled_at')
+    # Estadísticas rápidas: una sola consulta (cacheada si no hay filtros)
+    if interaction_type or status or query:
+        stats = interaction_stats(interactions)
+    else:
+        stats = cached_interaction_stats(request.user)
     
-    # Estadísticas rápidas
-    total_count = interactions.count()
-    calls_count = interactions.filter(interaction_type='call').count()
-    meetings_count = interactions.filter(interaction_type='meeting').count()
-    completed_count = interactions.filter(status='completed').count()
+    page = keyset_paginate(
+        interactions,
+        INTERACTIONS_ORDERING,
+        INTERACTIONS_PAGE_SIZE,
+        request.GET.get('cursor')
+    )
     
     context = {
-        'interactions': interactions[:100],  # Limitar a 100 para performance
+        'interactions': page.items,
+        'page': page,
         'interaction_type': interaction_type,
         'status': status,
         'query': query,
-        'total_count': total_count,
-        'calls_count': calls_count,
-        'meetings_count': meetings_count,
-        'completed_count': completed_count,
+        'total_count': stats['total'],
+        'calls_count': stats['calls'],
+        'meetings_count': stats['meetings'],
+        'completed_count': stats['completed'],
     }
     return render(request, 'interactions/interactions_list.html', context)
 
@@ -51,7 +58,7 @@ def interactions_list(request):
 def interaction_detail(request, interaction_id):
     """Detalle de una interacción"""
     interaction = get_object_or_404(
-        Interaction.objects.select_related('account', 'contact', 'assigned_to'),
+        Interaction.objects.visible_to(request.user).select_related('account', 'contact', 'assigned_to'),
         id=interaction_id
     )
     
@@ -5,3 +5,7 @@ class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
     verbose_name = 'Notificaciones'
+    
+    def ready(self):
+        """Importar signals cuando la app esté lista"""
+        import notifications.signals
@@ -0,0 +1,18 @@
+"""
+Context processors de notificaciones
+"""
+
+from functools import partial
+
+from .counters import get_unread_count
+
+
+def unread_notifications(request):
+    """
+    Expone 'unread_notifications_count' a las plantillas.
+    Es un callable: solo se consulta (caché) si la plantilla lo usa.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications_count': partial(get_unread_count, user)}
@@ -0,0 +1,130 @@
+"""
+Contadores de notificaciones no leídas
+======================================
+
+Cada usuario tiene un contador en caché que se mantiene con las señales
+de Notification (alta, lectura, borrado):
+
+- Alta de una notificación no leída: incremento atómico (cache.incr)
+- Lectura, edición o borrado: se invalida la clave y se recalcula en la
+  siguiente lectura
+- Sin valor en caché: se cuenta en la BD (índice recipient, is_read) y
+  se guarda
+
+La reconciliación periódica (reconcile_notification_counters) corrige
+cualquier desviación entre la caché y la base de datos.
+
+Solo se cachea con una caché compartida entre workers (ver
+core/caching.py); con LocMemCache se cuenta en la BD en cada lectura.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+
+from core.caching import shared_cache_enabled
+
+
+UNREAD_CACHE_TIMEOUT = getattr(settings, 'NOTIFICATIONS_UNREAD_CACHE_TIMEOUT', 60 * 5)
+
+
+def _cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def counters_enabled():
+    """Los contadores se cachean solo en una caché compartida"""
+    return shared_cache_enabled(UNREAD_CACHE_TIMEOUT)
+
+
+def count_unread(user):
+    """Cuenta en la BD las notificaciones no leídas del usuario"""
+    from .models import Notification
+    return Notification.objects.unread_for(user).count()
+
+
+def get_unread_count(user):
+    """
+    Retorna el número de notificaciones no leídas del usuario.
+    Lee de la caché; si no está, cuenta en la BD y guarda el resultado.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return 0
+    if not counters_enabled():
+        return count_unread(user)
+    key = _cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = count_unread(user)
+        cache.set(key, count, UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def increment_unread(user_id, delta=1):
+    """
+    Ajusta el contador del usuario si está en caché.
+    Si no está, no se hace nada: se recalculará en la siguiente lectura.
+    """
+    if not counters_enabled():
+        return
+    key = _cache_key(user_id)
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        return
+    if count < 0:
+        cache.delete(key)
+
+
+def invalidate_unread_counts(user_ids):
+    """Borra los contadores de los usuarios indicados"""
+    keys = [_cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+def reconcile_unread_counts(user_ids=None):
+    """
+    Recalcula los contadores desde la BD con una sola consulta agregada
+    y los guarda en caché.
+    Retorna un dict {user_id: (valor_en_cache, valor_real)} con las diferencias
+    (vacío si no hay caché compartida: no hay contadores que corregir).
+    """
+    from .models import Notification
+
+    if not counters_enabled():
+        return {}
+    if user_ids is None:
+        user_ids = User.objects.filter(is_active=True).values_list('id', flat=True)
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+
+    # Mismo criterio que unread_for(): vigentes, no leídas y posteriores a la marca de lectura
+    counts = dict(
+        Notification.objects
+        .active()
+        .filter(recipient_id__in=user_ids, is_read=False)
+        .filter(
+            Q(recipient__notification_read_state__isnull=True) |
+            Q(created_at__gt=F('recipient__notification_read_state__read_until'))
+        )
+        .values('recipient_id')
+        .annotate(total=Count('id'))
+        .values_list('recipient_id', 'total')
+    )
+
+    cached = cache.get_many([_cache_key(user_id) for user_id in user_ids])
+    fixed = {}
+    for user_id in user_ids:
+        cached_value = cached.get(_cache_key(user_id))
+        real_value = counts.get(user_id, 0)
+        if cached_value is not None and cached_value != real_value:
+            fixed[user_id] = (cached_value, real_value)
+
+    cache.set_many(
+        {_cache_key(user_id): counts.get(user_id, 0) for user_id in user_ids},
+        UNREAD_CACHE_TIMEOUT
+    )
+    return fixed
@@ -0,0 +1,233 @@
+"""
+Fan-out de notificaciones
+=========================
+
+Envía una misma notificación a muchos destinatarios sin crear una fila
+(y un evento de timeline) por petición:
+
+- Destinatarios por usuarios, grupos o equipos RBAC (un manager y los
+  usuarios que creó), resueltos en una sola consulta
+- El envío se guarda (NotificationBroadcast) en la transacción de quien
+  llama y se escribe con bulk_create por bloques, en segundo plano tras el
+  commit. Cada bloque confirma junto con el avance del envío: si el worker
+  se reinicia a mitad, resume_notification_broadcasts lo retoma desde el
+  primer bloque sin escribir y sin duplicar notificaciones
+- Digest opcional: si el usuario ya tiene una notificación no leída con
+  la misma digest_key dentro de la ventana, se acumula en ella
+  (digest_count + 1) en lugar de crear otra
+- Un único evento de timeline de resumen por envío
+
+Uso:
+    from notifications.fanout import notify
+
+    notify(
+        'Nueva política de descuentos',
+        'Revisa los nuevos márgenes antes de cotizar.',
+        groups=['Sales Representative'],
+        notification_type='system',
+        actor=request.user,
+    )
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.background import on_commit_background
+from .counters import invalidate_unread_counts
+from .models import Notification, NotificationBroadcast
+
+
+FANOUT_CHUNK_SIZE = getattr(settings, 'NOTIFICATIONS_FANOUT_CHUNK_SIZE', 1000)
+DIGEST_WINDOW_MINUTES = getattr(settings, 'NOTIFICATIONS_DIGEST_WINDOW_MINUTES', 15)
+BROADCAST_STALE_MINUTES = getattr(settings, 'NOTIFICATIONS_BROADCAST_STALE_MINUTES', 10)
+
+
+def _ids(values):
+    """Acepta instancias o IDs y retorna la lista de IDs"""
+    return [getattr(value, 'pk', value) for value in values or []]
+
+
+def resolve_recipients(users=None, groups=None, teams=None):
+    """
+    Retorna los IDs (ordenados, sin duplicados) de los usuarios activos
+    incluidos en users, groups (Group, ID o nombre) y teams (managers).
+    """
+    user_ids = _ids(users)
+    group_names = [group for group in groups or [] if isinstance(group, str)]
+    group_ids = _ids(group for group in groups or [] if not isinstance(group, str))
+    manager_ids = _ids(teams)
+
+    condition = Q(pk__in=user_ids)
+    if group_names:
+        condition |= Q(groups__name__in=group_names)
+    if group_ids:
+        condition |= Q(groups__in=group_ids)
+    if manager_ids:
+        # Equipo RBAC: el manager y los usuarios que ha creado
+        condition |= Q(pk__in=manager_ids) | Q(profile__created_by__in=manager_ids)
+
+    return sorted(set(
+        User.objects.filter(condition, is_active=True).values_list('id', flat=True)
+    ))
+
+
+def _deliver_chunk(chunk, payload, digest_key, expires_at, window_start):
+    """
+    Escribe las notificaciones de un bloque de destinatarios.
+    Retorna (IDs con notificación nueva, IDs agrupados en una existente).
+    """
+    digested_ids = set()
+    if digest_key:
+        pending = Notification.objects.filter(
+            recipient_id__in=chunk,
+            digest_key=digest_key,
+            is_read=False,
+            created_at__gte=window_start
+        )
+        digested_ids = set(pending.values_list('recipient_id', flat=True))
+        if digested_ids:
+            # Una sola UPDATE acumula el aviso en las notificaciones existentes
+            pending.update(
+                digest_count=F('digest_count') + 1,
+                title=payload['title'],
+                message=payload['message'],
+            )
+
+    new_ids = [user_id for user_id in chunk if user_id not in digested_ids]
+    Notification.objects.bulk_create(
+        [
+            Notification(recipient_id=user_id, digest_key=digest_key, expires_at=expires_at, **payload)
+            for user_id in new_ids
+        ],
+        batch_size=FANOUT_CHUNK_SIZE
+    )
+    transaction.on_commit(lambda: invalidate_unread_counts(new_ids))
+    return new_ids, digested_ids
+
+
+def deliver_broadcast(broadcast_id):
+    """
+    Escribe un envío desde su primer bloque pendiente.
+    Cada bloque confirma en la misma transacción que el avance de next_offset,
+    con la fila del envío bloqueada: reanudar tras un fallo o ejecutarlo dos
+    veces a la vez no duplica notificaciones.
+    Retorna {'recipients', 'created', 'digested'}.
+    """
+    broadcasts = NotificationBroadcast.objects.filter(pk=broadcast_id)
+    broadcasts.update(attempts=F('attempts') + 1)
+    recipient_ids = broadcasts.values_list('recipient_ids', flat=True).get()
+
+    try:
+        while True:
+            with transaction.atomic():
+                broadcast = broadcasts.select_for_update().defer('recipient_ids').get()
+                if broadcast.status == 'done':
+                    break
+                # Ventana de digest fija desde la creación del envío (igual al reanudar)
+                window_start = broadcast.created_at - timedelta(minutes=DIGEST_WINDOW_MINUTES)
+                chunk = recipient_ids[broadcast.next_offset:broadcast.next_offset + FANOUT_CHUNK_SIZE]
+                if not chunk:
+                    broadcast.status = 'done'
+                    broadcast.completed_at = timezone.now()
+                    broadcast.recipient_ids = []
+                    broadcast.last_error = ''
+                    broadcast.save(update_fields=[
+                        'status', 'completed_at', 'recipient_ids', 'last_error', 'updated_at'
+                    ])
+                    _record_summary_event(broadcast)
+                    break
+                new_ids, digested_ids = _deliver_chunk(
+                    chunk, broadcast.payload, broadcast.digest_key, broadcast.expires_at, window_start
+                )
+                broadcast.next_offset += len(chunk)
+                broadcast.created_count += len(new_ids)
+                broadcast.digested_count += len(digested_ids)
+                broadcast.save(update_fields=['next_offset', 'created_count', 'digested_count', 'updated_at'])
+    except Exception as e:
+        broadcasts.update(last_error=f'{type(e).__name__}: {e}')
+        raise
+    return broadcast.summary()
+
+
+def resume_broadcasts(stale_after=None):
+    """
+    Reanuda los envíos pendientes sin avance desde hace stale_after (timedelta;
+    por defecto NOTIFICATIONS_BROADCAST_STALE_MINUTES): los de un worker que se
+    reinició o cuya tarea en segundo plano falló.
+    Retorna {broadcast_id: resumen}.
+    """
+    if stale_after is None:
+        stale_after = timedelta(minutes=BROADCAST_STALE_MINUTES)
+    pending = NotificationBroadcast.objects.filter(
+        status='pending',
+        updated_at__lte=timezone.now() - stale_after
+    ).order_by('created_at').values_list('pk', flat=True)
+    return {broadcast_id: deliver_broadcast(broadcast_id) for broadcast_id in list(pending)}
+
+
+def _record_summary_event(broadcast):
+    """Un único evento de timeline por envío (en lugar de uno por destinatario)"""
+    from timeline.models import TimelineEvent
+
+    payload = broadcast.payload
+    result = broadcast.summary()
+    TimelineEvent.objects.create(
+        event_type='notification',
+        action='sent',
+        title=f"🔔 {payload['title']}",
+        description=f"Enviada a {result['recipients']} destinatarios",
+        user_id=broadcast.actor_id,
+        account_id=payload.get('account_id'),
+        contact_id=payload.get('contact_id'),
+        deal_id=payload.get('deal_id'),
+        is_important=payload.get('priority') in ['high', 'urgent'],
+        metadata={
+            'notification_type': payload.get('notification_type'),
+            'priority': payload.get('priority'),
+            'digest_key': broadcast.digest_key,
+            **result,
+        }
+    )
+
+
+def notify(title, message, users=None, groups=None, teams=None, notification_type='other',
+           priority='normal', action_url='', expires_at=None, task=None, deal=None,
+           account=None, contact=None, digest_key='', actor=None, background=True):
+    """
+    Envía una notificación a todos los destinatarios resueltos.
+    Con background=True la escritura se encola tras el commit y retorna
+    el número de destinatarios; si no, retorna el resumen de deliver_broadcast().
+    """
+    recipient_ids = resolve_recipients(users=users, groups=groups, teams=teams)
+    if not recipient_ids:
+        return 0 if background else {'recipients': 0, 'created': 0, 'digested': 0}
+
+    payload = {
+        'notification_type': notification_type,
+        'priority': priority,
+        'title': title,
+        'message': message,
+        'action_url': action_url,
+        'task_id': getattr(task, 'pk', task),
+        'deal_id': getattr(deal, 'pk', deal),
+        'account_id': getattr(account, 'pk', account),
+        'contact_id': getattr(contact, 'pk', contact),
+    }
+    broadcast = NotificationBroadcast.objects.create(
+        payload=payload,
+        recipient_ids=recipient_ids,
+        recipients_count=len(recipient_ids),
+        digest_key=digest_key,
+        expires_at=expires_at,
+        actor_id=getattr(actor, 'pk', actor),
+    )
+
+    if background:
+        on_commit_background(deliver_broadcast, broadcast.pk)
+        return len(recipient_ids)
+    return deliver_broadcast(broadcast.pk)
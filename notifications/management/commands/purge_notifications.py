@@ -0,0 +1,66 @@
+"""
+Comando para purgar notificaciones expiradas y antiguas según la retención
+Uso: python manage.py purge_notifications [--dry-run] [--archive] [--batch-size N]
+Programarlo periódicamente (cron), p. ej. una vez al día.
+"""
+
+from core.metrics import TimedCommand
+from notifications.retention import purge_notifications
+
+
+class Command(TimedCommand):
+    help = 'Elimina o archiva por bloques las notificaciones expiradas y antiguas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo contar lo que se purgaría, sin borrar nada',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            default=None,
+            help='Copiar las filas a ArchivedNotification antes de borrarlas',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Filas por bloque (por defecto NOTIFICATIONS_RETENTION_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Detenerse tras N bloques (para acotar la duración)',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Segundos de pausa entre bloques',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        self.stdout.write(self.style.WARNING(
+            'Calculando notificaciones a purgar...' if dry_run else 'Purgando notificaciones...'
+        ))
+        
+        result = purge_notifications(
+            batch_size=options['batch_size'],
+            archive=options['archive'],
+            dry_run=dry_run,
+            max_batches=options['max_batches'],
+            pause=options['pause'],
+        )
+        
+        self.stdout.write('')
+        for notification_type, total in sorted(result['by_type'].items()):
+            self.stdout.write(f'   {notification_type}: {total}')
+        
+        verb = 'se purgarían' if dry_run else 'eliminadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['removed']} notificaciones {verb} "
+            f"({result['archived']} archivadas, {result['batches']} bloques) "
+            f"en {result['seconds']}s"
+        ))
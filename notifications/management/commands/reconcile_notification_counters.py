@@ -0,0 +1,37 @@
+"""
+Comando para reconciliar los contadores de notificaciones no leídas
+Uso: python manage.py reconcile_notification_counters [--user ID ...]
+Programarlo periódicamente (cron) para corregir desviaciones de la caché.
+"""
+
+from core.metrics import TimedCommand
+from notifications.counters import reconcile_unread_counts
+
+
+class Command(TimedCommand):
+    help = 'Recalcula desde la BD los contadores en caché de notificaciones no leídas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='ID de usuario a reconciliar (se puede repetir). Por defecto, todos los activos',
+        )
+        parser.add_argument(
+            '--verbose',
+            action='store_true',
+            help='Mostrar cada contador corregido',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reconciliando contadores de notificaciones...'))
+        
+        fixed = reconcile_unread_counts(options['user_ids'])
+        
+        if options['verbose']:
+            for user_id, (cached_value, real_value) in sorted(fixed.items()):
+                self.stdout.write(f'  Usuario {user_id}: {cached_value} → {real_value}')
+        
+        self.stdout.write(self.style.SUCCESS(f'{len(fixed)} contadores corregidos'))
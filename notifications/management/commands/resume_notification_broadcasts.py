@@ -0,0 +1,37 @@
+"""
+Comando para reanudar los envíos masivos de notificaciones interrumpidos
+Uso: python manage.py resume_notification_broadcasts [--stale-minutes N]
+Programarlo periódicamente (cron): retoma los envíos cuyo worker se reinició
+o cuya tarea en segundo plano falló, desde el primer bloque sin escribir.
+"""
+
+from datetime import timedelta
+
+from core.metrics import TimedCommand
+from notifications.fanout import BROADCAST_STALE_MINUTES, resume_broadcasts
+
+
+class Command(TimedCommand):
+    help = 'Reanuda los envíos masivos de notificaciones pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=BROADCAST_STALE_MINUTES,
+            help='Minutos sin avance para considerar interrumpido un envío '
+                 '(por defecto NOTIFICATIONS_BROADCAST_STALE_MINUTES)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Reanudando envíos de notificaciones pendientes...'))
+        
+        resumed = resume_broadcasts(timedelta(minutes=options['stale_minutes']))
+        
+        for broadcast_id, result in sorted(resumed.items()):
+            self.stdout.write(
+                f"  Envío {broadcast_id}: {result['created']} creadas, "
+                f"{result['digested']} agrupadas de {result['recipients']}"
+            )
+        
+        self.stdout.write(self.style.SUCCESS(f'{len(resumed)} envíos completados'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile'),
+        ('contacts', '0001_initial'),
+        ('deals', '0004_quote_quoteitem_quote_deals_quote_status_f33c56_idx_and_more'),
+        ('notifications', '0003_notificationreadstate'),
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='digest_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Avisos agrupados'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='digest_key',
+            field=models.CharField(blank=True, help_text='Las notificaciones no leídas con la misma clave se agrupan por usuario', max_length=100, verbose_name='Clave de agrupación'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'digest_key', 'is_read'], name='notificatio_recipie_62d3ef_idx'),
+        ),
+    ]
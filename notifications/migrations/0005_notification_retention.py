@@ -0,0 +1,55 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile'),
+        ('contacts', '0001_initial'),
+        ('deals', '0004_quote_quoteitem_quote_deals_quote_status_f33c56_idx_and_more'),
+        ('notifications', '0004_notification_digest'),
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(db_index=True, verbose_name='ID original')),
+                ('notification_type', models.CharField(choices=[('task', 'Tarea'), ('deal', 'Trato'), ('interaction', 'Interacción'), ('mention', 'Mención'), ('reminder', 'Recordatorio'), ('system', 'Sistema'), ('other', 'Otro')], max_length=20, verbose_name='Tipo')),
+                ('priority', models.CharField(choices=[('low', 'Baja'), ('normal', 'Normal'), ('high', 'Alta'), ('urgent', 'Urgente')], max_length=10, verbose_name='Prioridad')),
+                ('title', models.CharField(max_length=255, verbose_name='Título')),
+                ('message', models.TextField(verbose_name='Mensaje')),
+                ('action_url', models.CharField(blank=True, max_length=500, verbose_name='URL de acción')),
+                ('is_read', models.BooleanField(default=False, verbose_name='Leída')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Leída el')),
+                ('created_at', models.DateTimeField(verbose_name='Creada el')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expira el')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivada el')),
+            ],
+            options={
+                'verbose_name': 'Notificación archivada',
+                'verbose_name_plural': 'Notificaciones archivadas',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['expires_at'], name='notificatio_expires_4f3289_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['read_at'], name='notification_read_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivednotification',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_notifications', to=settings.AUTH_USER_MODEL, verbose_name='Destinatario'),
+        ),
+    ]
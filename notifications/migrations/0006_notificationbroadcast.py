@@ -0,0 +1,43 @@
+# Generated by Django 5.2.11 on 2026-10-19 03:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(verbose_name='Contenido')),
+                ('recipient_ids', models.JSONField(help_text='Se vacía al completar el envío', verbose_name='Destinatarios')),
+                ('recipients_count', models.PositiveIntegerField(verbose_name='Número de destinatarios')),
+                ('digest_key', models.CharField(blank=True, max_length=100, verbose_name='Clave de agrupación')),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Expira el')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Completado')], default='pending', max_length=10, verbose_name='Estado')),
+                ('next_offset', models.PositiveIntegerField(default=0, verbose_name='Siguiente destinatario')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='Notificaciones creadas')),
+                ('digested_count', models.PositiveIntegerField(default=0, verbose_name='Notificaciones agrupadas')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Creado el')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Actualizado el')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='Completado el')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Enviado por')),
+            ],
+            options={
+                'verbose_name': 'Envío masivo',
+                'verbose_name_plural': 'Envíos masivos',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['updated_at'], name='notif_broadcast_pending_idx')],
+            },
+        ),
+    ]
@@ -1,7 +1,70 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from core.rbac import RBACQuerySet, get_rbac_scope
+
+
+class NotificationQuerySet(RBACQuerySet):
+    """
+    Operaciones de lectura/escritura en bloque sobre notificaciones
+    """
+    
+    def visible_to(self, user):
+        """Cada usuario solo ve las notificaciones que recibe, también quien ve todo"""
+        return self.filter(self.rbac_condition(get_rbac_scope(user)))
+    
+    def rbac_condition(self, scope):
+        """Notificaciones recibidas por el usuario"""
+        return models.Q(recipient_id=scope.user_id)
+    
+    def active(self):
+        """Excluye en SQL las notificaciones expiradas"""
+        return self.filter(
+            models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now())
+        )
+    
+    def unread_for(self, user):
+        """
+        Notificaciones no leídas y vigentes del usuario.
+        Usa el índice (recipient, is_read) y descarta lo anterior a su marca de lectura.
+        """
+        qs = self.active().filter(recipient=user, is_read=False)
+        read_until = NotificationReadState.get_read_until(user)
+        if read_until:
+            qs = qs.filter(created_at__gt=read_until)
+        return qs
+    
+    def mark_as_read(self):
+        """Marca como leídas las notificaciones del queryset con un único UPDATE"""
+        from .counters import invalidate_unread_counts
+        
+        unread = self.filter(is_read=False)
+        recipient_ids = set(unread.values_list('recipient_id', flat=True).distinct())
+        count = unread.update(is_read=True, read_at=timezone.now())
+        if count:
+            transaction.on_commit(lambda: invalidate_unread_counts(recipient_ids))
+        return count
+    
+    def mark_all_read(self, user, before=None):
+        """
+        Marca como leído todo lo recibido por el usuario hasta `before` (por defecto, ahora).
+        Avanza la marca de lectura y actualiza las filas con un solo UPDATE.
+        Retorna el número de notificaciones marcadas.
+        """
+        from .counters import invalidate_unread_counts
+        
+        before = before or timezone.now()
+        with transaction.atomic():
+            NotificationReadState.advance(user, before)
+            count = self.filter(
+                recipient=user,
+                is_read=False,
+                created_at__lte=before
+            ).update(is_read=True, read_at=timezone.now())
+            transaction.on_commit(lambda: invalidate_unread_counts([user.pk]))
+        return count
+
 
 class Notification(models.Model):
     """
@@ -47,6 +110,15 @@ class Notification(models.Model):
     message = models.TextField('Mensaje')
     action_url = models.CharField('URL de acción', max_length=500, blank=True)
     
+    # Agrupación (digest): avisos similares en ráfaga se acumulan en una sola fila
+    digest_key = models.CharField(
+        'Clave de agrupación',
+        max_length=100,
+        blank=True,
+        help_text='Las notificaciones no leídas con la misma clave se agrupan por usuario'
+    )
+    digest_count = models.PositiveIntegerField('Avisos agrupados', default=1)
+    
     # Estado
     is_read = models.BooleanField('Leída', default=False)
     read_at = models.DateTimeField('Leída el', null=True, blank=True)
@@ -65,6 +137,8 @@ class Notification(models.Model):
         help_text='Fecha en que la notificación deja de ser relevante'
     )
     
+    objects = NotificationQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
@@ -72,6 +146,14 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['recipient', 'digest_key', 'is_read']),
+            # Purga de retención (notifications/retention.py)
+            models.Index(fields=['expires_at']),
+            models.Index(
+                fields=['read_at'],
+                condition=models.Q(is_read=True),
+                name='notification_read_at_idx'
+            ),
         ]
     
     def __str__(self):
@@ -82,10 +164,141 @@ class Notification(models.Model):
         if not self.is_read:
             self.is_read = True
             self.read_at = timezone.now()
-            self.save()
+            self.save(update_fields=['is_read', 'read_at'])
     
     def is_expired(self):
         """Verifica si la notificación ha expirado"""
         if self.expires_at:
             return timezone.now() > self.expires_at
         return False
+
+
+class NotificationReadState(models.Model):
+    """
+    Marca de lectura por usuario: todo lo recibido hasta `read_until`
+    se considera leído, sin necesidad de recorrer cada notificación
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_read_state',
+        verbose_name='Usuario'
+    )
+    read_until = models.DateTimeField('Leído hasta')
+    updated_at = models.DateTimeField('Actualizado el', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Estado de lectura'
+        verbose_name_plural = 'Estados de lectura'
+    
+    def __str__(self):
+        return f"{self.user.username} - leído hasta {self.read_until:%d/%m/%Y %H:%M}"
+    
+    @classmethod
+    def get_read_until(cls, user):
+        """Retorna la marca de lectura del usuario (o None)"""
+        return cls.objects.filter(user=user).values_list('read_until', flat=True).first()
+    
+    @classmethod
+    def advance(cls, user, read_until):
+        """Avanza la marca de lectura del usuario (nunca retrocede)"""
+        updated = cls.objects.filter(
+            user=user,
+            read_until__lt=read_until
+        ).update(read_until=read_until, updated_at=timezone.now())
+        if not updated:
+            cls.objects.get_or_create(user=user, defaults={'read_until': read_until})
+
+
+class ArchivedNotification(models.Model):
+    """
+    Copia de las notificaciones purgadas por la retención
+    (solo si NOTIFICATIONS_RETENTION_ARCHIVE está activo)
+    """
+    original_id = models.BigIntegerField('ID original', db_index=True)
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_notifications',
+        verbose_name='Destinatario'
+    )
+    notification_type = models.CharField('Tipo', max_length=20, choices=Notification.TYPE_CHOICES)
+    priority = models.CharField('Prioridad', max_length=10, choices=Notification.PRIORITY_CHOICES)
+    title = models.CharField('Título', max_length=255)
+    message = models.TextField('Mensaje')
+    action_url = models.CharField('URL de acción', max_length=500, blank=True)
+    is_read = models.BooleanField('Leída', default=False)
+    read_at = models.DateTimeField('Leída el', null=True, blank=True)
+    created_at = models.DateTimeField('Creada el')
+    expires_at = models.DateTimeField('Expira el', null=True, blank=True)
+    archived_at = models.DateTimeField('Archivada el', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Notificación archivada'
+        verbose_name_plural = 'Notificaciones archivadas'
+        ordering = ['-archived_at']
+    
+    def __str__(self):
+        return f"{self.title} - {self.recipient_id} (archivada)"
+
+
+class NotificationBroadcast(models.Model):
+    """
+    Envío masivo de notificaciones (notifications/fanout.py).
+    Se guarda al llamar a notify() y avanza bloque a bloque: si el proceso
+    muere a mitad, resume_notification_broadcasts lo retoma desde next_offset.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendiente'),
+        ('done', 'Completado'),
+    ]
+    
+    payload = models.JSONField('Contenido')
+    recipient_ids = models.JSONField('Destinatarios', help_text='Se vacía al completar el envío')
+    recipients_count = models.PositiveIntegerField('Número de destinatarios')
+    digest_key = models.CharField('Clave de agrupación', max_length=100, blank=True)
+    expires_at = models.DateTimeField('Expira el', null=True, blank=True)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Enviado por'
+    )
+    
+    # Progreso
+    status = models.CharField('Estado', max_length=10, choices=STATUS_CHOICES, default='pending')
+    next_offset = models.PositiveIntegerField('Siguiente destinatario', default=0)
+    created_count = models.PositiveIntegerField('Notificaciones creadas', default=0)
+    digested_count = models.PositiveIntegerField('Notificaciones agrupadas', default=0)
+    attempts = models.PositiveIntegerField('Intentos', default=0)
+    last_error = models.TextField('Último error', blank=True)
+    
+    created_at = models.DateTimeField('Creado el', auto_now_add=True)
+    updated_at = models.DateTimeField('Actualizado el', auto_now=True)
+    completed_at = models.DateTimeField('Completado el', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Envío masivo'
+        verbose_name_plural = 'Envíos masivos'
+        ordering = ['-created_at']
+        indexes = [
+            # Envíos a reanudar (resume_notification_broadcasts)
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(status='pending'),
+                name='notif_broadcast_pending_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.payload.get('title', '')} ({self.get_status_display()})"
+    
+    def summary(self):
+        return {
+            'recipients': self.recipients_count,
+            'created': self.created_count,
+            'digested': self.digested_count,
+        }
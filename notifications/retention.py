@@ -0,0 +1,155 @@
+"""
+Retención de notificaciones
+===========================
+
+Elimina (o archiva) por bloques las notificaciones que ya no aportan:
+
+- Expiradas: expires_at en el pasado, leídas o no
+- Leídas antiguas: read_at anterior a 'read_days' días
+- No leídas antiguas: created_at anterior a 'unread_days' días (opcional)
+
+Las políticas se configuran por tipo de notificación en settings:
+
+    NOTIFICATIONS_RETENTION = {
+        'default': {'read_days': 90, 'unread_days': 365},
+        'system': {'read_days': 30},
+    }
+
+Cada bloque se borra en su propia transacción corta para no mantener
+bloqueos largos sobre la tabla.
+"""
+
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .counters import invalidate_unread_counts
+from .models import ArchivedNotification, Notification
+
+
+DEFAULT_RETENTION_POLICY = {'read_days': 90, 'unread_days': None}
+
+RETENTION_POLICIES = getattr(settings, 'NOTIFICATIONS_RETENTION', {})
+RETENTION_BATCH_SIZE = getattr(settings, 'NOTIFICATIONS_RETENTION_BATCH_SIZE', 1000)
+RETENTION_ARCHIVE = getattr(settings, 'NOTIFICATIONS_RETENTION_ARCHIVE', False)
+
+ARCHIVE_FIELDS = [
+    'id', 'recipient_id', 'notification_type', 'priority', 'title', 'message',
+    'action_url', 'is_read', 'read_at', 'created_at', 'expires_at',
+]
+PURGE_FIELDS = ['id', 'recipient_id', 'is_read', 'notification_type']
+
+
+def get_policy(notification_type):
+    """Política efectiva de un tipo: 'default' más la configuración propia del tipo"""
+    return {
+        **DEFAULT_RETENTION_POLICY,
+        **RETENTION_POLICIES.get('default', {}),
+        **RETENTION_POLICIES.get(notification_type, {}),
+    }
+
+
+def purgeable_condition(now=None):
+    """Condición (Q) que cumplen las notificaciones a purgar según las políticas"""
+    now = now or timezone.now()
+    condition = Q(expires_at__lt=now)
+
+    for notification_type, _label in Notification.TYPE_CHOICES:
+        policy = get_policy(notification_type)
+        if policy.get('read_days') is not None:
+            condition |= Q(
+                notification_type=notification_type,
+                is_read=True,
+                read_at__lt=now - timedelta(days=policy['read_days'])
+            )
+        if policy.get('unread_days') is not None:
+            condition |= Q(
+                notification_type=notification_type,
+                is_read=False,
+                created_at__lt=now - timedelta(days=policy['unread_days'])
+            )
+    return condition
+
+
+def _delete_rows(ids):
+    """
+    DELETE ... WHERE id IN (...) directo en SQL: sin cargar objetos ni
+    emitir post_delete por fila (ningún modelo referencia Notification)
+    """
+    connection = connections[Notification.objects.db]
+    quote = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(Notification._meta.db_table)} '
+            f'WHERE {quote(Notification._meta.pk.column)} IN ({placeholders})',
+            ids
+        )
+
+
+def purge_notifications(batch_size=None, archive=None, dry_run=False, max_batches=None, pause=0):
+    """
+    Purga las notificaciones según las políticas de retención.
+    Retorna {'removed', 'archived', 'by_type', 'batches', 'seconds'}.
+    """
+    batch_size = batch_size or RETENTION_BATCH_SIZE
+    archive = RETENTION_ARCHIVE if archive is None else archive
+    started = time.monotonic()
+
+    purgeable = Notification.objects.filter(purgeable_condition()).order_by()
+    by_type = Counter()
+    removed = archived = batches = 0
+
+    if dry_run:
+        by_type.update(dict(
+            purgeable.values('notification_type')
+            .annotate(total=Count('id'))
+            .values_list('notification_type', 'total')
+        ))
+        removed = sum(by_type.values())
+    else:
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic():
+                fields = ARCHIVE_FIELDS if archive else PURGE_FIELDS
+                rows = list(purgeable.values(*fields)[:batch_size])
+                if not rows:
+                    break
+
+                if archive:
+                    ArchivedNotification.objects.bulk_create(
+                        [
+                            ArchivedNotification(
+                                original_id=row['id'],
+                                **{field: value for field, value in row.items() if field != 'id'}
+                            )
+                            for row in rows
+                        ],
+                        batch_size=batch_size
+                    )
+                    archived += len(rows)
+
+                _delete_rows([row['id'] for row in rows])
+
+                unread_recipients = {row['recipient_id'] for row in rows if not row['is_read']}
+                transaction.on_commit(lambda ids=unread_recipients: invalidate_unread_counts(ids))
+
+            by_type.update(row['notification_type'] for row in rows)
+            removed += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+    return {
+        'removed': removed,
+        'archived': archived,
+        'by_type': dict(by_type),
+        'batches': batches,
+        'seconds': round(time.monotonic() - started, 3),
+    }
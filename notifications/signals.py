@@ -0,0 +1,29 @@
+"""
+Signals de notificaciones: mantienen los contadores de no leídas en caché
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Notification
+from .counters import increment_unread, invalidate_unread_counts
+
+
+@receiver(post_save, sender=Notification)
+def notification_counter_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Incrementa el contador al crear una no leída; invalida si cambia el estado de lectura"""
+    recipient_id = instance.recipient_id
+    if created:
+        if not instance.is_read:
+            transaction.on_commit(lambda: increment_unread(recipient_id))
+    elif update_fields is None or 'is_read' in update_fields:
+        transaction.on_commit(lambda: invalidate_unread_counts([recipient_id]))
+
+
+@receiver(post_delete, sender=Notification)
+def notification_counter_deleted(sender, instance, **kwargs):
+    """Invalida el contador del destinatario al borrar una notificación no leída"""
+    if not instance.is_read:
+        recipient_id = instance.recipient_id
+        transaction.on_commit(lambda: invalidate_unread_counts([recipient_id]))
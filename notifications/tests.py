@@ -1,3 +1,190 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import background
+from timeline.models import TimelineEvent
+from . import fanout
+from .counters import _cache_key, counters_enabled, get_unread_count
+from .models import Notification, NotificationBroadcast
+from .retention import purge_notifications
+
+
+class UnreadNotificationsAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unread_ignores_stale_cached_counter(self):
+        # Contador de otro worker (o aún sin invalidar) que dice 0
+        cache.set(_cache_key(self.user.pk), 0)
+        Notification.objects.bulk_create([Notification(recipient=self.user, title='Nueva', message='...')])
+
+        response = self.client.get('/api/notifications/unread/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['title'] for item in response.json()], ['Nueva'])
+
+    def test_process_local_cache_is_not_used(self):
+        self.assertFalse(counters_enabled())
+        self.assertEqual(get_unread_count(self.user), 0)
+        Notification.objects.bulk_create([Notification(recipient=self.user, title='Nueva', message='...')])
+        self.assertEqual(get_unread_count(self.user), 1)
+        self.assertIsNone(cache.get(_cache_key(self.user.pk)))
+
+    def test_shared_counter_follows_signals(self):
+        caches = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': tempfile.mkdtemp(),
+        }}
+        with override_settings(CACHES=caches):
+            self.assertEqual(get_unread_count(self.user), 0)
+            with self.captureOnCommitCallbacks(execute=True):
+                notification = Notification.objects.create(recipient=self.user, title='Nueva', message='...')
+            self.assertEqual(cache.get(_cache_key(self.user.pk)), 1)
+            self.assertEqual(get_unread_count(self.user), 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                notification.mark_as_read()
+            self.assertEqual(get_unread_count(self.user), 0)
+
+
+class BroadcastAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.administrator = User.objects.create_user('marta', 'marta@example.com', 'x')
+        cls.administrator.groups.add(Group.objects.create(name='Administrator'))
+        cls.superuser = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+
+    def broadcast(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/notifications/broadcast/', {
+            'title': 'Aviso', 'message': '...', 'users': [self.user.pk],
+        }, format='json')
+
+    def test_only_administrators_can_broadcast(self):
+        self.assertEqual(self.broadcast(self.user).status_code, 403)
+        for user in (self.administrator, self.superuser):
+            with self.subTest(user=user.username):
+                response = self.broadcast(user)
+                self.assertEqual(response.status_code, 202)
+                self.assertEqual(response.json()['recipients'], 1)
+
+
+class FanoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'user{index}', f'user{index}@example.com', 'x') for index in range(5)]
+
+    def setUp(self):
+        patcher = mock.patch.object(fanout, 'FANOUT_CHUNK_SIZE', 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_delivery_in_chunks(self):
+        result = fanout.notify('Aviso', '...', users=self.users, background=False)
+        self.assertEqual(result, {'recipients': 5, 'created': 5, 'digested': 0})
+        self.assertEqual(Notification.objects.count(), 5)
+        broadcast = NotificationBroadcast.objects.get()
+        self.assertEqual((broadcast.status, broadcast.next_offset, broadcast.recipient_ids), ('done', 5, []))
+        self.assertEqual(TimelineEvent.objects.filter(event_type='notification').count(), 1)
+
+    def test_digest_accumulates_in_unread_notifications(self):
+        fanout.notify('Aviso', '...', users=self.users[:3], digest_key='precios', background=False)
+        result = fanout.notify('Aviso 2', '...', users=self.users, digest_key='precios', background=False)
+        self.assertEqual(result, {'recipients': 5, 'created': 2, 'digested': 3})
+        self.assertEqual(Notification.objects.filter(digest_count=2, title='Aviso 2').count(), 3)
+
+    def test_background_delivery_runs_after_commit(self):
+        with mock.patch.object(background, 'BACKGROUND_TASKS_SYNC', True):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.assertEqual(fanout.notify('Aviso', '...', users=self.users), 5)
+            # Guardado con la transacción, sin escribir aún
+            self.assertEqual(NotificationBroadcast.objects.get().status, 'pending')
+            self.assertFalse(Notification.objects.exists())
+            for callback in callbacks:
+                callback()
+        self.assertEqual(NotificationBroadcast.objects.get().status, 'done')
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_interrupted_broadcast_is_resumed_without_duplicates(self):
+        deliver_chunk = fanout._deliver_chunk
+        calls = []
+
+        def failing_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('worker reiniciado')
+            return deliver_chunk(*args)
+
+        with mock.patch.object(fanout, '_deliver_chunk', failing_chunk), self.assertRaises(RuntimeError):
+            fanout.notify('Aviso', '...', users=self.users, background=False)
+        broadcast = NotificationBroadcast.objects.get()
+        self.assertEqual((broadcast.status, broadcast.next_offset), ('pending', 2))
+        self.assertIn('worker reiniciado', broadcast.last_error)
+        self.assertEqual(Notification.objects.count(), 2)
+
+        # Con avance reciente no se considera interrumpido
+        call_command('resume_notification_broadcasts', stdout=io.StringIO())
+        self.assertEqual(Notification.objects.count(), 2)
+
+        call_command('resume_notification_broadcasts', stale_minutes=0, stdout=io.StringIO())
+        broadcast.refresh_from_db()
+        self.assertEqual((broadcast.status, broadcast.created_count, broadcast.attempts), ('done', 5, 2))
+        self.assertEqual(
+            sorted(Notification.objects.values_list('recipient_id', flat=True)),
+            sorted(user.pk for user in self.users)
+        )
+
+
+class NotificationVisibilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.own = Notification.objects.create(recipient=cls.admin, title='Propia', message='...')
+        Notification.objects.create(recipient=cls.user, title='Ajena', message='...')
+
+    def test_administrators_only_see_their_own_notifications(self):
+        self.assertEqual(list(Notification.objects.visible_to(self.admin)), [self.own])
+
+    def test_api_lists_only_received_notifications(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/notifications/')
+        self.assertEqual([item['title'] for item in response.json()['results']], ['Propia'])
+
+
+class RetentionTests(TestCase):
+
+    def test_purge_removes_expired_and_old_read_notifications(self):
+        user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        now = timezone.now()
+        kept = Notification.objects.create(recipient=user, title='Vigente', message='...')
+        Notification.objects.create(recipient=user, title='Expirada', message='...', expires_at=now - timedelta(days=1))
+        Notification.objects.create(
+            recipient=user, title='Leída', message='...', is_read=True, read_at=now - timedelta(days=400)
+        )
+
+        result = purge_notifications(batch_size=1)
+
+        self.assertEqual(result['removed'], 2)
+        self.assertEqual(result['batches'], 2)
+        self.assertEqual(list(Notification.objects.all()), [kept])
@@ -0,0 +1,149 @@
+"""
+Analítica de empresas
+=====================
+
+Métricas del reporte de cuentas, cada familia en su propia consulta
+agrupada en lugar de un único queryset con Count()/Sum() sobre todos los
+JOINs (deals x contactos x interacciones x tareas x documentos), que
+multiplica las filas y no escala:
+
+- Actividad por empresa: un GROUP BY account_id por tabla, solo para las
+  empresas que se muestran
+- Industrias: empresas por industria y valor de deals por industria en
+  dos consultas agrupadas
+- Tamaño: todos los tramos de empleados en un solo agregado condicional
+- Inactivas: NOT EXISTS sobre el índice (account, -scheduled_at) de
+  interacciones
+"""
+
+from datetime import timedelta
+
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from accounts.models import Account
+from contacts.models import Contact
+from deals.models import Deal
+from documents.models import Document
+from interactions.models import Interaction
+from tasks.models import Task
+
+
+# Tramos de número de empleados: (etiqueta, mínimo, máximo o None)
+SIZE_BUCKETS = [
+    ('1-10', 1, 10),
+    ('11-50', 11, 50),
+    ('51-200', 51, 200),
+    ('201-500', 201, 500),
+    ('500+', 501, None),
+]
+
+INACTIVE_DAYS = 60
+
+# Tablas contadas por empresa: nombre del contador -> modelo con FK 'account'
+ACTIVITY_COUNTS = {
+    'contacts_count': Contact,
+    'interactions_count': Interaction,
+    'tasks_count': Task,
+    'documents_count': Document,
+}
+
+
+def counts_by_account(model, account_ids):
+    """{account_id: filas} de model para esas empresas (un GROUP BY)"""
+    rows = (
+        model.objects
+        .filter(account_id__in=account_ids)
+        .order_by()
+        .values('account_id')
+        .annotate(count=Count('pk'))
+        .values_list('account_id', 'count')
+    )
+    return dict(rows)
+
+
+def top_accounts(limit=20):
+    """
+    Empresas con más valor en deals, con sus contadores de deals,
+    contactos, interacciones, tareas y documentos.
+    Una consulta para el ranking, otra para las empresas y una por contador.
+    """
+    ranking = list(
+        Deal.objects
+        .order_by()
+        .values('account_id')
+        .annotate(deals_count=Count('pk'), deals_value=Sum('value'))
+        .filter(deals_value__isnull=False)
+        .order_by('-deals_value', 'account_id')[:limit]
+    )
+    account_ids = [row['account_id'] for row in ranking]
+    accounts = Account.objects.in_bulk(account_ids)
+    counts = {name: counts_by_account(model, account_ids) for name, model in ACTIVITY_COUNTS.items()}
+
+    result = []
+    for row in ranking:
+        account = accounts[row['account_id']]
+        account.deals_count = row['deals_count']
+        account.deals_value = row['deals_value']
+        for name, by_account in counts.items():
+            setattr(account, name, by_account.get(account.pk, 0))
+        result.append(account)
+    return result
+
+
+def industry_rollup():
+    """
+    [{'industry', 'count', 'total_value'}] ordenado por número de empresas.
+    Empresas y valor de deals se agrupan por separado: el valor no se
+    repite por cada empresa ni el número de empresas por cada deal.
+    """
+    accounts = (
+        Account.objects
+        .order_by()
+        .values('industry')
+        .annotate(count=Count('pk'))
+    )
+    values = dict(
+        Deal.objects
+        .order_by()
+        .values('account__industry')
+        .annotate(total=Sum('value'))
+        .values_list('account__industry', 'total')
+    )
+    rollup = [
+        {'industry': row['industry'], 'count': row['count'], 'total_value': values.get(row['industry'])}
+        for row in accounts
+    ]
+    rollup.sort(key=lambda row: (-row['count'], row['industry']))
+    return rollup
+
+
+def _size_condition(minimum, maximum):
+    condition = Q(number_of_employees__gte=minimum)
+    if maximum is not None:
+        condition &= Q(number_of_employees__lte=maximum)
+    return condition
+
+
+def size_buckets():
+    """[{'label', 'count'}] por tramo de empleados, en una sola consulta"""
+    aggregates = {
+        f'bucket_{position}': Count('pk', filter=_size_condition(minimum, maximum))
+        for position, (_label, minimum, maximum) in enumerate(SIZE_BUCKETS)
+    }
+    aggregates['unknown'] = Count('pk', filter=Q(number_of_employees__isnull=True))
+    counts = Account.objects.order_by().aggregate(**aggregates)
+
+    buckets = [
+        {'label': label, 'count': counts[f'bucket_{position}']}
+        for position, (label, _minimum, _maximum) in enumerate(SIZE_BUCKETS)
+    ]
+    buckets.append({'label': 'Sin dato', 'count': counts['unknown']})
+    return buckets
+
+
+def inactive_accounts(days=INACTIVE_DAYS, limit=20, now=None):
+    """Empresas sin ninguna interacción desde hace 'days' días (ni programada)"""
+    threshold = (now or timezone.now()) - timedelta(days=days)
+    recent = Interaction.objects.filter(account_id=OuterRef('pk'), scheduled_at__gte=threshold)
+    return Account.objects.filter(~Exists(recent)).order_by('name', 'id')[:limit]
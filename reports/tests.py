@@ -1,3 +1,81 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Account
+from contacts.models import Contact
+from core.middleware import track_queries
+from deals.models import Deal
+from interactions.models import Interaction
+from tasks.models import Task
+from . import analytics
+
+
+class AccountAnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ana', 'ana@example.com', 'x')
+        now = timezone.now()
+        cls.acme = Account.objects.create(name='Acme', industry='technology', number_of_employees=40)
+        cls.globex = Account.objects.create(name='Globex', industry='technology', number_of_employees=600)
+        cls.initech = Account.objects.create(name='Initech', industry='retail')
+
+        for value in ('100.00', '50.00'):
+            Deal.objects.create(name=f'Acme {value}', account=cls.acme, value=Decimal(value), assigned_to=cls.user)
+        Deal.objects.create(name='Globex', account=cls.globex, value=Decimal('500.00'), assigned_to=cls.user)
+        Contact.objects.bulk_create([
+            Contact(account=cls.acme, first_name=f'C{index}', last_name='X', email=f'{index}@acme.test')
+            for index in range(3)
+        ])
+        Interaction.objects.bulk_create([
+            Interaction(interaction_type='call', subject=f'Llamada {index}', account=cls.acme,
+                        assigned_to=cls.user, scheduled_at=now - timedelta(days=index))
+            for index in range(4)
+        ] + [
+            Interaction(interaction_type='call', subject='Antigua', account=cls.globex,
+                        assigned_to=cls.user, scheduled_at=now - timedelta(days=200))
+        ])
+        Task.objects.bulk_create([Task(title='Seguimiento', account=cls.acme, assigned_to=cls.user, due_date=now)])
+
+    def test_top_accounts_counts_each_table_separately(self):
+        top = analytics.top_accounts()
+        self.assertEqual([account.name for account in top], ['Globex', 'Acme'])
+        acme = top[1]
+        self.assertEqual(
+            (acme.deals_count, acme.deals_value, acme.contacts_count, acme.interactions_count,
+             acme.tasks_count, acme.documents_count),
+            (2, Decimal('150.00'), 3, 4, 1, 0)
+        )
+
+    def test_top_accounts_query_count_does_not_grow_with_accounts(self):
+        with track_queries() as recorder:
+            analytics.top_accounts()
+        self.assertEqual(recorder.count, 2 + len(analytics.ACTIVITY_COUNTS))
+
+    def test_industry_rollup_is_not_multiplied_by_deals(self):
+        rollup = {row['industry']: (row['count'], row['total_value']) for row in analytics.industry_rollup()}
+        self.assertEqual(rollup, {
+            'technology': (2, Decimal('650.00')),
+            'retail': (1, None),
+        })
+
+    def test_size_buckets(self):
+        counts = {row['label']: row['count'] for row in analytics.size_buckets()}
+        self.assertEqual(counts['11-50'], 1)
+        self.assertEqual(counts['500+'], 1)
+        self.assertEqual(counts['Sin dato'], 1)
+        self.assertEqual(sum(counts.values()), 3)
+
+    def test_inactive_accounts(self):
+        self.assertEqual([account.name for account in analytics.inactive_accounts(days=60)], ['Globex', 'Initech'])
+        self.assertEqual([account.name for account in analytics.inactive_accounts(days=365)], ['Initech'])
 
-# Create your tests here.
+    def test_accounts_report_renders(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/reports/accounts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_accounts'], 3)
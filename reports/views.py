@@ -13,6 +13,7 @@ from interactions.models import Interaction
 from tasks.models import Task
 from email_templates.models import EmailLog
 from timeline.models import TimelineEvent
+from . import analytics
 
 
 @login_required
@@ -329,57 +330,14 @@ def activity_report(request):
 
 @login_required
 def accounts_report(request):
-    """Reporte de cuentas"""
-    # Todas las cuentas con estadísticas
-    accounts = Account.objects.annotate(
-        deals_count=Count('deals'),
-        deals_value=Sum('deals__value'),
-        contacts_count=Count('contacts', distinct=True),
-        interactions_count=Count('interactions', distinct=True),
-        tasks_count=Count('tasks', distinct=True),
-        documents_count=Count('documents', distinct=True),
-    ).order_by('-deals_value')
-    
-    # Por industria
-    by_industry = accounts.values('industry').annotate(
-        count=Count('id'),
-        total_value=Sum('deals__value')
-    ).order_by('-count')
-    
-    # Por tamaño (empleados)
-    size_ranges = [
-        ('1-10', 1, 10),
-        ('11-50', 11, 50),
-        ('51-200', 51, 200),
-        ('201-500', 201, 500),
-        ('500+', 501, 999999),
-    ]
-    
-    by_size = []
-    for label, min_emp, max_emp in size_ranges:
-        count = accounts.filter(
-            number_of_employees__gte=min_emp,
-            number_of_employees__lte=max_emp
-        ).count()
-        by_size.append({'label': label, 'count': count})
-    
-    # Top cuentas por valor
-    top_accounts = accounts.filter(
-        deals_value__isnull=False
-    )[:20]
-    
-    # Cuentas sin actividad reciente (últimos 60 días)
-    inactive_threshold = timezone.now() - timedelta(days=60)
-    inactive_accounts = accounts.filter(
-        Q(interactions__date__lt=inactive_threshold) | Q(interactions__isnull=True)
-    ).distinct()[:20]
-    
+    """Reporte de cuentas (cada métrica en su propia consulta, ver reports/analytics.py)"""
     context = {
-        'accounts': accounts,
-        'by_industry': by_industry,
-        'by_size': by_size,
-        'top_accounts': top_accounts,
-        'inactive_accounts': inactive_accounts,
+        'total_accounts': Account.objects.count(),
+        'by_industry': analytics.industry_rollup(),
+        'by_size': analytics.size_buckets(),
+        'top_accounts': analytics.top_accounts(),
+        'inactive_accounts': analytics.inactive_accounts(),
+        'inactive_days': analytics.INACTIVE_DAYS,
     }
     
     return render(request, 'reports/accounts.html', context)
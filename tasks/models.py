@@ -5,6 +5,16 @@ from model_utils import FieldTracker
 from accounts.models import Account
 from contacts.models import Contact
 from deals.models import Deal
+from core.rbac import RBACQuerySet
+
+
+class TaskQuerySet(RBACQuerySet):
+    def rbac_condition(self, scope):
+        """Tareas asignadas a o creadas por el usuario o su equipo"""
+        return (
+            models.Q(assigned_to_id__in=scope.team_user_ids) |
+            models.Q(created_by_id__in=scope.team_user_ids)
+        )
 
 
 class Task(models.Model):
@@ -97,6 +107,8 @@ class Task(models.Model):
     # Tracker para detectar cambios en campos
     tracker = FieldTracker(fields=['status'])
     
+    objects = TaskQuerySet.as_manager()
+    
     class Meta:
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
@@ -1,3 +1,87 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.middleware import track_queries
+from timeline.models import TimelineEvent
+from .models import Task
+
+
+class BulkTaskAPITests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.ana)
+        self.due_date = (timezone.now() + timedelta(days=1)).isoformat()
+
+    def rows(self, count, **extra):
+        return [
+            {'title': f'Tarea {index}', 'assigned_to': self.ana.pk, 'due_date': self.due_date, **extra}
+            for index in range(count)
+        ]
+
+    def test_bulk_create_writes_the_batch_and_its_timeline(self):
+        TimelineEvent.objects.all().delete()
+        with track_queries() as recorder:
+            response = self.client.post('/api/tasks/bulk-create/', self.rows(100), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 100)
+        self.assertEqual(Task.objects.count(), 100)
+        self.assertEqual(TimelineEvent.objects.filter(event_type='task').count(), 100)
+        # Validación con una consulta por FK y escritura por lotes, no por fila
+        self.assertLess(recorder.count, 20)
+
+    def test_bulk_update_is_partial_and_sets_updated_at(self):
+        created = self.client.post('/api/tasks/bulk-create/', self.rows(2), format='json').json()['created_ids']
+        before = Task.objects.get(pk=created[0]).updated_at
+        response = self.client.patch(
+            '/api/tasks/bulk-update/',
+            [{'id': pk, 'status': 'completed'} for pk in created],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated_ids'], created)
+        task = Task.objects.get(pk=created[0])
+        self.assertEqual((task.status, task.title), ('completed', 'Tarea 0'))
+        self.assertGreater(task.updated_at, before)
+
+    def test_bulk_upsert_creates_and_updates(self):
+        existing = self.client.post('/api/tasks/bulk-create/', self.rows(1), format='json').json()['created_ids'][0]
+        response = self.client.post(
+            '/api/tasks/bulk-upsert/',
+            [{'id': existing, 'title': 'Renombrada'}, *self.rows(2)],
+            format='json'
+        )
+        body = response.json()
+        self.assertEqual((body['created'], body['updated']), (2, 1))
+        self.assertEqual(Task.objects.get(pk=existing).title, 'Renombrada')
+
+    def test_bulk_update_rejects_invalid_batches_atomically(self):
+        created = self.client.post('/api/tasks/bulk-create/', self.rows(1), format='json').json()['created_ids']
+        cases = [
+            [{'status': 'completed'}],
+            [{'id': created[0], 'status': 'completed'}, {'id': created[0], 'status': 'pending'}],
+            [{'id': created[0], 'status': 'completed'}, {'id': 999999, 'status': 'completed'}],
+            [{'id': created[0], 'status': 'no-existe'}],
+        ]
+        for rows in cases:
+            with self.subTest(rows=rows):
+                response = self.client.patch('/api/tasks/bulk-update/', rows, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(Task.objects.get(pk=created[0]).status, 'pending')
 
-# Create your tests here.
+    def test_bulk_update_only_reaches_visible_rows(self):
+        other = Task.objects.create(title='De Luis', assigned_to=self.luis, created_by=self.luis,
+                                    due_date=timezone.now())
+        response = self.client.patch('/api/tasks/bulk-update/', [{'id': other.pk, 'title': 'Mía'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_ids'], [str(other.pk)])
+        self.assertEqual(Task.objects.get(pk=other.pk).title, 'De Luis')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-19 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('timeline', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timelineevent',
+            name='action',
+            field=models.CharField(choices=[('created', 'Creado'), ('updated', 'Actualizado'), ('deleted', 'Eliminado'), ('completed', 'Completado'), ('sent', 'Enviado'), ('received', 'Recibido'), ('opened', 'Abierto'), ('clicked', 'Clic realizado'), ('assigned', 'Asignado'), ('moved', 'Movido'), ('won', 'Ganado'), ('lost', 'Perdido'), ('accepted', 'Aceptado'), ('rejected', 'Rechazado'), ('expired', 'Expirado'), ('uploaded', 'Subido'), ('downloaded', 'Descargado'), ('called', 'Llamado'), ('met', 'Reunido')], db_index=True, max_length=50),
+        ),
+    ]
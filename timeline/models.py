@@ -4,6 +4,20 @@ from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils import timezone
 
+from core.rbac import RBACQuerySet, account_visible_for
+
+
+class TimelineEventQuerySet(RBACQuerySet):
+    
+    def rbac_condition(self, scope):
+        """Eventos del equipo o de sus deals y empresas visibles"""
+        return (
+            models.Q(user_id__in=scope.team_user_ids) |
+            models.Q(deal__assigned_to_id__in=scope.team_user_ids) |
+            account_visible_for('account_id', scope)
+        )
+
+
 class TimelineEvent(models.Model):
     """
     Modelo para registrar eventos cronológicos en el CRM.
@@ -43,6 +57,7 @@ class TimelineEvent(models.Model):
         ('lost', 'Perdido'),
         ('accepted', 'Aceptado'),
         ('rejected', 'Rechazado'),
+        ('expired', 'Expirado'),
         ('uploaded', 'Subido'),
         ('downloaded', 'Descargado'),
         ('called', 'Llamado'),
@@ -78,6 +93,8 @@ class TimelineEvent(models.Model):
     is_public = models.BooleanField(default=True)  # Si es visible para todos o solo para el usuario
     is_important = models.BooleanField(default=False)  # Para destacar eventos importantes
     
+    objects = TimelineEventQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -133,11 +150,11 @@ class TimelineEvent(models.Model):
         return colors.get(self.event_type, '#64748b')
     
     @staticmethod
-    def create_event(event_type, action, title, description='', user=None, 
-                     content_object=None, metadata=None, account=None, 
-                     contact=None, deal=None, is_important=False):
+    def build_event(event_type, action, title, description='', user=None, 
+                    content_object=None, metadata=None, account=None, 
+                    contact=None, deal=None, is_important=False):
         """
-        Método helper para crear eventos fácilmente
+        Construye un evento sin guardarlo (para insertar varios con bulk_create)
         """
         event = TimelineEvent(
             event_type=event_type,
@@ -155,5 +172,25 @@ class TimelineEvent(models.Model):
         if content_object:
             event.content_object = content_object
         
+        return event
+    
+    @staticmethod
+    def create_event(event_type, action, title, description='', user=None, 
+                     content_object=None, metadata=None, account=None, 
+                     contact=None, deal=None, is_important=False):
+        """
+        Método helper para crear eventos fácilmente
+        """
+        event = TimelineEvent.build_event(
+            event_type, action, title,
+            description=description,
+            user=user,
+            content_object=content_object,
+            metadata=metadata,
+            account=account,
+            contact=contact,
+            deal=deal,
+            is_important=is_important,
+        )
         event.save()
         return event
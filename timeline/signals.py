@@ -10,9 +10,11 @@ from tasks.models import Task
 from documents.models import Document
 from email_templates.models import EmailLog
 from notifications.models import Notification
+from core.metrics import timed_receiver
 
 
 @receiver(post_save, sender=Contact)
+@timed_receiver
 def contact_saved(sender, instance, created, **kwargs):
     """Captura cuando se crea o actualiza un contacto"""
     from timeline.models import TimelineEvent
@@ -38,13 +40,14 @@ def contact_saved(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=Account)
+@timed_receiver
 def account_saved(sender, instance, created, **kwargs):
     """Captura cuando se crea o actualiza una cuenta"""
     from timeline.models import TimelineEvent
     
     action = 'created' if created else 'updated'
     title = f"Cuenta {action}: {instance.name}"
-    description = f"Industria: {instance.get_industry_display()}, Empleados: {instance.number_of_employees}"
+    description = f"Industria: {instance.industry or '-'}, Empleados: {instance.number_of_employees or '-'}"
     
     TimelineEvent.create_event(
         event_type='account',
@@ -55,24 +58,27 @@ def account_saved(sender, instance, created, **kwargs):
         account=instance,
         metadata={
             'industry': instance.industry,
-            'revenue': str(instance.annual_revenue),
             'employees': instance.number_of_employees,
         }
     )
 
 
-@receiver(post_save, sender=Deal)
-def deal_saved(sender, instance, created, **kwargs):
-    """Captura cuando se crea o actualiza un negocio"""
+def build_deal_event(instance, created=False, previous_stage=None, user=None):
+    """
+    Construye (sin guardar) el evento de timeline de un negocio.
+    previous_stage indica un cambio de etapa (si no, se toma del tracker).
+    """
     from timeline.models import TimelineEvent
     
     action = 'created' if created else 'updated'
+    if previous_stage is None and not created and instance.tracker.has_changed('stage'):
+        previous_stage = instance.tracker.previous('stage')
     
     # Detectar si cambió de stage
-    if not created and instance.tracker.has_changed('stage'):
+    if previous_stage is not None and previous_stage != instance.stage:
         action = 'moved'
         title = f"Negocio movido: {instance.name}"
-        description = f"De {instance.tracker.previous('stage')} a {instance.stage}"
+        description = f"De {previous_stage} a {instance.stage}"
     elif instance.stage == 'closed_won':
         action = 'won'
         title = f"🎉 Negocio ganado: {instance.name}"
@@ -85,11 +91,12 @@ def deal_saved(sender, instance, created, **kwargs):
         title = f"Negocio {action}: {instance.name}"
         description = f"Etapa: {instance.stage}, Valor: ${instance.value:,.2f}"
     
-    TimelineEvent.create_event(
+    return TimelineEvent.build_event(
         event_type='deal',
         action=action,
         title=title,
         description=description,
+        user=user,
         content_object=instance,
         account=instance.account,
         contact=instance.contact,
@@ -98,20 +105,23 @@ def deal_saved(sender, instance, created, **kwargs):
         metadata={
             'stage': instance.stage,
             'value': str(instance.value),
-            'probability': str(instance.probability),
+            'probability': str(instance.get_probability()),
             'expected_close_date': instance.expected_close_date.isoformat() if instance.expected_close_date else None,
         }
     )
 
 
-@receiver(post_save, sender=Interaction)
-def interaction_saved(sender, instance, created, **kwargs):
-    """Captura cuando se crea o actualiza una interacción"""
+@receiver(post_save, sender=Deal)
+@timed_receiver
+def deal_saved(sender, instance, created, **kwargs):
+    """Captura cuando se crea o actualiza un negocio"""
+    build_deal_event(instance, created=created).save()
+
+
+def build_interaction_event(instance):
+    """Construye (sin guardar) el evento de timeline de una interacción nueva"""
     from timeline.models import TimelineEvent
     
-    if not created:
-        return  # Solo registramos creaciones de interacciones
-    
     title = f"{instance.get_interaction_type_display()}: {instance.subject}"
     description = instance.notes[:200] if instance.notes else ""
     
@@ -124,7 +134,7 @@ def interaction_saved(sender, instance, created, **kwargs):
     }
     event_type = event_type_map.get(instance.interaction_type, 'interaction')
     
-    TimelineEvent.create_event(
+    return TimelineEvent.build_event(
         event_type=event_type,
         action='created',
         title=title,
@@ -136,15 +146,24 @@ def interaction_saved(sender, instance, created, **kwargs):
         deal=instance.deal,
         metadata={
             'interaction_type': instance.interaction_type,
-            'duration': instance.duration,
-            'date': instance.date.isoformat() if instance.date else None,
+            'duration': instance.duration_minutes,
+            'date': instance.scheduled_at.isoformat() if instance.scheduled_at else None,
         }
     )
 
 
-@receiver(post_save, sender=Task)
-def task_saved(sender, instance, created, **kwargs):
-    """Captura cuando se crea, actualiza o completa una tarea"""
+@receiver(post_save, sender=Interaction)
+@timed_receiver
+def interaction_saved(sender, instance, created, **kwargs):
+    """Captura cuando se crea o actualiza una interacción"""
+    if not created:
+        return  # Solo registramos creaciones de interacciones
+    
+    build_interaction_event(instance).save()
+
+
+def build_task_event(instance, created):
+    """Construye (sin guardar) el evento de timeline de una tarea creada o actualizada"""
     from timeline.models import TimelineEvent
     
     action = 'created' if created else 'updated'
@@ -158,7 +177,7 @@ def task_saved(sender, instance, created, **kwargs):
     
     description = f"Prioridad: {instance.get_priority_display()}, Vencimiento: {instance.due_date.strftime('%d/%m/%Y') if instance.due_date else 'Sin fecha'}"
     
-    TimelineEvent.create_event(
+    return TimelineEvent.build_event(
         event_type='task',
         action=action,
         title=title,
@@ -172,13 +191,21 @@ def task_saved(sender, instance, created, **kwargs):
         metadata={
             'priority': instance.priority,
             'status': instance.status,
-            'type': instance.type,
+            'type': instance.task_type,
             'due_date': instance.due_date.isoformat() if instance.due_date else None,
         }
     )
 
 
+@receiver(post_save, sender=Task)
+@timed_receiver
+def task_saved(sender, instance, created, **kwargs):
+    """Captura cuando se crea, actualiza o completa una tarea"""
+    build_task_event(instance, created).save()
+
+
 @receiver(post_save, sender=Document)
+@timed_receiver
 def document_saved(sender, instance, created, **kwargs):
     """Captura cuando se sube un documento"""
     from timeline.models import TimelineEvent
@@ -208,6 +235,7 @@ def document_saved(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=EmailLog)
+@timed_receiver
 def email_log_saved(sender, instance, created, **kwargs):
     """Captura cuando se envía un email"""
     from timeline.models import TimelineEvent
@@ -259,6 +287,7 @@ def email_log_saved(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=Quote)
+@timed_receiver
 def quote_saved(sender, instance, created, **kwargs):
     """Captura cuando se crea o cambia el estado de una cotización"""
     from timeline.models import TimelineEvent
@@ -303,18 +332,14 @@ def quote_saved(sender, instance, created, **kwargs):
     )
 
 
-@receiver(post_save, sender=Notification)
-def notification_saved(sender, instance, created, **kwargs):
-    """Captura cuando se crea una notificación importante"""
+def build_notification_event(instance):
+    """Construye (sin guardar) el evento de timeline de una notificación nueva"""
     from timeline.models import TimelineEvent
     
-    if not created or instance.notification_type == 'info':
-        return  # Solo registramos notificaciones importantes nuevas
-    
     title = f"🔔 {instance.title}"
     description = instance.message[:200]
     
-    TimelineEvent.create_event(
+    return TimelineEvent.build_event(
         event_type='notification',
         action='created',
         title=title,
@@ -327,3 +352,13 @@ def notification_saved(sender, instance, created, **kwargs):
             'priority': instance.priority,
         }
     )
+
+
+@receiver(post_save, sender=Notification)
+@timed_receiver
+def notification_saved(sender, instance, created, **kwargs):
+    """Captura cuando se crea una notificación importante"""
+    if not created or instance.notification_type == 'info':
+        return  # Solo registramos notificaciones importantes nuevas
+    
+    build_notification_event(instance).save()
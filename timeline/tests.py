@@ -1,3 +1,42 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from accounts.models import Account
+from deals.models import Deal
+from .models import TimelineEvent
+from .views import timeline_view
+
+
+class TimelineVisibilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = User.objects.create_user('ana', 'ana@example.com', 'x')
+        cls.luis = User.objects.create_user('luis', 'luis@example.com', 'x')
+        cls.acme = Account.objects.create(name='Acme')
+        cls.globex = Account.objects.create(name='Globex')
+        Deal.objects.create(name='Acme 1', account=cls.acme, value=Decimal('100'), assigned_to=cls.ana)
+        Deal.objects.create(name='Globex 1', account=cls.globex, value=Decimal('100'), assigned_to=cls.luis)
+        TimelineEvent.objects.all().delete()
+        TimelineEvent.objects.create(event_type='note', action='created', title='Acme', account=cls.acme)
+        TimelineEvent.objects.create(event_type='note', action='created', title='Globex', account=cls.globex)
+        TimelineEvent.objects.create(event_type='note', action='created', title='Propio', user=cls.ana)
+
+    def titles(self, queryset):
+        return sorted(queryset.values_list('title', flat=True))
+
+    def test_sales_user_sees_own_and_visible_account_events(self):
+        self.assertEqual(self.titles(TimelineEvent.objects.visible_to(self.ana)), ['Acme', 'Propio'])
+        self.assertEqual(self.titles(TimelineEvent.objects.visible_to(self.luis)), ['Globex'])
+
+    def test_timeline_view_is_scoped(self):
+        request = RequestFactory().get('/timeline/')
+        request.user = self.luis
+        with mock.patch('timeline.views.render', return_value=HttpResponse()) as render:
+            timeline_view(request)
+        page = render.call_args.args[2]['page_obj']
+        self.assertEqual(sorted(event.title for event in page), ['Globex'])
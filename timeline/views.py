@@ -17,10 +17,10 @@ def timeline_view(request):
     user_id = request.GET.get('user', '')
     important_only = request.GET.get('important', '')
     
-    # Query base
-    events = TimelineEvent.objects.select_related(
+    # Query base: solo los eventos visibles para el usuario (RBAC)
+    events = TimelineEvent.objects.visible_to(request.user).select_related(
         'user', 'account', 'contact', 'deal', 'content_type'
-    ).all()
+    )
     
     # Aplicar filtros
     if event_type:
@@ -63,9 +63,9 @@ def timeline_view(request):
     context = {
         'page_obj': page_obj,
         'event_types': TimelineEvent.EVENT_TYPE_CHOICES,
-        'accounts': Account.objects.all()[:100],
-        'contacts': Contact.objects.all()[:100],
-        'deals': Deal.objects.all()[:100],
+        'accounts': Account.objects.visible_to(request.user)[:100],
+        'contacts': Contact.objects.visible_to(request.user)[:100],
+        'deals': Deal.objects.visible_to(request.user)[:100],
         'users': User.objects.filter(is_active=True),
         'filters': {
             'type': event_type,
@@ -87,7 +87,7 @@ def timeline_account(request, account_id):
     from accounts.models import Account
     
     account = Account.objects.get(id=account_id)
-    events = TimelineEvent.objects.filter(
+    events = TimelineEvent.objects.visible_to(request.user).filter(
         account=account
     ).select_related('user', 'contact', 'deal', 'content_type')
     
@@ -111,7 +111,7 @@ def timeline_contact(request, contact_id):
     from contacts.models import Contact
     
     contact = Contact.objects.get(id=contact_id)
-    events = TimelineEvent.objects.filter(
+    events = TimelineEvent.objects.visible_to(request.user).filter(
         contact=contact
     ).select_related('user', 'account', 'deal', 'content_type')
     
@@ -135,7 +135,7 @@ def timeline_deal(request, deal_id):
     from deals.models import Deal
     
     deal = Deal.objects.get(id=deal_id)
-    events = TimelineEvent.objects.filter(
+    events = TimelineEvent.objects.visible_to(request.user).filter(
         deal=deal
     ).select_related('user', 'account', 'contact', 'content_type')
     